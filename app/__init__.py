@@ -1,28 +1,92 @@
+import logging
+import os
+import time
+
 from flask import Flask, render_template, redirect, url_for
+from flask_migrate import Migrate
 from flask_login import current_user
+from jinja2 import FileSystemBytecodeCache
 from config import config
-from app.models import db
+from app.models import db, a_hora_local, configurar_dia_negocio
+from app.versiones import registrar_versiones
+from app.eventos import registrar_eventos
+from app.pendientes import registrar_pendientes
 from app.auth import init_auth, auth_bp
+from app.fragmentos import CacheFragmentos
+from app.cache import registrar_cache
+from app.analitica import registrar_analitica
+from app.assets import registrar_assets
+from app.sucursales import registrar_sucursales
+from app.plazos import registrar_plazos
+from app.database import (configurar_pool, configurar_replica, registrar_telemetria,
+                          registrar_lectura_propia)
+
+migrate = Migrate(directory=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations'))
+
+
+def _usar_log_de_gunicorn(app):
+    """Bajo gunicorn, mandar app.logger a los handlers de gunicorn.error"""
+    gunicorn_logger = logging.getLogger('gunicorn.error')
+    if gunicorn_logger.handlers:
+        app.logger.handlers = gunicorn_logger.handlers
+        app.logger.setLevel(gunicorn_logger.level)
+
+
+def _configurar_plantillas(app):
+    """Bytecode de Jinja en disco, etiqueta {% cache %} para fragmentos y filtro hora_local"""
+    directorio = app.config.get('JINJA_BYTECODE_CACHE_DIR')
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directorio)
+    app.jinja_env.add_extension(CacheFragmentos)
+    # Las marcas de tiempo se guardan en UTC: {{ comanda.fecha_creacion|hora_local }}
+    app.jinja_env.filters['hora_local'] = a_hora_local
+
 
 def create_app(config_name='development'):
     """Crear y configurar la aplicación Flask"""
+    tiempos = {}
+    inicio = marca = time.perf_counter()
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    _usar_log_de_gunicorn(app)
+    configurar_dia_negocio(app.config['DIA_NEGOCIO_CORTE'])
+    tiempos['config'] = time.perf_counter() - marca
     
     # Inicializar extensiones
+    marca = time.perf_counter()
+    configurar_pool(app)
+    configurar_replica(app)
     db.init_app(app)
+    migrate.init_app(app, db)
+    registrar_telemetria(app, db)
+    registrar_lectura_propia(app, db)
+    registrar_plazos(app)
+    registrar_cache(app)
+    registrar_analitica(app)
+    registrar_versiones()
+    registrar_eventos()
+    registrar_pendientes(app)
+    registrar_sucursales(app)
     init_auth(app)
+    _configurar_plantillas(app)
+    registrar_assets(app)
+    tiempos['extensiones'] = time.perf_counter() - marca
     
     # Registrar blueprints
+    marca = time.perf_counter()
     app.register_blueprint(auth_bp, url_prefix='/auth')
     
     # Importar y registrar routes
-    from app.routes import mesas, comandas, caja, inventario, reportes
+    from app.routes import mesas, comandas, caja, inventario, reportes, sistema, api_v2
     app.register_blueprint(mesas.mesas_bp, url_prefix='/mesas')
     app.register_blueprint(comandas.comandas_bp, url_prefix='/comandas')
     app.register_blueprint(caja.caja_bp, url_prefix='/caja')
     app.register_blueprint(inventario.inventario_bp, url_prefix='/inventario')
     app.register_blueprint(reportes.reportes_bp, url_prefix='/reportes')
+    app.register_blueprint(sistema.sistema_bp, url_prefix='/sistema')
+    app.register_blueprint(api_v2.api_v2_bp, url_prefix='/api/v2')
+    tiempos['blueprints'] = time.perf_counter() - marca
     
     # Ruta principal
     @app.route('/')
@@ -77,4 +141,7 @@ def create_app(config_name='development'):
             'current_year': 2025
         }
     
-    return app
\ No newline at end of file
+    tiempos['total'] = time.perf_counter() - inicio
+    app.logger.info('Arranque (pid %s): %s', os.getpid(),
+                    ', '.join(f'{k} {v * 1000:.0f} ms' for k, v in tiempos.items()))
+    return app
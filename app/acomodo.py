@@ -0,0 +1,104 @@
+"""Sugerencias para sentar grupos grandes juntando mesas.
+
+Las mesas de una misma ubicación con números consecutivos se consideran
+contiguas (así se numeran en el salón). Para cada ubicación se buscan:
+
+- tramos de mesas contiguas libres: con dos punteros, el tramo más corto que
+  alcanza desde cada mesa;
+- la combinación de mesas (aunque haya que moverlas) con menos lugares
+  sobrantes, por programación dinámica sobre la suma de capacidades.
+
+Se ordenan por lugares sobrantes, luego por número de mesas y prefiriendo las
+contiguas. Las mesas con una reserva dentro del tiempo estimado no cuentan.
+"""
+from datetime import timedelta
+
+from app.models import db, Mesa, get_mexico_time
+from app.reservas import indices
+
+
+def _tramos(mesas):
+    """Grupos de mesas con números consecutivos (ya ordenadas por número)"""
+    tramo = []
+    for mesa in mesas:
+        if tramo and mesa[1] != tramo[-1][1] + 1:
+            yield tramo
+            tramo = []
+        tramo.append(mesa)
+    if tramo:
+        yield tramo
+
+
+def _contiguas(tramo, personas):
+    """Para cada mesa inicial, el tramo más corto que alcanza (dos punteros)"""
+    fin, suma = 0, 0
+    for inicio in range(len(tramo)):
+        while fin < len(tramo) and suma < personas:
+            suma += tramo[fin][2]
+            fin += 1
+        if suma < personas:
+            break
+        yield tramo[inicio:fin]
+        suma -= tramo[inicio][2]
+
+
+def _mejor_combinacion(mesas, personas):
+    """Combinación con menos lugares sobrantes y, a igualdad, menos mesas"""
+    limite = personas + max(m[2] for m in mesas)
+    # mejor[s] = (número de mesas, índices) para sumar exactamente s lugares
+    mejor = {0: (0, ())}
+    for i, (_, _, capacidad, _) in enumerate(mesas):
+        for suma, (cuantas, usadas) in list(mejor.items()):
+            nueva = suma + capacidad
+            # Pasar de `personas` solo tiene sentido con una mesa más
+            if nueva > limite or suma >= personas:
+                continue
+            if nueva not in mejor or mejor[nueva][0] > cuantas + 1:
+                mejor[nueva] = (cuantas + 1, usadas + (i,))
+    for suma in range(personas, limite + 1):
+        if suma in mejor:
+            return [mesas[i] for i in mejor[suma][1]]
+    return None
+
+
+def _opcion(mesas, personas, contiguas):
+    capacidad = sum(m[2] for m in mesas)
+    return {
+        'ubicacion': mesas[0][3],
+        'mesas': [{'id': m[0], 'numero': m[1], 'capacidad': m[2]} for m in mesas],
+        'capacidad': capacidad,
+        'sobrantes': capacidad - personas,
+        'contiguas': contiguas,
+    }
+
+
+def sugerir(personas, ubicacion=None, minutos=120, maximo=5):
+    """Mejores formas de sentar a `personas` con las mesas disponibles ahora"""
+    consulta = db.session.query(Mesa.id, Mesa.numero, Mesa.capacidad, Mesa.ubicacion).filter(
+        Mesa.estado == 'disponible')
+    if ubicacion:
+        consulta = consulta.filter(Mesa.ubicacion == ubicacion)
+    ahora = get_mexico_time()
+    hasta = ahora + timedelta(minutes=minutos)
+    reservas = indices.obtener()
+    libres = [tuple(m) for m in consulta.order_by(Mesa.ubicacion, Mesa.numero)
+              if reservas.choque(m.id, ahora, hasta) is None]
+
+    por_ubicacion = {}
+    for mesa in libres:
+        por_ubicacion.setdefault(mesa[3], []).append(mesa)
+
+    opciones = {}
+    for mesas in por_ubicacion.values():
+        for tramo in _tramos(mesas):
+            for grupo in _contiguas(tramo, personas):
+                opciones.setdefault(frozenset(m[0] for m in grupo), _opcion(grupo, personas, True))
+        grupo = _mejor_combinacion(mesas, personas)
+        if grupo:
+            grupo.sort(key=lambda m: m[1])
+            contiguas = all(b[1] == a[1] + 1 for a, b in zip(grupo, grupo[1:]))
+            opciones.setdefault(frozenset(m[0] for m in grupo), _opcion(grupo, personas, contiguas))
+
+    ordenadas = sorted(opciones.values(),
+                       key=lambda o: (o['sobrantes'], len(o['mesas']), not o['contiguas']))
+    return ordenadas[:maximo]
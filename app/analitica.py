@@ -0,0 +1,379 @@
+"""Productos más vendidos y desempeño de meseros desde una copia columnar.
+
+Las comandas cobradas ya no cambian, así que se copian a archivos por columna
+(un arreglo binario por columna y sucursal, en ANALITICA_DIR, con un
+subdirectorio por base de datos) ordenados por día de negocio del pago:
+
+- detalles: día, mesero, producto, cantidad, importe (centavos)
+- comandas: día, mesero, total (centavos), productos, segundos hasta entregar
+
+Refrescar vuelve a leer los pagos desde ANALITICA_SOLAPE_DIAS días de negocio
+antes del último refresco (índice por `fecha_negocio`) y reemplaza esa cola de
+la copia, así un pago que confirmó tarde no se pierde y ninguna comanda se
+cuenta dos veces. Cada refresco escribe una generación nueva (un directorio con
+todas las columnas) y la publica reemplazando meta.json de una vez: un lector
+nunca mezcla columnas ni filas de dos refrescos.
+
+meta.json guarda también la identidad de la base (URL y primer pago de la
+sucursal): si no coincide, por ejemplo tras reiniciar la base, la copia se
+reconstruye completa.
+
+Las peticiones solo leen archivos: si la copia tiene más de ANALITICA_REFRESCO
+segundos, la refresca un hilo aparte y mientras tanto se sirve la anterior; si
+aún no existe, los reportes responden 503. La primera copia conviene crearla
+con `flask refrescar-analitica`. Los reportes ubican el rango de días con
+búsqueda binaria y agrupan con numpy (bincount sobre arreglos mapeados en
+memoria). Sin numpy funciona igual, agrupando en Python.
+"""
+import fcntl
+import hashlib
+import heapq
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+
+import click
+from flask import current_app
+from sqlalchemy import func, select
+
+from app.models import (db, Comanda, DetalleComanda, Evento, Pago, Producto, Usuario,
+                        SUCURSAL_PRINCIPAL, dia_negocio_actual)
+from app.sucursales import sucursal_actual
+
+try:
+    import numpy as np
+except ImportError:  # Opcional: sin numpy se agrupa en Python, más lento
+    np = None
+
+# Columna -> tipo de array ('i' int32, 'q' int64)
+COLUMNAS = {
+    'detalles': {'dia': 'i', 'mesero': 'i', 'producto': 'i', 'cantidad': 'i', 'importe': 'q'},
+    'comandas': {'dia': 'i', 'mesero': 'i', 'total': 'q', 'items': 'i', 'entrega': 'i'},
+}
+TIPOS_NUMPY = {'i': 'int32', 'q': 'int64'}
+LOTE = 50000
+
+logger = logging.getLogger(__name__)
+
+
+def _centavos(valor):
+    return int(round((valor or 0) * 100))
+
+
+class Instantanea:
+    """Copia de una sucursal: meta.json (generación vigente, identidad de la base,
+    filas y último día refrescado) y un directorio por generación con una columna
+    por archivo"""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.meta = self._leer_meta()
+
+    @property
+    def lista(self):
+        return self.meta['generacion'] is not None
+
+    def _ruta(self, nombre, generacion=None):
+        return os.path.join(self.directorio, generacion or self.meta['generacion'], nombre)
+
+    def _leer_meta(self):
+        try:
+            with open(os.path.join(self.directorio, 'meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'generacion': None, 'identidad': None, 'dia': 0,
+                    'filas': {tabla: 0 for tabla in COLUMNAS}, 'actualizada': 0}
+
+    def leer(self, tabla, columna):
+        """Columna completa: memoria mapeada con numpy, array en memoria sin él"""
+        filas = self.meta['filas'][tabla]
+        ruta = self._ruta(f'{tabla}.{columna}.bin')
+        tipo = COLUMNAS[tabla][columna]
+        if np is not None:
+            if not filas:
+                return np.zeros(0, dtype=TIPOS_NUMPY[tipo])
+            return np.memmap(ruta, dtype=TIPOS_NUMPY[tipo], mode='r', shape=(filas,))
+        datos = array(tipo)
+        if filas:
+            with open(ruta, 'rb') as f:
+                datos.fromfile(f, filas)
+        return datos
+
+    def nueva_generacion(self):
+        numero = int(self.meta['generacion'][1:]) + 1 if self.lista else 1
+        generacion = f'g{numero:06d}'
+        # Restos de un refresco que no llegó a publicarse
+        shutil.rmtree(os.path.join(self.directorio, generacion), ignore_errors=True)
+        os.makedirs(os.path.join(self.directorio, generacion))
+        return generacion
+
+    def escribir(self, generacion, tabla, conservar, filas):
+        """Escribir en `generacion` las primeras `conservar` filas de la vigente y después
+        `filas` (ordenadas por día); devuelve el total de filas"""
+        for i, (columna, tipo) in enumerate(COLUMNAS[tabla].items()):
+            nombre = f'{tabla}.{columna}.bin'
+            with open(self._ruta(nombre, generacion), 'wb') as f:
+                if conservar:
+                    with open(self._ruta(nombre), 'rb') as anterior:
+                        f.write(anterior.read(conservar * array(tipo).itemsize))
+                array(tipo, (fila[i] for fila in filas)).tofile(f)
+        return conservar + len(filas)
+
+    def publicar(self, generacion, **meta):
+        """Apuntar meta.json a `generacion` (un solo os.replace) y borrar las viejas"""
+        anterior = self.meta['generacion']
+        self.meta = dict(self.meta, generacion=generacion, **meta)
+        temporal = os.path.join(self.directorio, 'meta.json.tmp')
+        with open(temporal, 'w') as f:
+            json.dump(self.meta, f)
+        os.replace(temporal, os.path.join(self.directorio, 'meta.json'))
+        # La anterior se conserva: un lector pudo leer meta.json justo antes
+        for nombre in os.listdir(self.directorio):
+            if nombre.startswith('g') and nombre not in (generacion, anterior):
+                shutil.rmtree(os.path.join(self.directorio, nombre), ignore_errors=True)
+
+
+def _filas_desde(sucursal_id, desde):
+    """Comandas cobradas desde el día de negocio `desde` (todas con None) y sus detalles"""
+    entregada = (select(func.min(Evento.fecha))
+                 .where(Evento.sucursal_id == sucursal_id, Evento.entidad == 'comanda',
+                        Evento.entidad_id == Comanda.id, Evento.nuevo == 'entregada')
+                 .scalar_subquery())
+    ventana = [Pago.sucursal_id == sucursal_id]
+    if desde is not None:
+        ventana.append(Pago.fecha_negocio >= desde)
+    comandas = {}
+    resultado = db.session.execute(
+        select(Pago.fecha_negocio, Pago.monto, Comanda.id, Comanda.mesero_id,
+               Comanda.fecha_creacion, entregada)
+        .join(Comanda, Comanda.id == Pago.comanda_id)
+        .where(*ventana)
+        .order_by(Pago.fecha_negocio, Pago.id)
+        .execution_options(yield_per=LOTE, todas_sucursales=True)
+    )
+    for dia, monto, comanda_id, mesero_id, creada, entrega in resultado:
+        # Sin evento de entrega (comandas anteriores al historial) no cuenta en el promedio
+        segundos = int((entrega - creada).total_seconds()) if entrega and creada else -1
+        comandas.setdefault(comanda_id, [dia.toordinal(), mesero_id, _centavos(monto), 0, segundos])
+
+    detalles = []
+    if comandas:
+        resultado = db.session.execute(
+            select(DetalleComanda.comanda_id, DetalleComanda.producto_id, DetalleComanda.cantidad,
+                   DetalleComanda.subtotal)
+            .join(Pago, Pago.comanda_id == DetalleComanda.comanda_id)
+            .where(*ventana)
+            .execution_options(yield_per=LOTE, todas_sucursales=True)
+        )
+        for comanda_id, producto_id, cantidad, subtotal in resultado:
+            comanda = comandas.get(comanda_id)
+            if comanda is None:
+                # Pagada entre las dos consultas: entra en el siguiente refresco
+                continue
+            comanda[3] += cantidad
+            detalles.append((comanda[0], comanda[1], producto_id, cantidad, _centavos(subtotal)))
+
+    orden = lambda fila: fila[0]  # noqa: E731
+    return sorted(comandas.values(), key=orden), sorted(detalles, key=orden)
+
+
+def _identidad(sucursal_id):
+    """URL de la base y primer pago de la sucursal: cambia si se reinicia o se cambia la base"""
+    primero = db.session.execute(
+        select(Pago.id, Pago.fecha_pago).where(Pago.sucursal_id == sucursal_id)
+        .order_by(Pago.id).limit(1).execution_options(todas_sucursales=True)
+    ).first()
+    url = db.engine.url.render_as_string(hide_password=True)
+    return '|'.join(map(str, (url,) + (tuple(primero) if primero else ())))
+
+
+def directorio_de(sucursal_id):
+    """Directorio de la copia: uno por base de datos y sucursal"""
+    url = db.engine.url.render_as_string(hide_password=True)
+    base = hashlib.sha1(url.encode()).hexdigest()[:12]
+    return os.path.join(current_app.config['ANALITICA_DIR'], base, f'sucursal_{sucursal_id}')
+
+
+def refrescar(sucursal_id, directorio, completo=False, max_edad=None):
+    """Releer los días recientes (o todo si la base cambió); un proceso a la vez.
+
+    Con `max_edad` no hace nada si otro proceso la refrescó hace menos de esos
+    segundos (devuelve None).
+    """
+    os.makedirs(directorio, exist_ok=True)
+    with open(os.path.join(directorio, 'bloqueo'), 'w') as bloqueo:
+        fcntl.flock(bloqueo, fcntl.LOCK_EX)
+        instantanea = Instantanea(directorio)
+        if max_edad is not None and time.time() - instantanea.meta['actualizada'] < max_edad:
+            return None
+        identidad = _identidad(sucursal_id)
+        completo = completo or instantanea.meta.get('identidad') != identidad
+        # El día se toma antes de leer: lo confirmado después cae dentro del siguiente solape
+        hoy = dia_negocio_actual()
+        desde = None
+        if not completo:
+            desde = (date.fromordinal(instantanea.meta['dia'])
+                     - timedelta(days=current_app.config['ANALITICA_SOLAPE_DIAS']))
+        comandas, detalles = _filas_desde(sucursal_id, desde)
+        generacion = instantanea.nueva_generacion()
+        totales = {}
+        for tabla, filas in (('comandas', comandas), ('detalles', detalles)):
+            # Las filas desde `desde` se reemplazan: así no se duplica ninguna comanda
+            conservar = 0 if completo else _rango(instantanea.leer(tabla, 'dia'), desde, date.max)[0]
+            totales[tabla] = instantanea.escribir(generacion, tabla, conservar, filas)
+        instantanea.publicar(generacion, identidad=identidad, dia=hoy.toordinal(), filas=totales,
+                             actualizada=time.time())
+        return len(comandas)
+
+
+# ============ CONSULTAS ============
+
+def _rango(dias, desde, hasta):
+    if np is not None:
+        return (int(np.searchsorted(dias, desde.toordinal(), 'left')),
+                int(np.searchsorted(dias, hasta.toordinal(), 'right')))
+    return bisect_left(dias, desde.toordinal()), bisect_right(dias, hasta.toordinal())
+
+
+def _sumas(claves, *valores):
+    """{clave: [n, suma de cada valor]} agrupando en bloque"""
+    if np is not None:
+        claves = np.asarray(claves)
+        if not len(claves):
+            return {}
+        conteo = np.bincount(claves)
+        sumas = [np.bincount(claves, weights=np.asarray(v, dtype='float64')) for v in valores]
+        presentes = np.nonzero(conteo)[0]
+        return {int(k): [int(conteo[k])] + [int(s[k]) for s in sumas] for k in presentes}
+    grupos = {}
+    for i, clave in enumerate(claves):
+        grupo = grupos.get(clave)
+        if grupo is None:
+            grupo = grupos[clave] = [0] + [0] * len(valores)
+        grupo[0] += 1
+        for j, v in enumerate(valores, 1):
+            grupo[j] += v[i]
+    return grupos
+
+
+def _filtrar(mascara_de, columnas):
+    if np is not None:
+        mascara = mascara_de(np)
+        return [c[mascara] for c in columnas]
+    indices = [i for i, ok in enumerate(mascara_de(None)) if ok]
+    return [[c[i] for i in indices] for c in columnas]
+
+
+def productos_mas_vendidos(instantanea, desde, hasta, limite=20, mesero_id=None):
+    dias = instantanea.leer('detalles', 'dia')
+    i, j = _rango(dias, desde, hasta)
+    productos = instantanea.leer('detalles', 'producto')[i:j]
+    cantidades = instantanea.leer('detalles', 'cantidad')[i:j]
+    importes = instantanea.leer('detalles', 'importe')[i:j]
+    if mesero_id is not None:
+        meseros = instantanea.leer('detalles', 'mesero')[i:j]
+        productos, cantidades, importes = _filtrar(
+            lambda np_: meseros == mesero_id if np_ else (m == mesero_id for m in meseros),
+            [productos, cantidades, importes])
+    grupos = _sumas(productos, cantidades, importes)
+    mejores = heapq.nlargest(limite, grupos.items(), key=lambda g: (g[1][1], g[1][2]))
+    nombres = dict(db.session.query(Producto.id, Producto.nombre).filter(
+        Producto.id.in_([p for p, _ in mejores])))
+    return [{
+        'producto_id': producto_id,
+        'nombre': nombres.get(producto_id),
+        'cantidad': cantidad,
+        'importe': importe / 100,
+        'lineas': lineas,
+    } for producto_id, (lineas, cantidad, importe) in mejores]
+
+
+def desempeno_meseros(instantanea, desde, hasta):
+    dias = instantanea.leer('comandas', 'dia')
+    i, j = _rango(dias, desde, hasta)
+    meseros = instantanea.leer('comandas', 'mesero')[i:j]
+    totales = instantanea.leer('comandas', 'total')[i:j]
+    items = instantanea.leer('comandas', 'items')[i:j]
+    entregas = instantanea.leer('comandas', 'entrega')[i:j]
+    grupos = _sumas(meseros, totales, items)
+    # El tiempo de entrega solo promedia las comandas donde se conoce
+    con_entrega = _sumas(*_filtrar(
+        lambda np_: entregas >= 0 if np_ else (e >= 0 for e in entregas), [meseros, entregas]))
+    nombres = dict(db.session.query(Usuario.id, Usuario.nombre).filter(Usuario.id.in_(list(grupos))))
+    resultado = []
+    for mesero_id, (comandas, ventas, productos) in grupos.items():
+        entregadas, segundos = con_entrega.get(mesero_id, (0, 0))
+        resultado.append({
+            'mesero_id': mesero_id,
+            'nombre': nombres.get(mesero_id),
+            'comandas': comandas,
+            'ventas': ventas / 100,
+            'ticket_promedio': round(ventas / comandas / 100, 2),
+            'productos_por_comanda': round(productos / comandas, 2),
+            'minutos_entrega': round(segundos / entregadas / 60, 1) if entregadas else None,
+        })
+    resultado.sort(key=lambda m: m['ventas'], reverse=True)
+    return resultado
+
+
+class _Instantaneas:
+    """Instantánea por sucursal (None si aún no hay). Solo lee meta.json: si pasaron
+    ANALITICA_REFRESCO segundos, la refresca un hilo aparte."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refrescando = set()
+
+    def obtener(self):
+        sucursal_id = sucursal_actual() or SUCURSAL_PRINCIPAL
+        directorio = directorio_de(sucursal_id)
+        instantanea = Instantanea(directorio)
+        max_edad = current_app.config['ANALITICA_REFRESCO']
+        if time.time() - instantanea.meta['actualizada'] >= max_edad:
+            self._refrescar(sucursal_id, directorio, max_edad)
+        return instantanea if instantanea.lista else None
+
+    def _refrescar(self, sucursal_id, directorio, max_edad):
+        with self._lock:
+            if directorio in self._refrescando:
+                return
+            self._refrescando.add(directorio)
+        app = current_app._get_current_object()
+
+        def refrescar_en_segundo_plano():
+            try:
+                with app.app_context():
+                    inicio = time.perf_counter()
+                    n = refrescar(sucursal_id, directorio, max_edad=max_edad)
+                    if n is not None:
+                        logger.info('Analítica de la sucursal %s: %s comandas leídas en %.1fs',
+                                    sucursal_id, n, time.perf_counter() - inicio)
+            except Exception:
+                logger.exception('No se pudo refrescar la analítica de la sucursal %s', sucursal_id)
+            finally:
+                with self._lock:
+                    self._refrescando.discard(directorio)
+
+        threading.Thread(target=refrescar_en_segundo_plano, name=f'analitica-{sucursal_id}',
+                         daemon=True).start()
+
+
+instantaneas = _Instantaneas()
+
+
+def registrar_analitica(app):
+    @app.cli.command('refrescar-analitica')
+    @click.option('--completo', is_flag=True, help='Reconstruir desde el primer pago')
+    def refrescar_analitica(completo):
+        """Copiar las ventas cobradas a los archivos columnares de cada sucursal"""
+        from app.models import Sucursal
+        for sucursal in Sucursal.query.order_by(Sucursal.id):
+            inicio = time.perf_counter()
+            n = refrescar(sucursal.id, directorio_de(sucursal.id), completo)
+            click.echo(f'{sucursal.nombre}: {n} comandas leídas en {time.perf_counter() - inicio:.1f}s')
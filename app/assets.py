@@ -0,0 +1,84 @@
+"""CSS/JS empaquetados por `build_assets.py` y servidos desde la red local.
+
+`build_assets.py` descarga Bootstrap, Bootstrap Icons y jQuery a
+app/static/vendor, concatena cada paquete, le pone el hash del contenido en el
+nombre y deja variantes .gz/.br en app/static/dist junto con manifest.json.
+Como el nombre cambia con el contenido, el navegador puede guardarlos un año
+sin volver a preguntar. Sin build (desarrollo) las plantillas usan los CDN.
+"""
+import json
+import mimetypes
+import os
+
+from flask import abort, current_app, request, send_from_directory, url_for
+
+DIRECTORIO_STATIC = os.path.join(os.path.dirname(__file__), 'static')
+DIRECTORIO_DIST = os.path.join(DIRECTORIO_STATIC, 'dist')
+DIRECTORIO_VENDOR = os.path.join(DIRECTORIO_STATIC, 'vendor')
+
+# Paquete -> fuentes en orden: URL de CDN (se guarda en vendor/) o ruta dentro de static/
+PAQUETES = {
+    'app.css': [
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.0/font/bootstrap-icons.css',
+        'style.css',
+    ],
+    'app.js': [
+        'https://code.jquery.com/jquery-3.7.0.min.js',
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+    ],
+}
+
+# Variantes precomprimidas, en orden de preferencia
+CODIFICACIONES = (('br', '.br'), ('gzip', '.gz'))
+
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def es_url(fuente):
+    return fuente.startswith(('http://', 'https://'))
+
+
+def cargar_manifiesto(directorio=DIRECTORIO_DIST):
+    try:
+        with open(os.path.join(directorio, 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def urls_paquete(nombre):
+    """URLs a incluir en la página para un paquete (una sola si hay build)"""
+    manifiesto = current_app.extensions.get('assets')
+    if manifiesto and nombre in manifiesto:
+        return [url_for('assets', nombre=manifiesto[nombre])]
+    return [fuente if es_url(fuente) else url_for('static', filename=fuente)
+            for fuente in PAQUETES[nombre]]
+
+
+def servir_asset(nombre):
+    """Servir un archivo de dist/ con la variante comprimida que acepte el cliente"""
+    if nombre == 'manifest.json' or nombre.endswith(tuple(ext for _, ext in CODIFICACIONES)):
+        abort(404)
+    mimetype = mimetypes.guess_type(nombre)[0] or 'application/octet-stream'
+    respuesta = None
+    for codificacion, extension in CODIFICACIONES:
+        ruta = os.path.join(DIRECTORIO_DIST, nombre + extension)
+        if request.accept_encodings.quality(codificacion) > 0 and os.path.isfile(ruta):
+            respuesta = send_from_directory(DIRECTORIO_DIST, nombre + extension, mimetype=mimetype)
+            respuesta.headers['Content-Encoding'] = codificacion
+            break
+    if respuesta is None:
+        respuesta = send_from_directory(DIRECTORIO_DIST, nombre, mimetype=mimetype)
+    respuesta.headers['Cache-Control'] = CACHE_INMUTABLE
+    respuesta.headers['Vary'] = 'Accept-Encoding'
+    return respuesta
+
+
+def registrar_assets(app):
+    app.extensions['assets'] = cargar_manifiesto()
+    if app.extensions['assets'] is None and not app.debug:
+        app.logger.warning('Sin app/static/dist/manifest.json: se usan los CDN '
+                           '(ejecutar python build_assets.py)')
+    app.add_url_rule('/assets/<path:nombre>', 'assets', servir_asset)
+    app.jinja_env.globals['urls_paquete'] = urls_paquete
@@ -0,0 +1,272 @@
+"""Caché compartida entre workers con invalidación por versión de datos.
+
+    from app.cache import cacheado
+
+    @cacheado('mesas')
+    def _estado_mesas():
+        ...
+
+La clave lleva el nombre de la función, sus argumentos, la sucursal y la
+versión de cada conjunto de `app.versiones`. Esas versiones viven en la base
+y toda escritura las sube (flush del ORM, o incrementar_version en los UPDATE
+masivos), así que hacen de bus de invalidación entre workers y servidores:
+nada se borra a mano, las entradas viejas dejan de leerse y caducan por TTL.
+
+Backends (CACHE_BACKEND):
+
+- `memoria`: LRU con TTL en el proceso, cada worker la suya.
+- `archivo`: un archivo SQLite (CACHE_ARCHIVO) que comparten los workers del
+  mismo servidor.
+- `base`: la tabla `cache_entradas` de la base principal (UNLOGGED en
+  PostgreSQL), compartida por todos los servidores.
+
+Los backends compartidos guardan con pickle: solo datos simples (dicts,
+listas, str). La caché nunca rompe una petición: un error cuenta como fallo.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+import click
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.metricas import metricas
+from app.models import db, EntradaCache
+from app.sucursales import sucursal_actual
+from app.versiones import leer_versiones
+
+logger = logging.getLogger(__name__)
+
+FALTA = object()
+# Cada cuántas escrituras se borran las entradas caducadas de los backends compartidos
+PODAR_CADA = 200
+
+
+class MemoriaLRU:
+    """LRU con TTL en memoria del proceso (guarda el objeto: no modificarlo)"""
+
+    nombre = 'memoria'
+
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self._lock = threading.Lock()
+        self._datos = OrderedDict()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return FALTA
+            valor, expira = entrada
+            if expira < time.time():
+                del self._datos[clave]
+                return FALTA
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor, ttl):
+        with self._lock:
+            self._datos[clave] = (valor, time.time() + ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def estado(self):
+        return {'backend': self.nombre, 'entradas': len(self._datos), 'maximo': self.maximo}
+
+
+class ArchivoSQLite:
+    """Archivo SQLite en WAL compartido por los procesos del servidor"""
+
+    nombre = 'archivo'
+
+    def __init__(self, ruta, maximo):
+        self.ruta = ruta
+        self.maximo = maximo
+        self._local = threading.local()
+        self._escrituras = 0
+        self._conexion().execute(
+            'CREATE TABLE IF NOT EXISTS cache '
+            '(clave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira REAL NOT NULL)')
+
+    def _conexion(self):
+        # Una conexión por hilo y por proceso: no se heredan por fork de gunicorn
+        pid, conexion = getattr(self._local, 'conexion', (None, None))
+        if pid != os.getpid():
+            conexion = sqlite3.connect(self.ruta, timeout=0.5, isolation_level=None,
+                                       check_same_thread=False)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=OFF')
+            self._local.conexion = (os.getpid(), conexion)
+        return conexion
+
+    def obtener(self, clave):
+        fila = self._conexion().execute(
+            'SELECT valor FROM cache WHERE clave = ? AND expira >= ?', (clave, time.time())).fetchone()
+        return FALTA if fila is None else pickle.loads(fila[0])
+
+    def guardar(self, clave, valor, ttl):
+        conexion = self._conexion()
+        ahora = time.time()
+        conexion.execute('INSERT OR REPLACE INTO cache (clave, valor, expira) VALUES (?, ?, ?)',
+                         (clave, pickle.dumps(valor, pickle.HIGHEST_PROTOCOL), ahora + ttl))
+        self._escrituras += 1
+        if self._escrituras % PODAR_CADA == 0:
+            conexion.execute('DELETE FROM cache WHERE expira < ?', (ahora,))
+            # Si aún sobran, fuera las que caducan antes
+            conexion.execute('DELETE FROM cache WHERE clave IN (SELECT clave FROM cache '
+                             'ORDER BY expira DESC LIMIT -1 OFFSET ?)', (self.maximo,))
+
+    def limpiar(self):
+        self._conexion().execute('DELETE FROM cache')
+
+    def estado(self):
+        entradas = self._conexion().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        return {'backend': self.nombre, 'archivo': self.ruta, 'entradas': entradas,
+                'maximo': self.maximo}
+
+
+class BaseDatos:
+    """Tabla `cache_entradas` de la base principal, con conexiones propias (fuera de db.session)"""
+
+    nombre = 'base'
+
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self._escrituras = 0
+
+    def obtener(self, clave):
+        tabla = EntradaCache.__table__
+        with db.engine.connect() as conexion:
+            valor = conexion.execute(
+                select(tabla.c.valor).where(tabla.c.clave == clave, tabla.c.expira >= time.time())
+            ).scalar()
+        return FALTA if valor is None else pickle.loads(valor)
+
+    def guardar(self, clave, valor, ttl):
+        tabla = EntradaCache.__table__
+        dialecto = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+        fila = {'clave': clave, 'valor': pickle.dumps(valor, pickle.HIGHEST_PROTOCOL),
+                'expira': time.time() + ttl}
+        sentencia = dialecto.insert(tabla).values(fila)
+        sentencia = sentencia.on_conflict_do_update(
+            index_elements=['clave'],
+            set_={'valor': sentencia.excluded.valor, 'expira': sentencia.excluded.expira})
+        with db.engine.begin() as conexion:
+            conexion.execute(sentencia)
+            self._escrituras += 1
+            if self._escrituras % PODAR_CADA == 0:
+                conexion.execute(delete(tabla).where(tabla.c.expira < time.time()))
+
+    def limpiar(self):
+        with db.engine.begin() as conexion:
+            conexion.execute(delete(EntradaCache.__table__))
+
+    def estado(self):
+        return {'backend': self.nombre, 'maximo': self.maximo}
+
+
+def _clave(clave):
+    # Claves largas (argumentos) caben en la columna como hash
+    if len(clave) > 200:
+        return clave[:100] + ':' + hashlib.sha1(clave.encode()).hexdigest()
+    return clave
+
+
+class Cache:
+    """Fachada sobre el backend configurado, con métricas de aciertos y fallos"""
+
+    def __init__(self):
+        self.backend = MemoriaLRU(1024)
+        self.ttl = 600
+
+    def configurar(self, app):
+        tipo = app.config['CACHE_BACKEND']
+        maximo = app.config['CACHE_MAX']
+        if tipo == 'archivo':
+            self.backend = ArchivoSQLite(app.config['CACHE_ARCHIVO'], maximo)
+        elif tipo == 'base':
+            self.backend = BaseDatos(maximo)
+        elif tipo == 'memoria':
+            self.backend = MemoriaLRU(maximo)
+        else:
+            raise ValueError(f'CACHE_BACKEND desconocido: {tipo}')
+        self.ttl = app.config['CACHE_TTL']
+
+    def obtener(self, clave, nombre=None):
+        """Valor guardado o FALTA; con `nombre` cuenta cache.<nombre>.aciertos/fallos"""
+        try:
+            valor = self.backend.obtener(_clave(clave))
+        except Exception as e:
+            metricas.incrementar('cache.errores')
+            logger.warning('Caché %s sin respuesta: %s', self.backend.nombre, e)
+            valor = FALTA
+        resultado = 'fallos' if valor is FALTA else 'aciertos'
+        metricas.incrementar(f'cache.{resultado}')
+        if nombre:
+            metricas.incrementar(f'cache.{nombre}.{resultado}')
+        return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        try:
+            self.backend.guardar(_clave(clave), valor, ttl or self.ttl)
+        except Exception as e:
+            metricas.incrementar('cache.errores')
+            logger.warning('Caché %s sin respuesta: %s', self.backend.nombre, e)
+
+    def limpiar(self):
+        self.backend.limpiar()
+
+
+cache = Cache()
+
+
+def clave_versionada(nombre, conjuntos, *partes):
+    """Clave con la sucursal y la versión actual de cada conjunto de datos.
+
+    La versión se lee del primario (sin la copia por proceso, que puede tener
+    hasta un segundo) antes de consultar los datos: lo que se guarde es al menos
+    tan nuevo como la clave, y un cambio confirmado invalida la siguiente lectura.
+    """
+    leidas = leer_versiones(*conjuntos)
+    versiones = tuple(leidas[c] for c in conjuntos)
+    return ':'.join(map(str, (nombre, sucursal_actual()) + versiones + partes))
+
+
+def cacheado(*conjuntos, nombre=None, ttl=None):
+    """Decorador: guardar el resultado mientras no cambien los conjuntos indicados"""
+    def decorador(f):
+        etiqueta = nombre or f'{f.__module__}.{f.__qualname__}'
+
+        @wraps(f)
+        def envuelta(*args, **kwargs):
+            clave = clave_versionada(etiqueta, conjuntos, *args, *sorted(kwargs.items()))
+            valor = cache.obtener(clave, etiqueta)
+            if valor is FALTA:
+                valor = f(*args, **kwargs)
+                cache.guardar(clave, valor, ttl)
+            return valor
+        return envuelta
+    return decorador
+
+
+def registrar_cache(app):
+    cache.configurar(app)
+    metricas.registrar_medidor('cache', lambda: cache.backend.estado())
+
+    @app.cli.command('limpiar-cache')
+    def limpiar_cache():
+        """Vaciar la caché compartida"""
+        cache.limpiar()
+        click.echo(f'Caché {cache.backend.nombre} vacía')
@@ -0,0 +1,202 @@
+import logging
+import time
+from functools import wraps
+
+from flask import g, request, session, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app.metricas import metricas
+
+logger = logging.getLogger(__name__)
+
+
+class PoolConTelemetria(QueuePool):
+    """QueuePool que mide cuánto espera cada petición por una conexión"""
+
+    nombre = 'default'
+    aviso_ms = None
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metricas.incrementar(f'db.{self.nombre}.pool_timeouts')
+            raise
+        except Exception:
+            metricas.incrementar(f'db.{self.nombre}.errores_conexion')
+            raise
+        finally:
+            espera = (time.perf_counter() - inicio) * 1000.0
+            metricas.observar(f'db.{self.nombre}.espera_checkout', espera)
+            if self.aviso_ms is not None and espera >= self.aviso_ms:
+                logger.warning(
+                    'Pool %s saturado: %.0f ms esperando conexión (%s)',
+                    self.nombre, espera, self.status()
+                )
+
+
+def opciones_engine(config, url, nombre='default'):
+    """Construir SQLALCHEMY_ENGINE_OPTIONS a partir de la configuración DB_*"""
+    opciones = {'query_cache_size': config['DB_STATEMENT_CACHE_SIZE']}
+    if not url or make_url(url).get_backend_name() == 'sqlite':
+        # SQLite usa los pools por defecto de Flask-SQLAlchemy
+        return opciones
+
+    opciones['pool_pre_ping'] = config['DB_POOL_PRE_PING']
+    opciones['connect_args'] = {
+        'connect_timeout': config['DB_CONNECT_TIMEOUT'],
+        'application_name': 'restaurant-pos',
+    }
+
+    modo = config['DB_POOL_MODE']
+    if modo in ('pgbouncer', 'null'):
+        # PgBouncer en modo transacción ya comparte las conexiones; un pool propio
+        # solo retendría conexiones del servidor. Nada de estado de sesión: los
+        # SET deben ser SET LOCAL dentro de la transacción.
+        opciones['poolclass'] = NullPool
+    else:
+        pool = type('PoolConTelemetria', (PoolConTelemetria,), {
+            'nombre': nombre,
+            'aviso_ms': config['DB_POOL_WAIT_WARN_MS'],
+        })
+        opciones.update({
+            'poolclass': pool,
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT'],
+            'pool_recycle': config['DB_POOL_RECYCLE'],
+        })
+    return opciones
+
+
+def configurar_pool(app):
+    """Aplicar las opciones de pool antes de db.init_app"""
+    opciones = opciones_engine(app.config, app.config.get('SQLALCHEMY_DATABASE_URI'))
+    opciones.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opciones
+
+
+def estado_pool(engine):
+    pool = engine.pool
+    datos = {'clase': type(pool).__name__, 'estado': pool.status()}
+    if isinstance(pool, QueuePool):
+        capacidad = pool.size() + pool._max_overflow
+        en_uso = pool.checkedout()
+        datos.update({
+            'tamano': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'en_uso': en_uso,
+            'libres': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'saturacion': round(en_uso / capacidad, 3) if capacidad > 0 else None,
+        })
+    return datos
+
+
+def registrar_telemetria(app, db):
+    """Contar conexiones abiertas/prestadas y exponer el estado de los pools"""
+    with app.app_context():
+        engines = dict(db.engines)
+
+    for clave, engine in engines.items():
+        nombre = clave or 'default'
+
+        @event.listens_for(engine, 'connect')
+        def al_conectar(dbapi_con, registro, nombre=nombre):
+            metricas.incrementar(f'db.{nombre}.conexiones_nuevas')
+
+        @event.listens_for(engine, 'checkout')
+        def al_prestar(dbapi_con, registro, proxy, nombre=nombre):
+            metricas.incrementar(f'db.{nombre}.checkouts')
+
+        @event.listens_for(engine, 'invalidate')
+        def al_invalidar(dbapi_con, registro, excepcion, nombre=nombre):
+            metricas.incrementar(f'db.{nombre}.invalidadas')
+
+    metricas.registrar_medidor('pools', lambda: {
+        (clave or 'default'): estado_pool(engine) for clave, engine in engines.items()
+    })
+
+
+# ============ RÉPLICA DE LECTURA ============
+
+def usa_replica():
+    """¿La petición actual puede leer de la réplica?"""
+    if not has_request_context() or not g.get('db_replica'):
+        return False
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # Lectura de lo propio: tras escribir, el usuario lee del primario un rato
+    return session.get('_db_primario_hasta', 0) < time.time()
+
+
+class SesionEnrutada(Session):
+    """Sesión que manda las lecturas marcadas a la réplica y todo lo demás al primario"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and usa_replica()
+                and 'replica' in self._db.engines and _es_lectura(clause)):
+            metricas.incrementar('db.replica.lecturas')
+            return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _es_lectura(clause):
+    if clause is None:
+        return True
+    if getattr(clause, 'is_dml', False):
+        return False
+    # SELECT ... FOR UPDATE bloquea filas: solo en el primario
+    return getattr(clause, '_for_update_arg', None) is None
+
+
+def enrutar_a_replica():
+    """Marcar la petición actual como de solo lectura (usar dentro de una vista)"""
+    g.db_replica = True
+
+
+def registrar_escritura():
+    """Marcar que la petición escribió: las escrituras sin flush del ORM (UPDATE
+    masivos) deben llamarla para que la lectura propia vaya al primario"""
+    if has_request_context():
+        g.db_escribio = True
+
+
+def lectura_replica(f):
+    """Decorador: la vista solo lee y tolera el retraso de la réplica"""
+    @wraps(f)
+    def decorado(*args, **kwargs):
+        enrutar_a_replica()
+        return f(*args, **kwargs)
+    return decorado
+
+
+def configurar_replica(app):
+    """Registrar el bind 'replica' (antes de db.init_app) si hay DATABASE_REPLICA_URL"""
+    url = app.config.get('SQLALCHEMY_REPLICA_URI')
+    if not url:
+        return
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    binds['replica'] = {'url': url, **opciones_engine(app.config, url, 'replica')}
+
+
+def marcar_escritura(sesion, contexto):
+    registrar_escritura()
+
+
+def registrar_lectura_propia(app, db):
+    """Tras una petición que escribió, fijar al usuario al primario unos segundos"""
+    segundos = app.config['DB_REPLICA_STICKY_SECONDS']
+    # El listener es de la clase: una sola vez aunque se creen varias apps
+    if not event.contains(SesionEnrutada, 'after_flush', marcar_escritura):
+        event.listen(SesionEnrutada, 'after_flush', marcar_escritura)
+
+    @app.after_request
+    def fijar_primario(respuesta):
+        if g.get('db_escribio') and 'replica' in db.engines:
+            session['_db_primario_hasta'] = time.time() + segundos
+        return respuesta
@@ -0,0 +1,122 @@
+"""Tickets por estación de cocina y orden en que conviene prepararlos.
+
+Cada comanda activa se parte en un ticket por estación con sus productos. Un
+ticket tarda lo que su producto más lento; la comanda queda lista cuando
+termina su ticket más lento, así que cada ticket tiene una hora límite para
+empezar (creación + duración de la comanda - duración del ticket). Cada
+estación atiende sus tickets por esa hora límite: los rápidos (una ensalada)
+esperan a que el lento (la arrachera) avance y todo sale junto a la mesa.
+
+Las colas son montículos (heapq) en memoria del proceso, por sucursal. Se
+reconstruyen desde la base al primer uso y cuando cambia la versión de
+`comandas`, con una sola consulta.
+"""
+import heapq
+import threading
+from datetime import timedelta
+
+from sqlalchemy import select
+
+from app.models import db, Comanda, DetalleComanda, Mesa, Producto, a_hora_local
+from app.sucursales import sucursal_actual
+from app.versiones import versiones_recientes
+
+ESTACIONES = ('parrilla', 'fria', 'bar')
+# Solo se cocinan las comandas que aún no están listas
+ESTADOS_EN_COCINA = ('pendiente', 'en_preparacion')
+
+
+class Ticket:
+    __slots__ = ('comanda_id', 'mesa', 'estado', 'estacion', 'creada', 'items', 'minutos',
+                 'empezar_antes')
+
+    def __init__(self, comanda_id, mesa, estado, estacion, creada):
+        self.comanda_id = comanda_id
+        self.mesa = mesa
+        self.estado = estado
+        self.estacion = estacion
+        self.creada = creada
+        self.items = []
+        self.minutos = 0
+        self.empezar_antes = None
+
+    def como_dict(self):
+        return {
+            'comanda_id': self.comanda_id,
+            'mesa': self.mesa,
+            'estado': self.estado,
+            'minutos': self.minutos,
+            'empezar_antes': a_hora_local(self.empezar_antes).isoformat(),
+            'items': [{'producto': nombre, 'cantidad': cantidad, 'observaciones': obs}
+                      for nombre, cantidad, obs in self.items],
+        }
+
+
+def armar_colas(filas):
+    """Montículo por estación a partir de (comanda, mesa, estado, creada, producto,
+    cantidad, observaciones, estación, minutos)"""
+    tickets = {}
+    for comanda_id, mesa, estado, creada, nombre, cantidad, obs, estacion, minutos in filas:
+        ticket = tickets.get((comanda_id, estacion))
+        if ticket is None:
+            ticket = tickets[(comanda_id, estacion)] = Ticket(comanda_id, mesa, estado, estacion, creada)
+        ticket.items.append((nombre, cantidad, obs))
+        ticket.minutos = max(ticket.minutos, minutos or 0)
+
+    duracion_comanda = {}
+    for (comanda_id, _), ticket in tickets.items():
+        duracion_comanda[comanda_id] = max(duracion_comanda.get(comanda_id, 0), ticket.minutos)
+
+    colas = {estacion: [] for estacion in ESTACIONES}
+    for ticket in tickets.values():
+        holgura = duracion_comanda[ticket.comanda_id] - ticket.minutos
+        ticket.empezar_antes = ticket.creada + timedelta(minutes=holgura)
+        colas.setdefault(ticket.estacion, []).append(
+            (ticket.empezar_antes, ticket.creada, ticket.comanda_id, ticket))
+    for cola in colas.values():
+        heapq.heapify(cola)
+    return colas
+
+
+def _cargar():
+    return db.session.execute(
+        select(Comanda.id, Mesa.numero, Comanda.estado, Comanda.fecha_creacion, Producto.nombre,
+               DetalleComanda.cantidad, DetalleComanda.observaciones, Producto.estacion,
+               Producto.tiempo_preparacion)
+        .join(Mesa, Mesa.id == Comanda.mesa_id)
+        .join(DetalleComanda, DetalleComanda.comanda_id == Comanda.id)
+        .join(Producto, Producto.id == DetalleComanda.producto_id)
+        .where(Comanda.estado.in_(ESTADOS_EN_COCINA))
+        .order_by(DetalleComanda.id)
+    ).all()
+
+
+class Planificador:
+    """Colas por estación y sucursal, válidas para una versión de `comandas`"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._colas = {}
+
+    def colas(self):
+        version = versiones_recientes.obtener('comandas')
+        sucursal = sucursal_actual()
+        guardado = self._colas.get(sucursal)
+        if guardado is not None and guardado[0] == version:
+            return guardado[1]
+        with self._lock:
+            guardado = self._colas.get(sucursal)
+            if guardado is None or guardado[0] != version:
+                guardado = (version, armar_colas(_cargar()))
+                self._colas[sucursal] = guardado
+        return guardado[1]
+
+    def cola(self, estacion, limite=None):
+        """Tickets de la estación en el orden en que hay que empezarlos"""
+        cola = self.colas().get(estacion, [])
+        n = len(cola) if limite is None else limite
+        # nsmallest no modifica el montículo compartido entre peticiones
+        return [entrada[3] for entrada in heapq.nsmallest(n, cola)]
+
+
+planificador = Planificador()
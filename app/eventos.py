@@ -0,0 +1,76 @@
+"""Historial de cambios de estado de mesas y comandas.
+
+No hay que llamar nada desde las vistas: después de cada flush se revisan los
+objetos modificados y los cambios de `Mesa.estado`, `Comanda.estado` (también
+al crearla) y los pagos nuevos se escriben con un solo INSERT de varias filas,
+en la misma transacción. Si la transacción se revierte, el evento también.
+"""
+from flask import g, has_request_context
+from sqlalchemy import event, inspect, insert
+
+from app.database import SesionEnrutada
+from app.models import db, Comanda, Evento, Mesa, Pago, get_utc_time
+
+ENTIDADES = {Mesa: 'mesa', Comanda: 'comanda'}
+
+
+def _usuario_actual():
+    # Solo el usuario ya cargado por flask_login: consultarlo aquí haría otro flush
+    if not has_request_context():
+        return None
+    usuario = g.get('_login_user')
+    return usuario.id if usuario is not None and usuario.is_authenticated else None
+
+
+def _eventos_del_flush(sesion):
+    filas = []
+    for obj in list(sesion.new) + list(sesion.dirty):
+        if isinstance(obj, Pago) and obj in sesion.new:
+            filas.append({'sucursal_id': obj.sucursal_id, 'entidad': 'comanda',
+                          'entidad_id': obj.comanda_id, 'anterior': None, 'nuevo': 'pagada'})
+            continue
+        entidad = ENTIDADES.get(type(obj))
+        if entidad is None:
+            continue
+        historial = inspect(obj).attrs.estado.history
+        if not historial.added:
+            continue
+        anterior = historial.deleted[0] if historial.deleted else None
+        nuevo = historial.added[0]
+        if anterior == nuevo:
+            continue
+        filas.append({'sucursal_id': obj.sucursal_id, 'entidad': entidad, 'entidad_id': obj.id,
+                      'anterior': anterior, 'nuevo': nuevo})
+    return filas
+
+
+def _despues_de_flush(sesion, contexto):
+    filas = _eventos_del_flush(sesion)
+    if not filas:
+        return
+    comunes = {'usuario_id': _usuario_actual(), 'fecha': get_utc_time()}
+    for fila in filas:
+        fila.update(comunes)
+    conexion = sesion.connection(bind_arguments={'mapper': Evento})
+    conexion.execute(insert(Evento.__table__).values(filas))
+
+
+def registrar_cambios(entidad, cambios, nuevo):
+    """Eventos de un cambio hecho con UPDATE masivo, que no pasa por el flush.
+
+    `cambios` son tuplas (sucursal_id, id, estado anterior).
+    """
+    if not cambios:
+        return
+    comunes = {'entidad': entidad, 'nuevo': nuevo, 'usuario_id': _usuario_actual(),
+               'fecha': get_utc_time()}
+    conexion = db.session.connection(bind_arguments={'mapper': Evento})
+    conexion.execute(insert(Evento.__table__).values([
+        {'sucursal_id': sucursal_id, 'entidad_id': id, 'anterior': anterior, **comunes}
+        for sucursal_id, id, anterior in cambios
+    ]))
+
+
+def registrar_eventos():
+    if not event.contains(SesionEnrutada, 'after_flush', _despues_de_flush):
+        event.listen(SesionEnrutada, 'after_flush', _despues_de_flush)
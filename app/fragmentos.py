@@ -0,0 +1,66 @@
+"""Caché de fragmentos de plantilla por versión de datos.
+
+    {% cache 'menu-grid', 'menu' %}
+        ... bucles sobre categorías y productos ...
+    {% endcache %}
+
+El primer argumento nombra el fragmento y los demás son conjuntos de
+`app.versiones` (mesas, comandas, menu). La clave incluye la sucursal y la
+versión actual de cada conjunto, así que cualquier escritura que los toque
+invalida el fragmento sin tener que borrarlo a mano. El contenido solo puede depender de esos datos:
+nada del usuario, de la petición ni de ids de la URL.
+
+Para no guardar datos viejos con una versión nueva, la vista llama
+`fijar_versiones(...)` antes de consultar y pasa las consultas sin `.all()`:
+así solo se ejecutan si el fragmento no está en caché.
+
+El HTML se guarda en la caché compartida (app.cache): un fragmento que
+renderizó un worker lo aprovechan los demás.
+"""
+from flask import current_app, g
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from app.cache import FALTA, cache
+from app.metricas import metricas
+from app.sucursales import sucursal_actual
+from app.versiones import leer_versiones
+
+
+def fijar_versiones(*conjuntos):
+    """Leer (una vez por petición) las versiones que usarán los fragmentos"""
+    fijadas = g.setdefault('versiones_fragmentos', {})
+    faltantes = [c for c in conjuntos if c not in fijadas]
+    if faltantes:
+        fijadas.update(leer_versiones(*faltantes))
+    return {c: fijadas[c] for c in conjuntos}
+
+
+class CacheFragmentos(Extension):
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        argumentos = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            argumentos.append(parser.parse_expression())
+        cuerpo = parser.parse_statements(['name:endcache'], drop_needle=True)
+        llamada = self.call_method('_renderizar', [nodes.List(argumentos)])
+        return nodes.CallBlock(llamada, [], [], cuerpo).set_lineno(lineno)
+
+    def _renderizar(self, argumentos, caller):
+        if not current_app.config.get('FRAGMENTOS_CACHE', True):
+            return caller()
+        nombre, conjuntos = argumentos[0], argumentos[1:]
+        versiones = fijar_versiones(*conjuntos)
+        clave = ':'.join(map(str, ('fragmento', nombre, sucursal_actual())
+                             + tuple(versiones[c] for c in conjuntos)))
+        html = cache.obtener(clave)
+        if html is not FALTA:
+            metricas.incrementar('fragmentos.aciertos')
+            return Markup(html)
+        metricas.incrementar('fragmentos.fallos')
+        html = caller()
+        cache.guardar(clave, str(html))
+        return Markup(html)
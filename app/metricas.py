@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+
+# Límites (en ms) de los buckets de los histogramas
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Metricas:
+    """Contadores e histogramas en memoria del proceso (un registro por worker)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores = {}
+        self._histogramas = {}
+        self._medidores = {}
+        self.inicio = time.time()
+
+    def incrementar(self, nombre, valor=1):
+        with self._lock:
+            self._contadores[nombre] = self._contadores.get(nombre, 0) + valor
+
+    def observar(self, nombre, milisegundos):
+        with self._lock:
+            hist = self._histogramas.get(nombre)
+            if hist is None:
+                hist = self._histogramas[nombre] = {
+                    'n': 0, 'suma_ms': 0.0, 'max_ms': 0.0,
+                    'buckets': [0] * (len(BUCKETS_MS) + 1),
+                }
+            hist['n'] += 1
+            hist['suma_ms'] += milisegundos
+            if milisegundos > hist['max_ms']:
+                hist['max_ms'] = milisegundos
+            for i, limite in enumerate(BUCKETS_MS):
+                if milisegundos <= limite:
+                    hist['buckets'][i] += 1
+                    break
+            else:
+                hist['buckets'][-1] += 1
+
+    def registrar_medidor(self, nombre, funcion):
+        """Registrar un valor que se calcula al exportar (p. ej. estado del pool)"""
+        self._medidores[nombre] = funcion
+
+    def exportar(self):
+        with self._lock:
+            histogramas = {}
+            for nombre, hist in self._histogramas.items():
+                histogramas[nombre] = {
+                    'n': hist['n'],
+                    'promedio_ms': round(hist['suma_ms'] / hist['n'], 3) if hist['n'] else 0,
+                    'max_ms': round(hist['max_ms'], 3),
+                    'buckets': {
+                        **{f'<={limite}': c for limite, c in zip(BUCKETS_MS, hist['buckets'])},
+                        f'>{BUCKETS_MS[-1]}': hist['buckets'][-1],
+                    },
+                }
+            datos = {
+                'pid': os.getpid(),
+                'uptime_s': round(time.time() - self.inicio, 1),
+                'contadores': dict(self._contadores),
+                'histogramas': histogramas,
+            }
+        for nombre, funcion in self._medidores.items():
+            datos[nombre] = funcion()
+        return datos
+
+
+metricas = Metricas()
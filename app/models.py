@@ -1,13 +1,127 @@
+from datetime import datetime, time, timedelta, timezone
+from decimal import Decimal
+
+import pytz
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
+from sqlalchemy import event, func, text
+from sqlalchemy.orm import declared_attr
+
+from app.database import SesionEnrutada
+
+db = SQLAlchemy(session_options={'class_': SesionEnrutada})
+
+ZONA_HORARIA = pytz.timezone('America/Mexico_City')
+
+
+# Hora local en que cambia el día de negocio (DIA_NEGOCIO_CORTE): lo vendido antes
+# cuenta para el día anterior, así el turno que cierra a la 1:00 es un solo día
+CORTE_DIA_NEGOCIO = timedelta(hours=5)
+
+
+def get_mexico_time():
+    """Hora actual de la Ciudad de México (sin tzinfo): reservas, vigencias y pantallas"""
+    return datetime.now(ZONA_HORARIA).replace(tzinfo=None)
+
+
+def get_utc_time():
+    """Hora actual en UTC (sin tzinfo), como se guardan las marcas de tiempo"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def a_hora_local(momento):
+    """Marca guardada (UTC) -> hora de la Ciudad de México, sin tzinfo"""
+    if momento is None:
+        return None
+    return pytz.utc.localize(momento).astimezone(ZONA_HORARIA).replace(tzinfo=None)
+
+
+def a_utc(momento):
+    """Hora de la Ciudad de México (sin tzinfo) -> UTC, para comparar con lo guardado"""
+    return ZONA_HORARIA.localize(momento).astimezone(pytz.utc).replace(tzinfo=None)
+
+
+def configurar_dia_negocio(horas):
+    global CORTE_DIA_NEGOCIO
+    CORTE_DIA_NEGOCIO = timedelta(hours=horas)
+
+
+def fecha_negocio_local(momento):
+    """Día de negocio de una hora local"""
+    return (momento - CORTE_DIA_NEGOCIO).date()
+
+
+def fecha_negocio(momento):
+    """Día de negocio de una marca UTC"""
+    return fecha_negocio_local(a_hora_local(momento))
+
+
+def dia_negocio_actual():
+    return fecha_negocio(get_utc_time())
+
+
+def inicio_dia_negocio(dia):
+    """Primer instante (UTC) del día de negocio `dia`"""
+    return a_utc(datetime.combine(dia, time.min) + CORTE_DIA_NEGOCIO)
+
+
+# Sucursal de los datos creados antes de que hubiera varias (y de los scripts sin sesión)
+SUCURSAL_PRINCIPAL = 1
+
+
+class Sucursal(db.Model):
+
+    __tablename__ = 'sucursales'
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(120), unique=True, nullable=False)
+    direccion = db.Column(db.String(255), nullable=True)
+    activo = db.Column(db.Boolean, default=True)
+
+    def __repr__(self):
+        return f'<Sucursal {self.nombre}>'
+
+
+class PorSucursal:
+    """Filas que pertenecen a una sucursal. Las consultas ORM se filtran solas por
+    la sucursal de la petición y las filas nuevas la reciben al hacer flush
+    (ver app/sucursales.py)"""
+
+    @declared_attr
+    def sucursal_id(cls):
+        return db.Column(db.Integer, db.ForeignKey('sucursales.id'), nullable=False,
+                         server_default=str(SUCURSAL_PRINCIPAL))
+
+
+class PorDiaNegocio:
+    """Filas con `fecha_negocio`: el día de negocio de la columna `momento_negocio`,
+    fijado al insertar. Los reportes y la caja filtran rangos de días sobre ella
+    (índice sucursal_id, fecha_negocio) en lugar de convertir fechas en SQL"""
 
-db = SQLAlchemy()
+    momento_negocio = None
 
+    @declared_attr
+    def fecha_negocio(cls):
+        return db.Column(db.Date, nullable=False)
 
-class Usuario(UserMixin, db.Model):
+
+@event.listens_for(PorDiaNegocio, 'before_insert', propagate=True)
+def _asignar_fecha_negocio(mapper, conexion, obj):
+    momento = getattr(obj, obj.momento_negocio)
+    if momento is None:
+        # El default de la columna se aplicaría después: se fija aquí para usar el mismo
+        momento = get_utc_time()
+        setattr(obj, obj.momento_negocio, momento)
+    if obj.fecha_negocio is None:
+        obj.fecha_negocio = fecha_negocio(momento)
+
+
+class Usuario(UserMixin, PorSucursal, db.Model):
 
     __tablename__ = 'usuarios'
+    __table_args__ = (
+        db.Index('ix_usuarios_sucursal_rol', 'sucursal_id', 'rol'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     nombre = db.Column(db.String(120), nullable=True)
@@ -24,3 +138,396 @@ class Usuario(UserMixin, db.Model):
     def __repr__(self):
         return f'<Usuario {self.username}>'
 
+
+class Mesa(PorSucursal, db.Model):
+
+    __tablename__ = 'mesas'
+    __table_args__ = (
+        db.UniqueConstraint('sucursal_id', 'numero', name='uq_mesas_sucursal_numero'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    numero = db.Column(db.Integer, nullable=False)
+    capacidad = db.Column(db.Integer, nullable=False, default=4)
+    ubicacion = db.Column(db.String(50), nullable=True)
+    # disponible, ocupada, reservada, limpieza
+    estado = db.Column(db.String(20), nullable=False, default='disponible')
+
+    comandas = db.relationship('Comanda', backref='mesa', lazy='dynamic')
+    reservas = db.relationship('Reserva', backref='mesa', lazy='dynamic')
+
+    def __repr__(self):
+        return f'<Mesa {self.numero}>'
+
+
+class Categoria(PorSucursal, db.Model):
+
+    __tablename__ = 'categorias'
+    __table_args__ = (
+        db.UniqueConstraint('sucursal_id', 'nombre', name='uq_categorias_sucursal_nombre'),
+        db.Index('ix_categorias_sucursal_activo', 'sucursal_id', 'activo'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(80), nullable=False)
+    descripcion = db.Column(db.String(255), nullable=True)
+    activo = db.Column(db.Boolean, default=True)
+
+    productos = db.relationship('Producto', backref='categoria', lazy=True)
+
+    def __repr__(self):
+        return f'<Categoria {self.nombre}>'
+
+
+class Producto(PorSucursal, db.Model):
+
+    __tablename__ = 'productos'
+    __table_args__ = (
+        # Menú disponible por categoría (también sirve para categoria.productos)
+        db.Index('ix_productos_sucursal_categoria_disponible', 'sucursal_id', 'categoria_id', 'disponible'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(120), nullable=False)
+    descripcion = db.Column(db.String(255), nullable=True)
+    precio = db.Column(db.Numeric(10, 2), nullable=False)
+    categoria_id = db.Column(db.Integer, db.ForeignKey('categorias.id'), nullable=False)
+    stock = db.Column(db.Integer, default=0)
+    stock_minimo = db.Column(db.Integer, default=5)
+    disponible = db.Column(db.Boolean, default=True)
+    # parrilla, fria, bar (ver app/estaciones.py)
+    estacion = db.Column(db.String(20), nullable=False, default='parrilla', server_default='parrilla')
+    # Minutos estimados de preparación
+    tiempo_preparacion = db.Column(db.Integer, nullable=False, default=10, server_default='10')
+
+    detalles_comanda = db.relationship('DetalleComanda', backref='producto', lazy=True)
+
+    @property
+    def necesita_reabastecimiento(self):
+        return (self.stock or 0) <= (self.stock_minimo or 0)
+
+    def __repr__(self):
+        return f'<Producto {self.nombre}>'
+
+
+# Mesas adicionales de una comanda cuando se juntan mesas para un grupo grande
+comanda_mesas = db.Table(
+    'comanda_mesas',
+    db.Column('comanda_id', db.Integer, db.ForeignKey('comandas.id'), primary_key=True),
+    db.Column('mesa_id', db.Integer, db.ForeignKey('mesas.id'), primary_key=True),
+    db.Index('ix_comanda_mesas_mesa', 'mesa_id'),
+)
+
+
+COMANDA_ACTIVA_SQL = "estado IN ('pendiente', 'en_preparacion', 'lista')"
+
+
+class Comanda(PorSucursal, PorDiaNegocio, db.Model):
+
+    __tablename__ = 'comandas'
+    momento_negocio = 'fecha_creacion'
+    __table_args__ = (
+        db.Index('ix_comandas_sucursal_fecha_negocio', 'sucursal_id', 'fecha_negocio'),
+        # Cocina y caja: comandas por estado; meseros: las suyas recientes
+        db.Index('ix_comandas_sucursal_estado_fecha', 'sucursal_id', 'estado', 'fecha_creacion'),
+        db.Index('ix_comandas_sucursal_mesero_fecha', 'sucursal_id', 'mesero_id', 'fecha_creacion'),
+        # Comanda activa de una mesa (con parámetros el índice parcial no aplica) e historial
+        db.Index('ix_comandas_sucursal_mesa_fecha', 'sucursal_id', 'mesa_id', 'fecha_creacion'),
+        # Una sola comanda activa por mesa principal, garantizado por la base; las
+        # mesas unidas (comanda_mesas) dependen del bloqueo de crear_comanda
+        db.Index('uq_comandas_mesa_activa', 'mesa_id', unique=True,
+                 postgresql_where=text(COMANDA_ACTIVA_SQL), sqlite_where=text(COMANDA_ACTIVA_SQL)),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    mesa_id = db.Column(db.Integer, db.ForeignKey('mesas.id'), nullable=False)
+    mesero_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    # pendiente, en_preparacion, lista, entregada, cancelada
+    estado = db.Column(db.String(20), nullable=False, default='pendiente')
+    observaciones = db.Column(db.Text, nullable=True)
+    subtotal = db.Column(db.Numeric(10, 2), default=0)
+    total = db.Column(db.Numeric(10, 2), default=0)
+    fecha_creacion = db.Column(db.DateTime, default=get_utc_time)
+    fecha_actualizacion = db.Column(db.DateTime, default=get_utc_time, onupdate=get_utc_time)
+
+    mesero = db.relationship('Usuario', backref='comandas')
+    detalles = db.relationship('DetalleComanda', backref='comanda', lazy=True,
+                               cascade='all, delete-orphan')
+    pago = db.relationship('Pago', backref='comanda', uselist=False)
+    mesas_unidas = db.relationship('Mesa', secondary=comanda_mesas, lazy=True)
+
+    @property
+    def todas_las_mesas(self):
+        return [self.mesa] + list(self.mesas_unidas)
+
+    def calcular_totales(self):
+        """Recalcular subtotal y total a partir de los detalles"""
+        subtotal = sum((d.subtotal or Decimal('0')) for d in self.detalles)
+        self.subtotal = subtotal
+        self.total = subtotal
+
+    def __repr__(self):
+        return f'<Comanda {self.id} mesa={self.mesa_id}>'
+
+
+class DetalleComanda(db.Model):
+
+    __tablename__ = 'detalles_comanda'
+    __table_args__ = (
+        db.Index('ix_detalles_comanda_comanda', 'comanda_id'),
+        db.Index('ix_detalles_comanda_producto', 'producto_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    comanda_id = db.Column(db.Integer, db.ForeignKey('comandas.id'), nullable=False)
+    producto_id = db.Column(db.Integer, db.ForeignKey('productos.id'), nullable=False)
+    cantidad = db.Column(db.Integer, nullable=False, default=1)
+    precio_unitario = db.Column(db.Numeric(10, 2), nullable=False)
+    subtotal = db.Column(db.Numeric(10, 2), default=0)
+    observaciones = db.Column(db.String(255), nullable=True)
+
+    def calcular_subtotal(self):
+        self.subtotal = Decimal(str(self.precio_unitario)) * self.cantidad
+
+    def __repr__(self):
+        return f'<DetalleComanda {self.id} comanda={self.comanda_id}>'
+
+
+class Turno(PorSucursal, PorDiaNegocio, db.Model):
+
+    __tablename__ = 'turnos'
+    momento_negocio = 'fecha_apertura'
+    __table_args__ = (
+        db.Index('ix_turnos_sucursal_fecha_negocio', 'sucursal_id', 'fecha_negocio'),
+        db.Index('ix_turnos_sucursal_estado', 'sucursal_id', 'estado'),
+        db.Index('ix_turnos_sucursal_apertura', 'sucursal_id', 'fecha_apertura'),
+        # Turno abierto del cajero en cada cobro
+        db.Index('ix_turnos_sucursal_usuario_estado', 'sucursal_id', 'usuario_id', 'estado'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    fecha_apertura = db.Column(db.DateTime, default=get_utc_time)
+    fecha_cierre = db.Column(db.DateTime, nullable=True)
+    monto_inicial = db.Column(db.Numeric(10, 2), nullable=False, default=0)
+    monto_final = db.Column(db.Numeric(10, 2), nullable=True)
+    # abierto, cerrado
+    estado = db.Column(db.String(20), nullable=False, default='abierto')
+    observaciones = db.Column(db.Text, nullable=True)
+
+    usuario = db.relationship('Usuario', backref='turnos')
+    pagos = db.relationship('Pago', backref='turno', lazy='dynamic')
+
+    def _ventas(self, metodo=None):
+        query = db.session.query(func.coalesce(func.sum(Pago.monto), 0)).filter(
+            Pago.turno_id == self.id
+        )
+        if metodo:
+            query = query.filter(Pago.metodo_pago == metodo)
+        return query.scalar()
+
+    def calcular_ventas_efectivo(self):
+        return self._ventas('Efectivo')
+
+    def calcular_ventas_tarjeta(self):
+        return self._ventas('Tarjeta')
+
+    def calcular_ventas_transferencia(self):
+        return self._ventas('Transferencia')
+
+    def calcular_total_ventas(self):
+        return self._ventas()
+
+    def __repr__(self):
+        return f'<Turno {self.id} {self.estado}>'
+
+
+class Pago(PorSucursal, PorDiaNegocio, db.Model):
+
+    __tablename__ = 'pagos'
+    momento_negocio = 'fecha_pago'
+    __table_args__ = (
+        # Ventas por día de negocio (reportes, historial de caja)
+        db.Index('ix_pagos_sucursal_fecha_negocio', 'sucursal_id', 'fecha_negocio'),
+        # Ventas del turno por método de pago (corte de caja)
+        db.Index('ix_pagos_sucursal_turno_metodo', 'sucursal_id', 'turno_id', 'metodo_pago'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    comanda_id = db.Column(db.Integer, db.ForeignKey('comandas.id'), unique=True, nullable=False)
+    turno_id = db.Column(db.Integer, db.ForeignKey('turnos.id'), nullable=False)
+    # Efectivo, Tarjeta, Transferencia
+    metodo_pago = db.Column(db.String(20), nullable=False)
+    monto = db.Column(db.Numeric(10, 2), nullable=False)
+    monto_recibido = db.Column(db.Numeric(10, 2), nullable=True)
+    cambio = db.Column(db.Numeric(10, 2), default=0)
+    fecha_pago = db.Column(db.DateTime, default=get_utc_time)
+
+    def __repr__(self):
+        return f'<Pago {self.id} comanda={self.comanda_id}>'
+
+
+class OperacionSync(db.Model):
+    """Operación que un cliente encoló sin conexión; el id lo genera el cliente
+    y se guarda con el resultado para que reintentar el envío no la repita"""
+
+    __tablename__ = 'operaciones_sync'
+    id = db.Column(db.String(64), primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    # crear_comanda, agregar_producto, cambiar_estado
+    tipo = db.Column(db.String(30), nullable=False)
+    # aplicada, fusionada, rechazada
+    estado = db.Column(db.String(20), nullable=False)
+    # mesa_ocupada, comanda_cerrada, producto_no_disponible... (si se rechazó)
+    conflicto = db.Column(db.String(30), nullable=True)
+    comanda_id = db.Column(db.Integer, db.ForeignKey('comandas.id'), nullable=True)
+    mensaje = db.Column(db.String(255), nullable=True)
+    fecha = db.Column(db.DateTime, default=get_utc_time)
+
+    def resultado(self, duplicada=False):
+        return {
+            'id': self.id,
+            'estado': self.estado,
+            'conflicto': self.conflicto,
+            'comanda_id': self.comanda_id,
+            'message': self.mensaje,
+            'duplicada': duplicada,
+        }
+
+    def __repr__(self):
+        return f'<OperacionSync {self.id} {self.estado}>'
+
+
+class VersionDatos(db.Model):
+    """Contador por conjunto de datos; sube al confirmar el cambio (ver app/versiones.py)"""
+
+    __tablename__ = 'versiones_datos'
+    nombre = db.Column(db.String(40), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<VersionDatos {self.nombre}={self.version}>'
+
+
+class Evento(PorSucursal, db.Model):
+    """Historial de cambios de estado (solo se agregan filas; ver app/eventos.py)"""
+
+    __tablename__ = 'eventos'
+    __table_args__ = (
+        db.Index('ix_eventos_sucursal_entidad_fecha', 'sucursal_id', 'entidad', 'entidad_id', 'fecha'),
+        db.Index('ix_eventos_sucursal_fecha', 'sucursal_id', 'fecha'),
+    )
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    # mesa o comanda (un pago se registra como 'pagada' de su comanda)
+    entidad = db.Column(db.String(20), nullable=False)
+    entidad_id = db.Column(db.Integer, nullable=False)
+    anterior = db.Column(db.String(20), nullable=True)
+    nuevo = db.Column(db.String(20), nullable=False)
+    usuario_id = db.Column(db.Integer, nullable=True)
+    fecha = db.Column(db.DateTime, nullable=False, default=get_utc_time)
+
+    def __repr__(self):
+        return f'<Evento {self.entidad} {self.entidad_id} {self.anterior}->{self.nuevo}>'
+
+
+class OcupacionDiaria(PorSucursal, db.Model):
+    """Resumen de ocupación de un día ya cerrado (ver app/ocupacion.py)"""
+
+    __tablename__ = 'ocupacion_diaria'
+    __table_args__ = (
+        db.UniqueConstraint('sucursal_id', 'fecha', name='uq_ocupacion_sucursal_fecha'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.Date, nullable=False)
+    datos = db.Column(db.JSON, nullable=False)
+    calculado = db.Column(db.DateTime, default=get_utc_time)
+
+    def __repr__(self):
+        return f'<OcupacionDiaria {self.fecha}>'
+
+
+class Reserva(PorSucursal, db.Model):
+
+    __tablename__ = 'reservas'
+    __table_args__ = (
+        db.Index('ix_reservas_sucursal_inicio', 'sucursal_id', 'inicio'),
+        db.Index('ix_reservas_sucursal_mesa_inicio', 'sucursal_id', 'mesa_id', 'inicio'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    mesa_id = db.Column(db.Integer, db.ForeignKey('mesas.id'), nullable=False)
+    cliente = db.Column(db.String(120), nullable=False)
+    telefono = db.Column(db.String(30), nullable=True)
+    personas = db.Column(db.Integer, nullable=False)
+    # Hora local de la cita, como la pide el cliente (las marcas de tiempo van en UTC)
+    inicio = db.Column(db.DateTime, nullable=False)
+    fin = db.Column(db.DateTime, nullable=False)
+    # confirmada, sentada, cancelada, no_llego
+    estado = db.Column(db.String(20), nullable=False, default='confirmada')
+    observaciones = db.Column(db.String(255), nullable=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True)
+    fecha_creacion = db.Column(db.DateTime, default=get_utc_time)
+
+    def __repr__(self):
+        return f'<Reserva {self.id} mesa={self.mesa_id} {self.inicio:%Y-%m-%d %H:%M}>'
+
+
+class PendienteCocina(PorSucursal, db.Model):
+    """Unidades de cada producto por preparar en las comandas activas (ver app/pendientes.py)"""
+
+    __tablename__ = 'pendientes_cocina'
+    __table_args__ = (
+        db.UniqueConstraint('sucursal_id', 'producto_id', name='uq_pendientes_sucursal_producto'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    producto_id = db.Column(db.Integer, db.ForeignKey('productos.id'), nullable=False)
+    pendientes = db.Column(db.Integer, nullable=False, default=0)
+    en_preparacion = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<PendienteCocina producto={self.producto_id} {self.pendientes}/{self.en_preparacion}>'
+
+
+class ListaPrecios(PorSucursal, db.Model):
+    """Precios que reemplazan al base mientras la lista está vigente (ver app/precios.py)"""
+
+    __tablename__ = 'listas_precios'
+    __table_args__ = (
+        db.Index('ix_listas_precios_sucursal_activo', 'sucursal_id', 'activo'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(120), nullable=False)
+    # Si varias aplican gana la de mayor prioridad
+    prioridad = db.Column(db.Integer, nullable=False, default=0)
+    # Vigencia y franja en hora local
+    vigente_desde = db.Column(db.DateTime, nullable=False, default=get_mexico_time)
+    vigente_hasta = db.Column(db.DateTime, nullable=True)
+    # Franja diaria opcional (happy hour); puede cruzar la medianoche
+    hora_inicio = db.Column(db.Time, nullable=True)
+    hora_fin = db.Column(db.Time, nullable=True)
+    # Días de la semana en que aplica, 0 = lunes ('01234' = lunes a viernes); vacío = todos
+    dias = db.Column(db.String(7), nullable=True)
+    activo = db.Column(db.Boolean, nullable=False, default=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True)
+    fecha_creacion = db.Column(db.DateTime, default=get_utc_time)
+
+    precios = db.relationship('PrecioLista', backref='lista', lazy=True, cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<ListaPrecios {self.nombre}>'
+
+
+class PrecioLista(db.Model):
+
+    __tablename__ = 'precios_lista'
+    lista_id = db.Column(db.Integer, db.ForeignKey('listas_precios.id'), primary_key=True)
+    producto_id = db.Column(db.Integer, db.ForeignKey('productos.id'), primary_key=True)
+    precio = db.Column(db.Numeric(10, 2), nullable=False)
+
+    def __repr__(self):
+        return f'<PrecioLista lista={self.lista_id} producto={self.producto_id} {self.precio}>'
+
+
+class EntradaCache(db.Model):
+    """Entrada de la caché compartida con el backend `base` (ver app/cache.py)"""
+
+    __tablename__ = 'cache_entradas'
+    __table_args__ = (
+        db.Index('ix_cache_entradas_expira', 'expira'),
+    )
+    clave = db.Column(db.String(255), primary_key=True)
+    valor = db.Column(db.LargeBinary, nullable=False)
+    # Segundos desde epoch
+    expira = db.Column(db.Float, nullable=False)
@@ -0,0 +1,181 @@
+"""Ocupación de mesas, tiempo de mesa a pago y rotaciones por día.
+
+Una mesa está ocupada desde que se abre una comanda hasta que se paga (o hasta
+la última actualización si se canceló o se entregó sin pago). Las mesas unidas
+a la comanda (comanda_mesas) se ocupan igual que la principal. Con una sola
+consulta se traen todos los intervalos del rango y un barrido ordenado por
+tiempo acumula, hora por hora, cuántas mesas distintas estaban ocupadas.
+
+Los días son días de negocio (de DIA_NEGOCIO_CORTE a DIA_NEGOCIO_CORTE) y las
+horas, hora local: las marcas se consultan en UTC y se convierten al traerlas.
+Un día pasado se guarda en `ocupacion_diaria` y ya no se recalcula solo si
+ninguna comanda que lo toca puede cambiar: si hay una abierta o entregada sin
+pagar (su fin aún no es definitivo) se calcula en cada consulta.
+"""
+from datetime import timedelta
+
+from sqlalchemy import case, func, select
+from sqlalchemy.exc import IntegrityError
+
+from app.models import (db, Comanda, Mesa, OcupacionDiaria, Pago, a_hora_local, comanda_mesas,
+                        dia_negocio_actual, fecha_negocio_local, get_utc_time, inicio_dia_negocio)
+
+HORA = timedelta(hours=1)
+
+
+def _intervalos(desde, hasta):
+    """(mesas, inicio, fin, pagada, definitiva) en hora local de las comandas que se
+    cruzan con [desde, hasta) (UTC); `mesas` empieza por la principal"""
+    cierre = case(
+        (Comanda.estado.in_(('entregada', 'cancelada')), Comanda.fecha_actualizacion),
+        else_=None,
+    )
+    fin = func.coalesce(Pago.fecha_pago, cierre)
+    # Pagada o cancelada: el intervalo ya no cambia
+    definitiva = Pago.id.isnot(None) | (Comanda.estado == 'cancelada')
+    consulta = (
+        select(Comanda.id, Comanda.mesa_id, comanda_mesas.c.mesa_id, Comanda.fecha_creacion, fin,
+               Pago.id.isnot(None), definitiva)
+        .outerjoin(Pago, Pago.comanda_id == Comanda.id)
+        .outerjoin(comanda_mesas, comanda_mesas.c.comanda_id == Comanda.id)
+        .where(Comanda.fecha_creacion < hasta)
+        .where((fin.is_(None)) | (fin > desde))
+        .order_by(Comanda.id)
+    )
+    ahora = get_utc_time()
+    intervalos = {}
+    for comanda_id, mesa_id, unida, inicio, fin, pagada, final in db.session.execute(consulta):
+        intervalo = intervalos.get(comanda_id)
+        if intervalo is None:
+            intervalo = intervalos[comanda_id] = (
+                [mesa_id], a_hora_local(inicio), a_hora_local(fin or min(ahora, hasta)),
+                bool(pagada), bool(final))
+        if unida is not None:
+            intervalo[0].append(unida)
+    return list(intervalos.values())
+
+
+def _repartir_por_hora(segundos_por_hora, inicio, fin, ocupadas):
+    """Sumar ocupadas × duración de [inicio, fin) en las horas que abarca"""
+    while inicio < fin:
+        hora = inicio.replace(minute=0, second=0, microsecond=0)
+        corte = min(fin, hora + HORA)
+        segundos_por_hora[hora] = segundos_por_hora.get(hora, 0.0) + \
+            ocupadas * (corte - inicio).total_seconds()
+        inicio = corte
+
+
+def barrido(intervalos, desde, hasta):
+    """Segundos-mesa ocupados por hora en [desde, hasta), en una pasada"""
+    marcas = []
+    for mesas, inicio, fin, _, _ in intervalos:
+        inicio, fin = max(inicio, desde), min(fin, hasta)
+        if inicio < fin:
+            for mesa_id in mesas:
+                # Con la misma hora, las salidas (-1) van antes que las entradas
+                marcas.append((inicio, 1, mesa_id))
+                marcas.append((fin, -1, mesa_id))
+    marcas.sort()
+
+    segundos_por_hora = {}
+    abiertas = {}  # mesa_id -> comandas abiertas (pueden traslaparse)
+    ocupadas = 0
+    anterior = desde
+    for momento, cambio, mesa_id in marcas:
+        if ocupadas:
+            _repartir_por_hora(segundos_por_hora, anterior, momento, ocupadas)
+        anterior = momento
+        cuenta = abiertas.get(mesa_id, 0) + cambio
+        if cuenta == 0 or (cuenta == 1 and cambio == 1):
+            ocupadas += cambio
+        abiertas[mesa_id] = cuenta
+    return segundos_por_hora
+
+
+def _resumir(dias, intervalos, segundos_por_hora, total_mesas):
+    resumenes = {}
+    for dia in dias:
+        resumenes[dia] = {
+            'fecha': dia.isoformat(),
+            'mesas': total_mesas,
+            'ocupacion_por_hora': [0.0] * 24,
+            'comandas': 0,
+            'minutos_promedio_a_pago': None,
+            'rotaciones': {},
+        }
+    for hora, segundos in segundos_por_hora.items():
+        dia = fecha_negocio_local(hora)
+        if dia in resumenes and total_mesas:
+            resumenes[dia]['ocupacion_por_hora'][hora.hour] = \
+                round(segundos / (3600 * total_mesas), 4)
+
+    # Comandas, rotaciones y tiempo a pago cuentan en el día en que se abrió la mesa
+    minutos = {}
+    for mesas, inicio, fin, pagada, _ in intervalos:
+        dia = fecha_negocio_local(inicio)
+        resumen = resumenes.get(dia)
+        if resumen is None:
+            continue
+        resumen['comandas'] += 1
+        if pagada:
+            # Cada mesa unida también tuvo una rotación
+            for clave in map(str, mesas):
+                resumen['rotaciones'][clave] = resumen['rotaciones'].get(clave, 0) + 1
+            minutos.setdefault(dia, []).append((fin - inicio).total_seconds() / 60)
+    for dia, valores in minutos.items():
+        resumenes[dia]['minutos_promedio_a_pago'] = round(sum(valores) / len(valores), 1)
+    for resumen in resumenes.values():
+        pagadas = sum(resumen['rotaciones'].values())
+        resumen['rotaciones_por_mesa'] = round(pagadas / total_mesas, 2) if total_mesas else 0
+    return resumenes
+
+
+def _pendientes(intervalos):
+    """Días tocados por comandas cuyo fin aún puede cambiar"""
+    dias = set()
+    for _, inicio, fin, _, definitiva in intervalos:
+        if not definitiva:
+            dia, ultimo = fecha_negocio_local(inicio), fecha_negocio_local(fin)
+            while dia <= ultimo:
+                dias.add(dia)
+                dia += timedelta(days=1)
+    return dias
+
+
+def calcular(dias):
+    """Resúmenes de los días dados (consecutivos o no) con un solo barrido, y los días
+    que aún pueden cambiar"""
+    desde = inicio_dia_negocio(min(dias))
+    hasta = inicio_dia_negocio(max(dias) + timedelta(days=1))
+    # Las comandas abiertas antes del rango también ocupan mesa dentro de él
+    intervalos = _intervalos(desde, hasta)
+    total_mesas = db.session.scalar(select(func.count(Mesa.id)))
+    segundos_por_hora = barrido(intervalos, a_hora_local(desde), a_hora_local(hasta))
+    return _resumir(dias, intervalos, segundos_por_hora, total_mesas), _pendientes(intervalos)
+
+
+def ocupacion(desde, hasta):
+    """Resumen por día de [desde, hasta] (fechas), usando los días cerrados ya guardados"""
+    hoy = dia_negocio_actual()
+    hasta = min(hasta, hoy)
+    dias = [desde + timedelta(days=n) for n in range((hasta - desde).days + 1)]
+    if not dias:
+        return []
+    guardados = {
+        r.fecha: r.datos
+        for r in OcupacionDiaria.query.filter(OcupacionDiaria.fecha.between(desde, hasta))
+    }
+    faltantes = [d for d in dias if d not in guardados]
+    if faltantes:
+        calculados, pendientes = calcular(faltantes)
+        cerrados = [d for d in faltantes if d < hoy and d not in pendientes]
+        for dia in cerrados:
+            db.session.add(OcupacionDiaria(fecha=dia, datos=calculados[dia]))
+        if cerrados:
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Otro proceso guardó los mismos días
+                db.session.rollback()
+        guardados.update(calculados)
+    return [guardados[d] for d in dias]
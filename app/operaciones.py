@@ -0,0 +1,229 @@
+"""Reglas de negocio de comandas, mesas y pagos compartidas por las vistas
+HTML, la sincronización sin conexión y la API JSON.
+
+Las funciones validan, modifican los objetos y dejan el commit a quien llama.
+"""
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.database import registrar_escritura
+from app.eventos import registrar_cambios
+from app.models import db, Comanda, DetalleComanda, Mesa, Pago, Turno, comanda_mesas, get_utc_time
+from app.versiones import incrementar_version
+
+ESTADOS_ACTIVOS = ['pendiente', 'en_preparacion', 'lista']
+ESTADOS_VALIDOS = ['pendiente', 'en_preparacion', 'lista', 'entregada', 'cancelada']
+
+
+class ErrorOperacion(Exception):
+    """Operación no permitida; `conflicto` la identifica para los clientes"""
+
+    def __init__(self, mensaje, conflicto='invalida', status=400, comanda=None):
+        super().__init__(mensaje)
+        self.mensaje = mensaje
+        self.conflicto = conflicto
+        self.status = status
+        self.comanda = comanda
+
+
+def comanda_activa(mesa_id):
+    """Comanda activa de la mesa, sea su mesa principal o una mesa unida"""
+    return Comanda.query.filter(
+        or_(Comanda.mesa_id == mesa_id, Comanda.mesas_unidas.any(Mesa.id == mesa_id))
+    ).filter(
+        Comanda.estado.in_(ESTADOS_ACTIVOS)
+    ).first()
+
+
+def crear_comanda(mesa, mesero, observaciones=None, unidas=()):
+    """Abrir una comanda y ocupar la mesa, y las mesas unidas si las hay (sin commit).
+
+    Bloquea las mesas (en orden de id) antes de comprobar que estén libres, así
+    en PostgreSQL dos tabletas no pueden abrir la misma mesa a la vez, sea como
+    principal o como unida. SQLite ignora el bloqueo: ahí solo el índice único
+    parcial `uq_comandas_mesa_activa` frena dos comandas activas con la misma
+    mesa principal; las mesas unidas (comanda_mesas) quedan sin esa garantía.
+    """
+    unidas = [m for m in unidas if m.id != mesa.id]
+    ids = sorted({mesa.id} | {m.id for m in unidas})
+    Mesa.query.filter(Mesa.id.in_(ids)).order_by(Mesa.id).with_for_update().all()
+    for m in [mesa] + unidas:
+        activa = comanda_activa(m.id)
+        if activa:
+            raise ErrorOperacion(f'La mesa {m.numero} ya tiene una comanda activa.',
+                               'mesa_ocupada', 409, comanda=activa)
+    comanda = Comanda(mesa_id=mesa.id, mesero_id=mesero.id, estado='pendiente',
+                      observaciones=observaciones)
+    comanda.mesas_unidas.extend(unidas)
+    db.session.add(comanda)
+    for m in [mesa] + unidas:
+        m.estado = 'ocupada'
+    mesa_id, numero = mesa.id, mesa.numero
+    try:
+        db.session.flush()
+    except IntegrityError:
+        # Otra petición abrió la mesa entre la comprobación y el INSERT
+        db.session.rollback()
+        raise ErrorOperacion(f'La mesa {numero} ya tiene una comanda activa.',
+                           'mesa_ocupada', 409, comanda=comanda_activa(mesa_id))
+    return comanda
+
+
+def liberar_mesas(comanda):
+    """Pasar a limpieza la mesa de la comanda y las que se le unieron"""
+    for m in comanda.todas_las_mesas:
+        m.estado = 'limpieza'
+
+
+def agregar_producto(comanda, producto, cantidad, observaciones=None):
+    """Agregar un producto a la comanda y recalcular totales (sin commit)"""
+    if comanda.estado in ['entregada', 'cancelada']:
+        raise ErrorOperacion('No se puede editar una comanda entregada o cancelada.',
+                           'comanda_cerrada', 409)
+    if not cantidad or cantidad <= 0:
+        raise ErrorOperacion('Datos inválidos.')
+    if not producto.disponible:
+        raise ErrorOperacion(f'El producto {producto.nombre} no está disponible.',
+                           'producto_no_disponible', 409)
+    # app.precios usa ErrorOperacion: importarlo aquí evita el ciclo
+    from app.precios import precio_vigente
+    detalle = DetalleComanda(
+        producto_id=producto.id,
+        cantidad=cantidad,
+        precio_unitario=precio_vigente(producto),
+        observaciones=observaciones
+    )
+    detalle.calcular_subtotal()
+    comanda.detalles.append(detalle)
+    comanda.calcular_totales()
+    return detalle
+
+
+def quitar_producto(detalle):
+    """Quitar un producto de la comanda y recalcular totales (sin commit)"""
+    comanda = detalle.comanda
+    if comanda.estado in ['entregada', 'cancelada']:
+        raise ErrorOperacion('Comanda no editable', 'comanda_cerrada')
+    # delete-orphan borra el detalle al quitarlo de la colección
+    comanda.detalles.remove(detalle)
+    comanda.calcular_totales()
+    return comanda
+
+
+def cambiar_estado_comanda(comanda, nuevo_estado, usuario):
+    """Validar la transición según el rol y aplicarla (sin commit)"""
+    if nuevo_estado not in ESTADOS_VALIDOS:
+        raise ErrorOperacion('Estado inválido')
+    
+    # Cocina puede cambiar: pendiente -> en_preparacion -> lista
+    if usuario.rol == 'cocina' and nuevo_estado not in ['en_preparacion', 'lista']:
+        raise ErrorOperacion('Transición no permitida', 'no_permitida', 403)
+    # Mesero puede cambiar: lista -> entregada o cualquiera -> cancelada
+    if usuario.rol == 'mesero' and nuevo_estado not in ['entregada', 'cancelada']:
+        raise ErrorOperacion('Transición no permitida', 'no_permitida', 403)
+    
+    comanda.estado = nuevo_estado
+    comanda.fecha_actualizacion = get_utc_time()
+    
+    # Si se entrega o cancela, liberar la mesa
+    if nuevo_estado in ['entregada', 'cancelada']:
+        liberar_mesas(comanda)
+
+
+ESTADOS_MESA = ['disponible', 'ocupada', 'reservada', 'limpieza']
+METODOS_PAGO = ['Efectivo', 'Tarjeta', 'Transferencia']
+
+
+def cambiar_estado_mesa(mesa, nuevo_estado):
+    if nuevo_estado not in ESTADOS_MESA:
+        raise ErrorOperacion('Estado inválido')
+    mesa.estado = nuevo_estado
+
+
+# Los que se asignan en lote al abrir o cerrar el salón (ocupada solo con una comanda)
+ESTADOS_MESA_MASIVOS = ['disponible', 'reservada', 'limpieza']
+
+
+def cambiar_estado_mesas(nuevo_estado, mesa_ids=(), ubicaciones=()):
+    """Pasar varias mesas (por id o por zona) a un estado con un solo UPDATE (sin commit).
+
+    Las mesas con una comanda activa (propia o unida) no se tocan. Devuelve las
+    filas (id, numero, estado, ...) de las que cambiaron y de las que se quedaron.
+    """
+    if nuevo_estado not in ESTADOS_MESA_MASIVOS:
+        raise ErrorOperacion('Estado inválido')
+    if not mesa_ids and not ubicaciones:
+        raise ErrorOperacion('Indica las mesas o las zonas.')
+    activa = Comanda.estado.in_(ESTADOS_ACTIVOS)
+    con_comanda = or_(
+        select(Comanda.id).where(Comanda.mesa_id == Mesa.id, activa).exists(),
+        select(Comanda.id).join(comanda_mesas, comanda_mesas.c.comanda_id == Comanda.id)
+        .where(comanda_mesas.c.mesa_id == Mesa.id, activa).exists(),
+    )
+    # Una consulta valida todas; el bloqueo frena a crear_comanda hasta el commit
+    mesas = db.session.execute(
+        select(Mesa.id, Mesa.numero, Mesa.estado, Mesa.sucursal_id, con_comanda.label('con_comanda'))
+        .where(or_(Mesa.id.in_(mesa_ids), Mesa.ubicacion.in_(ubicaciones)))
+        .order_by(Mesa.id)
+        .with_for_update(of=Mesa)
+    ).all()
+    if not mesas:
+        raise ErrorOperacion('No se encontraron mesas.', 'no_encontrada', 404)
+    ocupadas = [m for m in mesas if m.con_comanda]
+    cambian = [m for m in mesas if not m.con_comanda and m.estado != nuevo_estado]
+    if cambian:
+        db.session.execute(
+            update(Mesa).where(Mesa.id.in_([m.id for m in cambian])).values(estado=nuevo_estado)
+            .execution_options(synchronize_session='fetch')
+        )
+        # Sin flush del ORM: historial y versión (un solo aviso a los streams) a mano
+        registrar_cambios('mesa', [(m.sucursal_id, m.id, m.estado) for m in cambian], nuevo_estado)
+        incrementar_version('mesas')
+        registrar_escritura()
+    return cambian, ocupadas
+
+
+def turno_abierto(usuario):
+    return Turno.query.filter_by(usuario_id=usuario.id, estado='abierto').first()
+
+
+def registrar_pago(comanda, metodo_pago, monto_recibido, usuario):
+    """Cobrar una comanda entregada en el turno abierto del usuario (sin commit)"""
+    if comanda.estado != 'entregada':
+        raise ErrorOperacion('La comanda debe estar entregada para procesarla.', 'no_entregada', 409)
+    if comanda.pago:
+        raise ErrorOperacion('Esta comanda ya ha sido pagada.', 'ya_pagada', 409)
+    turno = turno_abierto(usuario)
+    if not turno:
+        raise ErrorOperacion('Debes tener un turno abierto para procesar pagos.', 'sin_turno', 409)
+    if metodo_pago not in METODOS_PAGO:
+        raise ErrorOperacion('Método de pago inválido.')
+    
+    total = Decimal(str(comanda.total or 0))
+    # Calcular cambio para efectivo
+    cambio = Decimal('0')
+    if metodo_pago == 'Efectivo':
+        try:
+            recibido = Decimal(str(monto_recibido)) if monto_recibido is not None else None
+        except InvalidOperation:
+            recibido = None
+        if recibido is None or recibido < total:
+            raise ErrorOperacion('El monto recibido es insuficiente.', 'monto_insuficiente')
+        cambio = recibido - total
+    else:
+        recibido = total
+    
+    pago = Pago(
+        comanda_id=comanda.id,
+        metodo_pago=metodo_pago,
+        monto=total,
+        monto_recibido=recibido,
+        cambio=cambio,
+        turno_id=turno.id
+    )
+    db.session.add(pago)
+    # Liberar la mesa
+    liberar_mesas(comanda)
+    return pago
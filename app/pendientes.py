@@ -0,0 +1,175 @@
+"""Conteo "all-day" de cocina: unidades por producto pendientes y en preparación.
+
+La tabla `pendientes_cocina` se mantiene con sumas y restas en el mismo flush
+que cambia los datos: detalles agregados o quitados y comandas que cambian de
+estado (un cambio de estado mueve las unidades de la comanda de una columna a
+otra, o las saca del conteo). Leer el tablero es leer unas decenas de filas.
+
+`flask recalcular-pendientes` lo reconstruye desde las comandas activas.
+"""
+from collections import Counter
+
+import click
+from sqlalchemy import case, event, func, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.database import SesionEnrutada
+from app.models import db, Categoria, Comanda, DetalleComanda, PendienteCocina, Producto
+
+# Estado de la comanda -> columna del conteo (los demás no cuentan)
+COLUMNAS = {'pendiente': 'pendientes', 'en_preparacion': 'en_preparacion'}
+
+# Motores con INSERT ... ON CONFLICT DO UPDATE
+CON_UPSERT = {'postgresql': postgresql, 'sqlite': sqlite}
+
+
+def _estados(sesion):
+    """Estado anterior y actual de las comandas que cambiaron de estado en este flush"""
+    cambios = {}
+    for obj in sesion.dirty:
+        if isinstance(obj, Comanda):
+            historial = inspect(obj).attrs.estado.history
+            if historial.added and historial.deleted and historial.added[0] != historial.deleted[0]:
+                cambios[obj.id] = (historial.deleted[0], historial.added[0], obj.sucursal_id)
+    return cambios
+
+
+def _deltas(sesion):
+    cambios = _estados(sesion)
+    deltas = Counter()
+
+    def sumar(sucursal_id, producto_id, estado, cantidad):
+        columna = COLUMNAS.get(estado)
+        if columna and cantidad:
+            deltas[(sucursal_id, producto_id, columna)] += cantidad
+
+    def comanda_de(detalle):
+        return detalle.comanda or sesion.get(Comanda, detalle.comanda_id)
+
+    # Detalles que no hay que mover con su comanda: ya se cuentan aquí
+    tratados = set()
+    for d in sesion.new:
+        if isinstance(d, DetalleComanda):
+            comanda = comanda_de(d)
+            sumar(comanda.sucursal_id, d.producto_id, comanda.estado, d.cantidad)
+            tratados.add(d.id)
+    # Los detalles quitados de `comanda.detalles` (delete-orphan) no aparecen en
+    # sesion.deleted: salen del historial de la colección
+    quitados = {d: comanda_de(d) for d in sesion.deleted if isinstance(d, DetalleComanda)}
+    for obj in sesion.dirty:
+        if isinstance(obj, Comanda):
+            for d in inspect(obj).attrs.detalles.history.deleted:
+                quitados[d] = obj
+    for d, comanda in quitados.items():
+        anterior = cambios.get(comanda.id, (comanda.estado,))[0]
+        sumar(comanda.sucursal_id, d.producto_id, anterior, -d.cantidad)
+    for d in sesion.dirty:
+        if isinstance(d, DetalleComanda):
+            historial = inspect(d).attrs.cantidad.history
+            if historial.added and historial.deleted:
+                comanda = comanda_de(d)
+                anterior = cambios.get(comanda.id, (comanda.estado,))[0]
+                sumar(comanda.sucursal_id, d.producto_id, anterior, -historial.deleted[0])
+                sumar(comanda.sucursal_id, d.producto_id, comanda.estado, historial.added[0])
+                tratados.add(d.id)
+
+    if cambios:
+        filas = sesion.execute(
+            select(DetalleComanda.comanda_id, DetalleComanda.producto_id,
+                   func.sum(DetalleComanda.cantidad))
+            .where(DetalleComanda.comanda_id.in_(cambios))
+            .where(DetalleComanda.id.notin_(tratados))
+            .group_by(DetalleComanda.comanda_id, DetalleComanda.producto_id)
+        )
+        for comanda_id, producto_id, cantidad in filas:
+            anterior, nuevo, sucursal_id = cambios[comanda_id]
+            sumar(sucursal_id, producto_id, anterior, -cantidad)
+            sumar(sucursal_id, producto_id, nuevo, cantidad)
+    return {clave: n for clave, n in deltas.items() if n}
+
+
+def _despues_de_flush(sesion, contexto):
+    deltas = _deltas(sesion)
+    if not deltas:
+        return
+    conexion = sesion.connection(bind_arguments={'mapper': PendienteCocina})
+    tabla = PendienteCocina.__table__
+    por_fila = {}
+    for (sucursal_id, producto_id, columna), n in deltas.items():
+        por_fila.setdefault((sucursal_id, producto_id), {})[columna] = n
+    filas = [{'sucursal_id': sucursal_id, 'producto_id': producto_id,
+              'pendientes': cambios.get('pendientes', 0),
+              'en_preparacion': cambios.get('en_preparacion', 0)}
+             for (sucursal_id, producto_id), cambios in por_fila.items()]
+
+    dialecto = CON_UPSERT.get(conexion.dialect.name)
+    if dialecto is not None:
+        # UPSERT: dos comandas que estrenan el mismo producto a la vez no chocan con la restricción única
+        sentencia = dialecto.insert(tabla)
+        sentencia = sentencia.on_conflict_do_update(
+            index_elements=['sucursal_id', 'producto_id'],
+            set_={c: tabla.c[c] + sentencia.excluded[c] for c in COLUMNAS.values()})
+        conexion.execute(sentencia, filas)
+        return
+
+    # Sin ON CONFLICT: UPDATE y, si no había fila, INSERT
+    faltantes = []
+    for fila in filas:
+        resultado = conexion.execute(
+            update(tabla)
+            .where(tabla.c.sucursal_id == fila['sucursal_id'], tabla.c.producto_id == fila['producto_id'])
+            .values({c: tabla.c[c] + fila[c] for c in COLUMNAS.values()})
+        )
+        if resultado.rowcount == 0:
+            faltantes.append(fila)
+    if faltantes:
+        conexion.execute(tabla.insert(), faltantes)
+
+
+def recalcular():
+    """Reconstruir el conteo desde las comandas activas (todas las sucursales)"""
+    tabla = PendienteCocina.__table__
+    conteo = (
+        select(Comanda.sucursal_id, DetalleComanda.producto_id,
+               func.sum(case((Comanda.estado == 'pendiente', DetalleComanda.cantidad), else_=0)),
+               func.sum(case((Comanda.estado == 'en_preparacion', DetalleComanda.cantidad), else_=0)))
+        .join(Comanda, Comanda.id == DetalleComanda.comanda_id)
+        .where(Comanda.estado.in_(COLUMNAS))
+        .group_by(Comanda.sucursal_id, DetalleComanda.producto_id)
+    )
+    db.session.execute(tabla.delete())
+    db.session.execute(tabla.insert().from_select(
+        ['sucursal_id', 'producto_id', 'pendientes', 'en_preparacion'], conteo))
+    db.session.commit()
+
+
+def tablero():
+    """Productos y categorías con unidades por preparar (para la pantalla de cocina)"""
+    filas = db.session.execute(
+        select(Producto.id, Producto.nombre, Categoria.nombre,
+               PendienteCocina.pendientes, PendienteCocina.en_preparacion)
+        .join(Producto, Producto.id == PendienteCocina.producto_id)
+        .join(Categoria, Categoria.id == Producto.categoria_id)
+        .where((PendienteCocina.pendientes > 0) | (PendienteCocina.en_preparacion > 0))
+        .order_by(Categoria.nombre, Producto.nombre)
+    ).all()
+    categorias = {}
+    for _, _, categoria, pendientes, en_preparacion in filas:
+        total = categorias.setdefault(categoria, [0, 0])
+        total[0] += pendientes
+        total[1] += en_preparacion
+    return {
+        'productos': [[pid, nombre, categoria, p, e] for pid, nombre, categoria, p, e in filas],
+        'categorias': [[nombre, p, e] for nombre, (p, e) in categorias.items()],
+    }
+
+
+def registrar_pendientes(app):
+    if not event.contains(SesionEnrutada, 'after_flush', _despues_de_flush):
+        event.listen(SesionEnrutada, 'after_flush', _despues_de_flush)
+
+    @app.cli.command('recalcular-pendientes')
+    def recalcular_pendientes():
+        """Reconstruir el conteo de cocina desde las comandas activas"""
+        recalcular()
+        click.echo('Conteo de cocina recalculado.')
@@ -0,0 +1,152 @@
+"""Plazos por petición: una consulta lenta no retiene un worker.
+
+Cada petición tiene un presupuesto en ms según su blueprint (PLAZOS_MS), o el
+que fije la vista con `@plazo(ms)`. El presupuesto se traduce en límites del
+motor:
+
+- PostgreSQL: la primera sentencia de cada transacción fija
+  `statement_timeout` local (set_config(..., true), igual que SET LOCAL, así
+  que también sirve detrás de PgBouncer en modo transacción) con lo que queda.
+- SQLite: un progress handler por conexión interrumpe la sentencia en curso
+  cuando se vence el plazo.
+
+Si el plazo ya se venció, la sentencia ni se envía. La petición responde 503
+con un mensaje claro y se cuenta en `plazos.excedidos` (total y por endpoint).
+Fuera de una petición (init_db, CLI) no hay límite.
+"""
+import logging
+import time
+
+from flask import current_app, g, has_request_context, jsonify, request
+from sqlalchemy import event
+
+from app.metricas import metricas
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+# Instrucciones de la VM de SQLite entre revisiones del plazo
+PASOS_SQLITE = 10000
+MENSAJE = 'El servidor tardó demasiado en responder. Intenta de nuevo.'
+
+
+class PlazoExcedido(Exception):
+    """La petición agotó su presupuesto de tiempo"""
+
+
+def plazo(milisegundos):
+    """Decorador: presupuesto propio de la vista (None = sin límite).
+
+    Va debajo de @login_required/@role_required: functools.wraps copia el atributo.
+    """
+    def decorador(f):
+        f.plazo_ms = milisegundos
+        return f
+    return decorador
+
+
+def iniciar_plazo(milisegundos):
+    g.plazo_ms = milisegundos
+    g.plazo_limite = None if milisegundos is None else time.monotonic() + milisegundos / 1000.0
+
+
+def reiniciar_plazo():
+    """Volver a dar el presupuesto completo (cada vuelta de un stream)"""
+    if has_request_context() and g.get('plazo_ms') is not None:
+        iniciar_plazo(g.plazo_ms)
+
+
+def _limite():
+    if not has_request_context():
+        return None
+    return g.get('plazo_limite')
+
+
+def _excedido(tipo):
+    endpoint = request.endpoint if has_request_context() else None
+    metricas.incrementar('plazos.excedidos')
+    metricas.incrementar(f'plazos.excedidos.{tipo}')
+    metricas.incrementar(f'plazos.excedidos.{endpoint}')
+    logger.warning('Plazo de %s ms excedido en %s (%s)', g.get('plazo_ms'), endpoint, tipo)
+    return PlazoExcedido(MENSAJE)
+
+
+# ============ EVENTOS DEL ENGINE ============
+
+def _vigilar_sqlite(dbapi_con, registro):
+    vigilante = registro.info['plazo_sqlite'] = [None]
+
+    def revisar():
+        # Distinto de cero interrumpe la sentencia (sqlite3.OperationalError: interrupted)
+        return vigilante[0] is not None and time.monotonic() > vigilante[0]
+
+    dbapi_con.set_progress_handler(revisar, PASOS_SQLITE)
+
+
+def _soltar_sqlite(dbapi_con, registro):
+    # El ROLLBACK al devolver la conexión no debe interrumpirse
+    vigilante = registro.info.get('plazo_sqlite')
+    if vigilante is not None:
+        vigilante[0] = None
+
+
+def _marcar_transaccion(conn):
+    conn.info['plazo_pendiente'] = True
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    limite = _limite()
+    vigilante = conn.info.get('plazo_sqlite')
+    if vigilante is not None:
+        # Sigue vigente mientras se leen las filas, hasta devolver la conexión
+        vigilante[0] = limite
+    if limite is None:
+        return
+    restante = (limite - time.monotonic()) * 1000.0
+    if restante <= 0:
+        raise _excedido('antes')
+    if conn.info.pop('plazo_pendiente', False):
+        cursor.execute("SELECT set_config('statement_timeout', %s, true)", (str(int(restante) + 1),))
+
+
+def _es_cancelacion(original):
+    # 57014 = query_canceled (psycopg2: pgcode, psycopg 3: sqlstate)
+    codigo = getattr(original, 'pgcode', None) or getattr(original, 'sqlstate', None)
+    return codigo == '57014' or str(original) == 'interrupted'
+
+
+def _traducir_error(contexto):
+    if _limite() is not None and _es_cancelacion(contexto.original_exception):
+        raise _excedido('motor')
+
+
+def registrar_plazos(app):
+    if not app.config.get('PLAZOS_ACTIVOS', True):
+        return
+    with app.app_context():
+        engines = dict(db.engines)
+
+    for engine in engines.values():
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', _vigilar_sqlite)
+            event.listen(engine, 'checkin', _soltar_sqlite)
+        elif engine.dialect.name == 'postgresql':
+            event.listen(engine, 'begin', _marcar_transaccion)
+        event.listen(engine, 'before_cursor_execute', _antes_de_ejecutar)
+        event.listen(engine, 'handle_error', _traducir_error)
+
+    @app.before_request
+    def fijar_plazo():
+        vista = current_app.view_functions.get(request.endpoint)
+        milisegundos = getattr(vista, 'plazo_ms', 0)
+        if milisegundos == 0:
+            milisegundos = app.config['PLAZOS_MS'].get(request.blueprint, app.config['PLAZO_DEFAULT_MS'])
+        iniciar_plazo(milisegundos)
+
+    @app.errorhandler(PlazoExcedido)
+    def plazo_excedido(error):
+        db.session.rollback()
+        cabeceras = {'Retry-After': '2'}
+        if request.is_json or '/api/' in request.path or request.accept_mimetypes.best == 'application/json':
+            return jsonify({'success': False, 'message': str(error), 'conflicto': 'plazo'}), 503, cabeceras
+        return str(error), 503, cabeceras
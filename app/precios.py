@@ -0,0 +1,209 @@
+"""Listas de precios con vigencia (happy hour, temporadas) y cambios masivos.
+
+El precio base es `Producto.precio`. Una lista de precios lo reemplaza para
+algunos productos mientras está vigente: entre `vigente_desde` y
+`vigente_hasta` y, si tiene franja, solo en ese horario y esos días. Las
+listas no se editan: para cambiar precios se crea otra (una versión nueva) y
+se desactiva la anterior. Si varias aplican gana la de mayor prioridad y, a
+igualdad, la más reciente.
+
+Las listas activas se cargan con dos consultas en una `Tarifa` por sucursal,
+válida mientras no cambie la versión de `menu`; resolver un precio no toca la
+base. Los cambios masivos son un solo UPDATE (o INSERT ... SELECT) sobre los
+productos filtrados y no tocan stock ni disponibilidad.
+"""
+import threading
+from decimal import Decimal
+
+from sqlalchemy import func, insert, literal, select, update
+
+from app.database import registrar_escritura
+from app.models import db, ListaPrecios, PrecioLista, Producto, get_mexico_time
+from app.operaciones import ErrorOperacion
+from app.sucursales import sucursal_actual
+from app.versiones import incrementar_version, versiones_recientes
+
+
+class Precios:
+    """Precios que reemplazan al base en un momento dado"""
+
+    def __init__(self, clave, reemplazos):
+        self.clave = clave
+        self._reemplazos = reemplazos
+
+    def de(self, producto):
+        return self._reemplazos.get(producto.id, producto.precio)
+
+
+class Tarifa:
+    """Listas activas de una sucursal con sus precios, de menor a mayor prioridad"""
+
+    def __init__(self, listas, precios):
+        self.listas = sorted(listas, key=lambda l: (l.prioridad, l.vigente_desde, l.id))
+        self._precios = precios
+        self._por_clave = {}
+
+    @classmethod
+    def cargar(cls):
+        listas = db.session.query(
+            ListaPrecios.id, ListaPrecios.prioridad, ListaPrecios.vigente_desde,
+            ListaPrecios.vigente_hasta, ListaPrecios.hora_inicio, ListaPrecios.hora_fin,
+            ListaPrecios.dias,
+        ).filter(
+            ListaPrecios.activo.is_(True),
+            (ListaPrecios.vigente_hasta.is_(None)) | (ListaPrecios.vigente_hasta > get_mexico_time()),
+        ).all()
+        precios = {lista.id: {} for lista in listas}
+        if precios:
+            for lista_id, producto_id, precio in db.session.query(
+                    PrecioLista.lista_id, PrecioLista.producto_id, PrecioLista.precio
+            ).filter(PrecioLista.lista_id.in_(precios)):
+                precios[lista_id][producto_id] = precio
+        return cls(listas, precios)
+
+    @staticmethod
+    def aplica(lista, momento):
+        if momento < lista.vigente_desde or (lista.vigente_hasta and momento >= lista.vigente_hasta):
+            return False
+        if lista.dias and str(momento.weekday()) not in lista.dias:
+            return False
+        if lista.hora_inicio and lista.hora_fin:
+            hora = momento.time()
+            if lista.hora_inicio <= lista.hora_fin:
+                return lista.hora_inicio <= hora < lista.hora_fin
+            # Franja que cruza la medianoche (22:00 a 02:00)
+            return hora >= lista.hora_inicio or hora < lista.hora_fin
+        return True
+
+    def al_momento(self, momento=None):
+        momento = momento or get_mexico_time()
+        vigentes = tuple(l.id for l in self.listas if self.aplica(l, momento))
+        precios = self._por_clave.get(vigentes)
+        if precios is None:
+            reemplazos = {}
+            # En orden de prioridad: la última escritura gana
+            for lista_id in vigentes:
+                reemplazos.update(self._precios[lista_id])
+            precios = Precios(','.join(map(str, vigentes)) or 'base', reemplazos)
+            self._por_clave[vigentes] = precios
+        return precios
+
+
+class _Tarifas:
+    """Una tarifa por sucursal y proceso, válida mientras no cambie la versión de `menu`"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tarifas = {}
+
+    def obtener(self):
+        version = versiones_recientes.obtener('menu')
+        sucursal = sucursal_actual()
+        guardado = self._tarifas.get(sucursal)
+        if guardado is not None and guardado[0] == version:
+            return guardado[1]
+        tarifa = Tarifa.cargar()
+        with self._lock:
+            self._tarifas[sucursal] = (version, tarifa)
+        return tarifa
+
+
+tarifas = _Tarifas()
+
+
+def precios_vigentes(momento=None):
+    return tarifas.obtener().al_momento(momento)
+
+
+def precio_vigente(producto, momento=None):
+    """Precio que se cobra ahora: el de la lista vigente o el base"""
+    return precios_vigentes(momento).de(producto)
+
+
+# ============ CAMBIOS MASIVOS ============
+
+def _nuevo_precio(columna, porcentaje, monto):
+    if porcentaje is None and monto is None:
+        raise ErrorOperacion('Indica un porcentaje o un monto.')
+    factor = Decimal(1) + Decimal(str(porcentaje or 0)) / 100
+    return func.round(columna * factor + Decimal(str(monto or 0)), 2)
+
+
+def _filtros(categoria_id, producto_ids):
+    filtros = []
+    if categoria_id:
+        filtros.append(Producto.categoria_id == categoria_id)
+    if producto_ids:
+        filtros.append(Producto.id.in_(producto_ids))
+    return filtros
+
+
+def actualizar_precios(porcentaje=None, monto=None, categoria_id=None, producto_ids=None):
+    """Subir o bajar el precio base de varios productos con un solo UPDATE (sin commit)"""
+    nuevo = _nuevo_precio(Producto.precio, porcentaje, monto)
+    filtros = _filtros(categoria_id, producto_ids)
+    # Sin filtro el UPDATE cambiaría todo el menú de la sucursal
+    if not filtros:
+        raise ErrorOperacion('Indica la categoría o los productos.')
+    invalidos = db.session.query(func.count(Producto.id)).filter(*filtros, nuevo <= 0).scalar()
+    if invalidos:
+        raise ErrorOperacion(f'{invalidos} productos quedarían con precio menor o igual a cero.')
+    resultado = db.session.execute(
+        update(Producto).where(*filtros).values(precio=nuevo)
+        .execution_options(synchronize_session=False)
+    )
+    # El UPDATE masivo no pasa por el flush: avisar a las cachés del menú y leer del primario
+    incrementar_version('menu')
+    registrar_escritura()
+    return resultado.rowcount
+
+
+def crear_lista(nombre, usuario, precios=None, porcentaje=None, monto=None, categoria_id=None,
+                producto_ids=None, **vigencia):
+    """Nueva lista con precios explícitos ({producto_id: precio}) o calculados
+    sobre el precio base de los productos filtrados (sin commit)"""
+    if not nombre:
+        raise ErrorOperacion('El nombre de la lista es obligatorio.')
+    hasta, desde = vigencia.get('vigente_hasta'), vigencia.get('vigente_desde')
+    if hasta and hasta <= (desde or get_mexico_time()):
+        raise ErrorOperacion('La vigencia de la lista no es válida.')
+    if bool(vigencia.get('hora_inicio')) != bool(vigencia.get('hora_fin')):
+        raise ErrorOperacion('Indica el inicio y el fin de la franja horaria.')
+    if vigencia.get('dias') and not set(vigencia['dias']) <= set('0123456'):
+        raise ErrorOperacion('Días no válidos (0 = lunes ... 6 = domingo).')
+
+    lista = ListaPrecios(nombre=nombre, usuario_id=usuario.id,
+                         **{k: v for k, v in vigencia.items() if v is not None})
+    db.session.add(lista)
+    db.session.flush()
+
+    if precios:
+        precios = {int(p): Decimal(str(v)) for p, v in precios.items()}
+        if any(v <= 0 for v in precios.values()):
+            raise ErrorOperacion('Los precios deben ser mayores a cero.')
+        # Solo productos de la sucursal (la consulta ya va filtrada)
+        existentes = set(db.session.scalars(select(Producto.id).where(Producto.id.in_(precios))))
+        if existentes != set(precios):
+            raise ErrorOperacion('Hay productos que no existen.', 'no_encontrado', 404)
+        db.session.execute(insert(PrecioLista), [
+            {'lista_id': lista.id, 'producto_id': p, 'precio': v} for p, v in precios.items()])
+    else:
+        nuevo = _nuevo_precio(Producto.precio, porcentaje, monto)
+        # INSERT ... SELECT no pasa por el filtro del ORM: la sucursal va explícita
+        resultado = db.session.execute(
+            insert(PrecioLista).from_select(
+                ['lista_id', 'producto_id', 'precio'],
+                select(literal(lista.id), Producto.id, nuevo).where(
+                    Producto.sucursal_id == lista.sucursal_id, nuevo > 0,
+                    *_filtros(categoria_id, producto_ids)),
+            )
+        )
+        if not resultado.rowcount:
+            raise ErrorOperacion('Ningún producto coincide con el filtro.')
+    return lista
+
+
+def desactivar_lista(lista):
+    if not lista.activo:
+        raise ErrorOperacion('La lista ya está desactivada.', 'lista_inactiva', 409)
+    lista.activo = False
@@ -0,0 +1,156 @@
+"""Reservas de mesa y búsqueda de disponibilidad.
+
+Las reservas activas de los próximos días se cargan con una sola consulta en
+un índice por mesa: listas de inicios y fines ordenados (en una mesa no se
+traslapan), así que saber si una mesa está libre en [inicio, fin) es una
+búsqueda binaria. El índice se reconstruye cuando cambia la versión de
+`reservas` o de `mesas` (app.versiones), o cuando cambia el día.
+
+Crear una reserva vuelve a comprobar el traslape en la base con la mesa
+bloqueada: el índice solo sirve para buscar, no para garantizar.
+"""
+import threading
+from bisect import bisect_left
+from datetime import timedelta
+
+from app.models import db, Mesa, Reserva, get_mexico_time
+from app.operaciones import ErrorOperacion
+from app.sucursales import sucursal_actual
+from app.versiones import leer_versiones
+
+ESTADOS_RESERVA = ('confirmada', 'sentada', 'cancelada', 'no_llego')
+# Las que ocupan la mesa en su horario
+RESERVAS_ACTIVAS = ('confirmada', 'sentada')
+HORIZONTE = timedelta(days=62)
+DURACION_MAXIMA = timedelta(hours=8)
+
+
+class IndiceReservas:
+    """Horarios reservados por mesa en [desde, hasta), más la capacidad de cada mesa"""
+
+    def __init__(self, mesas, reservas, desde, hasta):
+        self.desde, self.hasta = desde, hasta
+        # Para asignar la mesa más chica que alcance
+        self.mesas = sorted(mesas, key=lambda m: (m[2], m[1]))
+        self._por_mesa = {mesa_id: ([], [], []) for mesa_id, _, _ in mesas}
+        for reserva_id, mesa_id, inicio, fin in sorted(reservas, key=lambda r: r[2]):
+            inicios, fines, ids = self._por_mesa.setdefault(mesa_id, ([], [], []))
+            inicios.append(inicio)
+            fines.append(fin)
+            ids.append(reserva_id)
+
+    @classmethod
+    def cargar(cls, desde, hasta):
+        mesas = db.session.query(Mesa.id, Mesa.numero, Mesa.capacidad).all()
+        reservas = db.session.query(Reserva.id, Reserva.mesa_id, Reserva.inicio, Reserva.fin).filter(
+            Reserva.estado.in_(RESERVAS_ACTIVAS),
+            Reserva.inicio < hasta,
+            Reserva.fin > desde,
+        ).all()
+        return cls(mesas, reservas, desde, hasta)
+
+    def cubre(self, inicio, fin):
+        return self.desde <= inicio and fin <= self.hasta
+
+    def choque(self, mesa_id, inicio, fin):
+        """Id de la reserva que se traslapa con [inicio, fin) en la mesa, o None"""
+        inicios, fines, ids = self._por_mesa.get(mesa_id, ((), (), ()))
+        # La última reserva que empieza antes de `fin` es la única que puede chocar
+        i = bisect_left(inicios, fin) - 1
+        if i >= 0 and fines[i] > inicio:
+            return ids[i]
+        return None
+
+    def disponibles(self, personas, inicio, fin):
+        """Mesas libres con capacidad suficiente, de la más chica a la más grande"""
+        return [{'id': mesa_id, 'numero': numero, 'capacidad': capacidad}
+                for mesa_id, numero, capacidad in self.mesas
+                if capacidad >= personas and self.choque(mesa_id, inicio, fin) is None]
+
+
+class _Indices:
+    """Un índice por sucursal y proceso, válido mientras no cambien las versiones"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indices = {}
+
+    def obtener(self):
+        versiones = leer_versiones('reservas', 'mesas')
+        hoy = get_mexico_time().replace(hour=0, minute=0, second=0, microsecond=0)
+        clave = (versiones['reservas'], versiones['mesas'], hoy)
+        sucursal = sucursal_actual()
+        with self._lock:
+            guardado = self._indices.get(sucursal)
+        if guardado is not None and guardado[0] == clave:
+            return guardado[1]
+        # Desde ayer: cubre las reservas de la noche que terminan después de medianoche
+        indice = IndiceReservas.cargar(hoy - timedelta(days=1), hoy + HORIZONTE)
+        with self._lock:
+            self._indices[sucursal] = (clave, indice)
+        return indice
+
+
+indices = _Indices()
+
+
+def buscar_disponibles(personas, inicio, fin):
+    indice = indices.obtener()
+    if not indice.cubre(inicio, fin):
+        indice = IndiceReservas.cargar(inicio, fin)
+    return indice.disponibles(personas, inicio, fin)
+
+
+def _validar_horario(inicio, fin, personas):
+    if personas is None or personas < 1:
+        raise ErrorOperacion('Indica cuántas personas son.')
+    if fin <= inicio or fin - inicio > DURACION_MAXIMA:
+        raise ErrorOperacion('La duración de la reserva no es válida.')
+    if inicio < get_mexico_time() - timedelta(minutes=15):
+        raise ErrorOperacion('No se puede reservar en un horario que ya pasó.')
+
+
+def crear_reserva(cliente, personas, inicio, fin, usuario, mesa_id=None, telefono=None,
+                  observaciones=None):
+    """Reservar la mesa indicada o, sin mesa, la más chica disponible"""
+    if not cliente:
+        raise ErrorOperacion('El nombre del cliente es obligatorio.')
+    _validar_horario(inicio, fin, personas)
+    if mesa_id is None:
+        libres = buscar_disponibles(personas, inicio, fin)
+        if not libres:
+            raise ErrorOperacion('No hay mesas disponibles para ese horario.', 'sin_mesa', 409)
+        mesa_id = libres[0]['id']
+
+    # Bloquear la mesa para que dos reservas simultáneas no pasen ambas la comprobación
+    mesa = Mesa.query.filter_by(id=mesa_id).with_for_update().first()
+    if mesa is None:
+        raise ErrorOperacion('Mesa no encontrada.', 'no_encontrada', 404)
+    if mesa.capacidad < personas:
+        raise ErrorOperacion(f'La mesa {mesa.numero} es para {mesa.capacidad} personas.')
+    choque = Reserva.query.filter(
+        Reserva.mesa_id == mesa.id,
+        Reserva.estado.in_(RESERVAS_ACTIVAS),
+        Reserva.inicio < fin,
+        Reserva.fin > inicio,
+    ).first()
+    if choque:
+        raise ErrorOperacion(
+            f'La mesa {mesa.numero} ya está reservada de {choque.inicio:%H:%M} a {choque.fin:%H:%M}.',
+            'mesa_reservada', 409)
+
+    reserva = Reserva(mesa_id=mesa.id, cliente=cliente, telefono=telefono, personas=personas,
+                      inicio=inicio, fin=fin, observaciones=observaciones,
+                      usuario_id=usuario.id, estado='confirmada')
+    db.session.add(reserva)
+    return reserva
+
+
+def cambiar_estado_reserva(reserva, nuevo_estado):
+    if nuevo_estado not in ESTADOS_RESERVA:
+        raise ErrorOperacion('Estado no válido.')
+    if reserva.estado in ('cancelada', 'no_llego'):
+        raise ErrorOperacion('La reserva ya está cerrada.', 'reserva_cerrada', 409)
+    reserva.estado = nuevo_estado
+    if nuevo_estado == 'sentada' and reserva.mesa.estado in ('disponible', 'reservada'):
+        reserva.mesa.estado = 'ocupada'
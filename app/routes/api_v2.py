@@ -0,0 +1,480 @@
+"""API JSON v2 para clientes nativos (tabletas).
+
+    GET    /api/v2/<recurso>?campos=id,estado&estado=pendiente&limite=100&desde_id=0
+    GET    /api/v2/<recurso>/<id>?campos=...
+    POST   /api/v2/comandas                {mesa_id, observaciones, detalles: [...]}
+    POST   /api/v2/comandas/<id>/detalles  {detalles: [{producto_id, cantidad, observaciones}]}
+    PATCH  /api/v2/comandas/<id>           {estado}
+    DELETE /api/v2/detalles/<id>
+    PATCH  /api/v2/mesas/<id>              {estado}
+    POST   /api/v2/pagos                   {comanda_id, metodo_pago, monto_recibido}
+
+Las marcas de tiempo salen en UTC con zona explícita (`+00:00`) y
+`fecha_negocio` como fecha; `?fecha_negocio=2026-10-18` filtra por día de negocio.
+
+`campos` elige qué se serializa y también qué se carga: cada campo declara
+sus columnas y sus opciones de carga (joinedload/selectinload), así que pedir
+`mesa` trae la mesa en el mismo SELECT y no pedirla no la toca. Las listas de
+conjuntos con versión (mesas, comandas, menú) responden 304 sin consultar la
+base si el cliente manda el ETag de la versión que ya tiene.
+"""
+import hashlib
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from functools import lru_cache
+
+from flask import Blueprint, Response, request
+from flask_login import current_user
+from sqlalchemy import Boolean, Date, Integer
+from sqlalchemy.orm import configure_mappers, joinedload, load_only, selectinload
+
+from app.models import db, Comanda, DetalleComanda, Mesa, Pago, Producto, Turno
+from app.operaciones import (ErrorOperacion, agregar_producto, cambiar_estado_comanda,
+                             cambiar_estado_mesa, crear_comanda, quitar_producto, registrar_pago)
+from app.sucursales import sucursal_actual
+from app.versiones import leer_versiones
+
+try:
+    import orjson
+except ImportError:  # Opcional: con json de la biblioteca estándar funciona igual, más lento
+    orjson = None
+
+api_v2_bp = Blueprint('api_v2', __name__)
+
+# Las relaciones con backref (Producto.categoria, Comanda.mesa) existen hasta
+# configurar los mappers, y los planes de carga de abajo las usan al importar
+configure_mappers()
+
+LIMITE_DEFAULT = 100
+LIMITE_MAX = 500
+
+
+# ==========================================
+# SERIALIZACIÓN
+# ==========================================
+
+def _convertir(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, datetime):
+        # Guardadas en UTC sin tzinfo
+        return valor.replace(tzinfo=timezone.utc).isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    raise TypeError(f'No serializable: {type(valor).__name__}')
+
+
+def a_json(datos):
+    if orjson is not None:
+        return orjson.dumps(datos, default=_convertir, option=orjson.OPT_NAIVE_UTC)
+    return json.dumps(datos, default=_convertir, separators=(',', ':'),
+                      ensure_ascii=False).encode('utf-8')
+
+
+def respuesta(datos, status=200, etag=None):
+    """JSON con ETag; 304 si el cliente ya tiene esa versión"""
+    cuerpo = a_json(datos)
+    if status == 200:
+        etag = etag or hashlib.sha1(cuerpo).hexdigest()
+        if etag in request.if_none_match:
+            return _no_modificado(etag)
+    resp = Response(cuerpo, status=status, mimetype='application/json')
+    if etag:
+        resp.set_etag(etag)
+        resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp
+
+
+def _no_modificado(etag):
+    resp = Response(status=304)
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp
+
+
+def error(mensaje, status=400, conflicto=None):
+    datos = {'success': False, 'message': mensaje}
+    if conflicto:
+        datos['conflicto'] = conflicto
+    return respuesta(datos, status)
+
+
+# ==========================================
+# RECURSOS
+# ==========================================
+
+class Campo:
+    """Cómo leer un campo y qué hay que cargar para leerlo sin consultas extra"""
+
+    def __init__(self, obtener, columnas=(), opciones=()):
+        self.obtener = obtener
+        self.columnas = columnas
+        self.opciones = opciones
+
+
+def columna(nombre):
+    return Campo(lambda obj: getattr(obj, nombre), columnas=(nombre,))
+
+
+class Recurso:
+
+    def __init__(self, modelo, campos, por_defecto, roles, conjunto=None, filtros=()):
+        self.modelo = modelo
+        self.campos = campos
+        self.por_defecto = tuple(por_defecto)
+        self.roles = roles
+        # Conjunto de app.versiones cuya versión cambia con cualquier escritura
+        self.conjunto = conjunto
+        self.filtros = filtros
+
+
+def _detalle_dict(d):
+    return {
+        'id': d.id,
+        'producto_id': d.producto_id,
+        'producto': d.producto.nombre,
+        'cantidad': d.cantidad,
+        'precio_unitario': d.precio_unitario,
+        'subtotal': d.subtotal,
+        'observaciones': d.observaciones,
+    }
+
+
+def _columnas(*nombres):
+    return {n: columna(n) for n in nombres}
+
+
+RECURSOS = {
+    'mesas': Recurso(
+        Mesa,
+        _columnas('id', 'numero', 'capacidad', 'ubicacion', 'estado'),
+        por_defecto=('id', 'numero', 'capacidad', 'ubicacion', 'estado'),
+        roles=('admin', 'mesero', 'caja', 'cocina'),
+        conjunto='mesas',
+        filtros=('estado', 'ubicacion'),
+    ),
+    'productos': Recurso(
+        Producto,
+        dict(_columnas('id', 'nombre', 'descripcion', 'precio', 'categoria_id', 'stock',
+                       'stock_minimo', 'disponible'),
+             categoria=Campo(lambda p: p.categoria.nombre, ('categoria_id',),
+                             (joinedload(Producto.categoria),))),
+        por_defecto=('id', 'nombre', 'precio', 'categoria_id', 'disponible'),
+        roles=('admin', 'mesero', 'caja', 'cocina'),
+        conjunto='menu',
+        filtros=('categoria_id', 'disponible'),
+    ),
+    'comandas': Recurso(
+        Comanda,
+        dict(_columnas('id', 'mesa_id', 'mesero_id', 'estado', 'observaciones', 'subtotal',
+                       'total', 'fecha_creacion', 'fecha_actualizacion', 'fecha_negocio'),
+             mesa=Campo(lambda c: c.mesa.numero, ('mesa_id',), (joinedload(Comanda.mesa),)),
+             mesas_unidas=Campo(lambda c: [m.numero for m in c.mesas_unidas], (),
+                                (selectinload(Comanda.mesas_unidas),)),
+             mesero=Campo(lambda c: c.mesero.nombre, ('mesero_id',), (joinedload(Comanda.mesero),)),
+             pagada=Campo(lambda c: c.pago is not None, (), (selectinload(Comanda.pago),)),
+             detalles=Campo(lambda c: [_detalle_dict(d) for d in c.detalles], (),
+                            (selectinload(Comanda.detalles).joinedload(DetalleComanda.producto),))),
+        por_defecto=('id', 'mesa_id', 'mesa', 'estado', 'total', 'fecha_creacion'),
+        roles=('admin', 'mesero', 'caja', 'cocina'),
+        conjunto='comandas',
+        filtros=('estado', 'mesa_id', 'mesero_id', 'fecha_negocio'),
+    ),
+    'detalles': Recurso(
+        DetalleComanda,
+        dict(_columnas('id', 'comanda_id', 'producto_id', 'cantidad', 'precio_unitario',
+                       'subtotal', 'observaciones'),
+             producto=Campo(lambda d: d.producto.nombre, ('producto_id',),
+                            (joinedload(DetalleComanda.producto),))),
+        por_defecto=('id', 'comanda_id', 'producto_id', 'producto', 'cantidad', 'subtotal'),
+        roles=('admin', 'mesero', 'caja', 'cocina'),
+        conjunto='comandas',
+        filtros=('comanda_id', 'producto_id'),
+    ),
+    'turnos': Recurso(
+        Turno,
+        dict(_columnas('id', 'usuario_id', 'fecha_apertura', 'fecha_cierre', 'monto_inicial',
+                       'monto_final', 'estado', 'observaciones', 'fecha_negocio'),
+             usuario=Campo(lambda t: t.usuario.nombre, ('usuario_id',), (joinedload(Turno.usuario),))),
+        por_defecto=('id', 'usuario_id', 'fecha_apertura', 'fecha_cierre', 'estado'),
+        roles=('admin', 'caja'),
+        filtros=('estado', 'usuario_id', 'fecha_negocio'),
+    ),
+    'pagos': Recurso(
+        Pago,
+        _columnas('id', 'comanda_id', 'turno_id', 'metodo_pago', 'monto', 'monto_recibido',
+                  'cambio', 'fecha_pago', 'fecha_negocio'),
+        por_defecto=('id', 'comanda_id', 'turno_id', 'metodo_pago', 'monto', 'fecha_pago'),
+        roles=('admin', 'caja'),
+        conjunto='comandas',
+        filtros=('turno_id', 'comanda_id', 'metodo_pago', 'fecha_negocio'),
+    ),
+}
+
+
+def _campos_pedidos(recurso):
+    texto = request.args.get('campos')
+    if not texto:
+        return recurso.por_defecto
+    campos = tuple(dict.fromkeys(c.strip() for c in texto.split(',') if c.strip()))
+    desconocidos = [c for c in campos if c not in recurso.campos]
+    if desconocidos:
+        raise ErrorOperacion(f'Campos desconocidos: {", ".join(desconocidos)}')
+    return campos
+
+
+@lru_cache(maxsize=256)
+def _plan_de_carga(nombre, campos):
+    """Opciones de carga para un conjunto de campos: solo sus columnas y relaciones"""
+    recurso = RECURSOS[nombre]
+    columnas = {'id'}
+    opciones = []
+    for campo in campos:
+        columnas.update(recurso.campos[campo].columnas)
+        opciones.extend(recurso.campos[campo].opciones)
+    modelo = recurso.modelo
+    return (load_only(*[getattr(modelo, c) for c in sorted(columnas)]), *opciones)
+
+
+def _serializar(recurso, obj, campos):
+    return {c: recurso.campos[c].obtener(obj) for c in campos}
+
+
+def _convertir_filtro(columna_sql, valor):
+    if isinstance(columna_sql.type, Boolean):
+        return valor.strip().lower() in ('1', 'true', 'si', 'yes')
+    if isinstance(columna_sql.type, Integer):
+        return int(valor)
+    if isinstance(columna_sql.type, Date):
+        return date.fromisoformat(valor)
+    return valor
+
+
+def _consulta(recurso):
+    """Consulta base del recurso con las restricciones del rol"""
+    modelo = recurso.modelo
+    query = modelo.query
+    if current_user.rol == 'mesero' and modelo is Comanda:
+        query = query.filter(Comanda.mesero_id == current_user.id)
+    elif current_user.rol == 'mesero' and modelo is DetalleComanda:
+        query = query.join(Comanda).filter(Comanda.mesero_id == current_user.id)
+    elif current_user.rol == 'caja' and modelo is Turno:
+        query = query.filter(Turno.usuario_id == current_user.id)
+    return query
+
+
+def _etag_de_version(recurso):
+    """ETag que depende solo de la versión del conjunto, la URL, el usuario y la sucursal"""
+    if not recurso.conjunto:
+        return None
+    version = leer_versiones(recurso.conjunto)[recurso.conjunto]
+    clave = (f'{recurso.conjunto}:{version}:{request.full_path}:{current_user.id}:'
+             f'{sucursal_actual()}')
+    return hashlib.sha1(clave.encode('utf-8')).hexdigest()
+
+
+def _obtener_recurso(nombre):
+    recurso = RECURSOS.get(nombre)
+    if recurso is None:
+        raise ErrorOperacion('Recurso desconocido', 'no_encontrado', 404)
+    if current_user.rol not in recurso.roles:
+        raise ErrorOperacion('No autorizado', 'no_permitida', 403)
+    return recurso
+
+
+def _cargar(nombre, id):
+    """Objeto del recurso respetando las restricciones del rol, o 404"""
+    recurso = _obtener_recurso(nombre)
+    obj = _consulta(recurso).filter(recurso.modelo.id == id).first()
+    if obj is None:
+        raise ErrorOperacion('No encontrado', 'no_encontrado', 404)
+    return obj
+
+
+# ==========================================
+# LECTURA
+# ==========================================
+
+@api_v2_bp.before_request
+def requerir_sesion():
+    if not current_user.is_authenticated:
+        return error('Sesión requerida', 401)
+
+
+@api_v2_bp.errorhandler(ErrorOperacion)
+def manejar_error(e):
+    db.session.rollback()
+    return error(e.mensaje, e.status, e.conflicto)
+
+
+@api_v2_bp.route('/<recurso_nombre>')
+def listar(recurso_nombre):
+    """Listar un recurso con campos, filtros y paginación por id"""
+    recurso = _obtener_recurso(recurso_nombre)
+    campos = _campos_pedidos(recurso)
+    etag = _etag_de_version(recurso)
+    if etag and etag in request.if_none_match:
+        return _no_modificado(etag)
+
+    try:
+        limite = min(max(request.args.get('limite', LIMITE_DEFAULT, type=int), 1), LIMITE_MAX)
+        desde_id = request.args.get('desde_id', 0, type=int)
+        query = _consulta(recurso).filter(recurso.modelo.id > desde_id)
+        for filtro in recurso.filtros:
+            valor = request.args.get(filtro)
+            if valor is None:
+                continue
+            columna_sql = getattr(recurso.modelo, filtro)
+            valores = [_convertir_filtro(columna_sql, v) for v in valor.split(',')]
+            query = query.filter(columna_sql.in_(valores))
+    except ValueError:
+        raise ErrorOperacion('Filtro inválido')
+
+    filas = query.options(*_plan_de_carga(recurso_nombre, campos)) \
+        .order_by(recurso.modelo.id).limit(limite).all()
+    return respuesta({
+        'datos': [_serializar(recurso, f, campos) for f in filas],
+        'siguiente': filas[-1].id if len(filas) == limite else None,
+    }, etag=etag)
+
+
+@api_v2_bp.route('/<recurso_nombre>/<int:id>')
+def ver(recurso_nombre, id):
+    """Un elemento de un recurso"""
+    recurso = _obtener_recurso(recurso_nombre)
+    campos = _campos_pedidos(recurso)
+    etag = _etag_de_version(recurso)
+    if etag and etag in request.if_none_match:
+        return _no_modificado(etag)
+    obj = _consulta(recurso).options(*_plan_de_carga(recurso_nombre, campos)) \
+        .filter(recurso.modelo.id == id).first()
+    if obj is None:
+        raise ErrorOperacion('No encontrado', 'no_encontrado', 404)
+    return respuesta(_serializar(recurso, obj, campos), etag=etag)
+
+
+# ==========================================
+# ESCRITURA (una petición por acción)
+# ==========================================
+
+def _requerir_rol(*roles):
+    if current_user.rol not in roles:
+        raise ErrorOperacion('No autorizado', 'no_permitida', 403)
+
+
+def _datos():
+    datos = request.get_json(silent=True) or {}
+    if not isinstance(datos, dict):
+        raise ErrorOperacion('El cuerpo debe ser un objeto JSON.')
+    return datos
+
+
+def _es_entero(valor):
+    # bool es int en Python: true no es un id ni una cantidad
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+
+def _agregar_detalles(comanda, detalles):
+    if not isinstance(detalles, list):
+        raise ErrorOperacion('detalles debe ser una lista')
+    for item in detalles:
+        if not isinstance(item, dict):
+            raise ErrorOperacion('Cada detalle debe ser un objeto.')
+        producto_id, cantidad = item.get('producto_id'), item.get('cantidad')
+        if not _es_entero(producto_id):
+            raise ErrorOperacion('producto_id debe ser un entero.')
+        if not _es_entero(cantidad) or cantidad <= 0:
+            raise ErrorOperacion('cantidad debe ser un entero mayor a cero.')
+        if not isinstance(item.get('observaciones'), (str, type(None))):
+            raise ErrorOperacion('observaciones debe ser texto.')
+        producto = db.session.get(Producto, producto_id)
+        if producto is None:
+            raise ErrorOperacion('Producto no encontrado.', 'no_encontrado', 404)
+        agregar_producto(comanda, producto, cantidad, item.get('observaciones'))
+
+
+def _comanda_respuesta(comanda, status=200):
+    recurso = RECURSOS['comandas']
+    campos = _campos_pedidos(recurso)
+    if 'campos' not in request.args:
+        campos = recurso.por_defecto + ('detalles',)
+    return respuesta(_serializar(recurso, comanda, campos), status)
+
+
+@api_v2_bp.route('/comandas', methods=['POST'])
+def crear_comanda_api():
+    """Abrir una comanda (con sus productos) en una sola petición"""
+    _requerir_rol('admin', 'mesero')
+    datos = _datos()
+    if not _es_entero(datos.get('mesa_id')):
+        raise ErrorOperacion('mesa_id debe ser un entero.')
+    ids_unidas = datos.get('mesas_unidas') or []
+    if not isinstance(ids_unidas, list) or not all(_es_entero(i) for i in ids_unidas):
+        raise ErrorOperacion('mesas_unidas debe ser una lista de enteros.')
+    if not isinstance(datos.get('observaciones'), (str, type(None))):
+        raise ErrorOperacion('observaciones debe ser texto.')
+    mesa = db.session.get(Mesa, datos['mesa_id'])
+    if mesa is None:
+        raise ErrorOperacion('Mesa no encontrada.', 'no_encontrada', 404)
+    unidas = Mesa.query.filter(Mesa.id.in_(ids_unidas)).all() if ids_unidas else []
+    if len(unidas) != len(set(ids_unidas)):
+        raise ErrorOperacion('Mesa unida no encontrada.', 'no_encontrada', 404)
+    comanda = crear_comanda(mesa, current_user, datos.get('observaciones'), unidas)
+    _agregar_detalles(comanda, datos.get('detalles') or [])
+    db.session.commit()
+    return _comanda_respuesta(comanda, 201)
+
+
+@api_v2_bp.route('/comandas/<int:id>/detalles', methods=['POST'])
+def agregar_detalles_api(id):
+    """Agregar uno o varios productos a una comanda"""
+    _requerir_rol('admin', 'mesero')
+    comanda = _cargar('comandas', id)
+    datos = _datos()
+    _agregar_detalles(comanda, datos['detalles'] if 'detalles' in datos else [datos])
+    db.session.commit()
+    return _comanda_respuesta(comanda, 201)
+
+
+@api_v2_bp.route('/comandas/<int:id>', methods=['PATCH'])
+def cambiar_estado_comanda_api(id):
+    """Cambiar el estado de una comanda"""
+    comanda = _cargar('comandas', id)
+    cambiar_estado_comanda(comanda, _datos().get('estado'), current_user)
+    db.session.commit()
+    return _comanda_respuesta(comanda)
+
+
+@api_v2_bp.route('/detalles/<int:id>', methods=['DELETE'])
+def quitar_detalle_api(id):
+    """Quitar un producto de una comanda"""
+    _requerir_rol('admin', 'mesero')
+    comanda = quitar_producto(_cargar('detalles', id))
+    db.session.commit()
+    return _comanda_respuesta(comanda)
+
+
+@api_v2_bp.route('/mesas/<int:id>', methods=['PATCH'])
+def cambiar_estado_mesa_api(id):
+    """Cambiar el estado de una mesa"""
+    _requerir_rol('admin', 'mesero')
+    mesa = _cargar('mesas', id)
+    cambiar_estado_mesa(mesa, _datos().get('estado'))
+    db.session.commit()
+    return respuesta(_serializar(RECURSOS['mesas'], mesa, RECURSOS['mesas'].por_defecto))
+
+
+@api_v2_bp.route('/pagos', methods=['POST'])
+def registrar_pago_api():
+    """Cobrar una comanda entregada"""
+    _requerir_rol('admin', 'caja')
+    datos = _datos()
+    comanda = db.session.get(Comanda, datos.get('comanda_id') or 0)
+    if comanda is None:
+        raise ErrorOperacion('Comanda no encontrada.', 'no_encontrada', 404)
+    pago = registrar_pago(comanda, datos.get('metodo_pago'), datos.get('monto_recibido'),
+                          current_user)
+    db.session.commit()
+    recurso = RECURSOS['pagos']
+    return respuesta(_serializar(recurso, pago, recurso.campos.keys()), 201)
@@ -1,9 +1,11 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from app.models import db, Turno, Pago, Comanda, Mesa, get_mexico_time
+from app.models import db, Turno, Pago, Comanda, Mesa, get_utc_time
 from app.auth import role_required
+from app.database import lectura_replica
+from app.operaciones import ErrorOperacion, registrar_pago, turno_abierto
 from sqlalchemy import func, desc
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 caja_bp = Blueprint('caja', __name__)
 
@@ -116,7 +118,7 @@ def cerrar_turno():
             return redirect(url_for('caja.cerrar_turno'))
         
         turno.monto_final = monto_final
-        turno.fecha_cierre = get_mexico_time()
+        turno.fecha_cierre = get_utc_time()
         turno.estado = 'cerrado'
         if observaciones:
             turno.observaciones = f"{turno.observaciones or ''}\nCierre: {observaciones}"
@@ -156,12 +158,7 @@ def procesar_pago(comanda_id):
         return redirect(url_for('caja.index'))
     
     # Verificar turno activo
-    turno_activo = Turno.query.filter_by(
-        usuario_id=current_user.id,
-        estado='abierto'
-    ).first()
-    
-    if not turno_activo:
+    if not turno_abierto(current_user):
         flash('Debes tener un turno abierto para procesar pagos.', 'danger')
         return redirect(url_for('caja.abrir_turno'))
     
@@ -169,38 +166,15 @@ def procesar_pago(comanda_id):
         metodo_pago = request.form.get('metodo_pago')
         monto_recibido = request.form.get('monto_recibido', type=float)
         
-        if metodo_pago not in ['Efectivo', 'Tarjeta', 'Transferencia']:
-            flash('Método de pago inválido.', 'danger')
-            return render_template('caja/procesar_pago.html', comanda=comanda)
-        
-        # Calcular cambio para efectivo
-        cambio = 0
-        if metodo_pago == 'Efectivo':
-            if not monto_recibido or monto_recibido < float(comanda.total):
-                flash('El monto recibido es insuficiente.', 'warning')
-                return render_template('caja/procesar_pago.html', comanda=comanda)
-            cambio = monto_recibido - float(comanda.total)
-        else:
-            monto_recibido = float(comanda.total)
-        
-        # Crear el pago
-        pago = Pago(
-            comanda_id=comanda.id,
-            metodo_pago=metodo_pago,
-            monto=comanda.total,
-            monto_recibido=monto_recibido,
-            cambio=cambio,
-            turno_id=turno_activo.id
-        )
-        
         try:
-            db.session.add(pago)
-            # Liberar la mesa
-            comanda.mesa.estado = 'limpieza'
+            pago = registrar_pago(comanda, metodo_pago, monto_recibido, current_user)
             db.session.commit()
             
-            flash(f'Pago procesado exitosamente. Cambio: ${cambio:.2f}', 'success')
+            flash(f'Pago procesado exitosamente. Cambio: ${pago.cambio:.2f}', 'success')
             return redirect(url_for('caja.ticket', id=pago.id))
+        except ErrorOperacion as e:
+            db.session.rollback()
+            flash(e.mensaje, 'warning')
         except Exception as e:
             db.session.rollback()
             flash(f'Error al procesar el pago: {str(e)}', 'danger')
@@ -218,24 +192,32 @@ def ticket(id):
 @caja_bp.route('/historial-turnos')
 @login_required
 @role_required('admin', 'caja')
+@lectura_replica
 def historial_turnos():
-    """Ver historial de turnos"""
+    """Ver historial de turnos (opcionalmente de un rango de días de negocio)"""
     page = request.args.get('page', 1, type=int)
     
-    if current_user.rol == 'admin':
-        turnos = Turno.query.order_by(desc(Turno.fecha_apertura)).paginate(
-            page=page, per_page=20, error_out=False
-        )
-    else:
-        turnos = Turno.query.filter_by(usuario_id=current_user.id).order_by(
-            desc(Turno.fecha_apertura)
-        ).paginate(page=page, per_page=20, error_out=False)
+    query = Turno.query
+    if current_user.rol != 'admin':
+        query = query.filter_by(usuario_id=current_user.id)
+    try:
+        if request.args.get('desde'):
+            query = query.filter(Turno.fecha_negocio >= date.fromisoformat(request.args['desde']))
+        if request.args.get('hasta'):
+            query = query.filter(Turno.fecha_negocio <= date.fromisoformat(request.args['hasta']))
+    except ValueError:
+        flash('Fecha no válida (usa AAAA-MM-DD).', 'warning')
+        return redirect(url_for('caja.historial_turnos'))
+    turnos = query.order_by(desc(Turno.fecha_apertura)).paginate(
+        page=page, per_page=20, error_out=False
+    )
     
     return render_template('caja/historial_turnos.html', turnos=turnos)
 
 @caja_bp.route('/reporte-turno/<int:id>')
 @login_required
 @role_required('admin', 'caja')
+@lectura_replica
 def reporte_turno(id):
     """Ver reporte detallado de un turno"""
     turno = Turno.query.get_or_404(id)
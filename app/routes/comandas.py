@@ -1,7 +1,21 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+import os
+
+from flask import (Blueprint, render_template, request, redirect, url_for, flash, jsonify,
+                   current_app, send_from_directory, abort)
 from flask_login import login_required, current_user
-from app.models import db, Comanda, DetalleComanda, Mesa, Producto, get_mexico_time
+from app.models import (db, Categoria, Comanda, DetalleComanda, Mesa, OperacionSync, Producto,
+                        a_hora_local)
+from app.operaciones import (ESTADOS_ACTIVOS, ErrorOperacion, agregar_producto, cambiar_estado_comanda,
+                             crear_comanda, liberar_mesas, quitar_producto)
 from app.auth import role_required
+from app.database import enrutar_a_replica
+from app.streaming import respuesta_sse
+from app.pendientes import tablero
+from app.estaciones import ESTACIONES, planificador
+from app.fragmentos import fijar_versiones
+from app.cache import cacheado
+from app.plazos import plazo
+from app.precios import precios_vigentes
 from sqlalchemy import desc
 
 comandas_bp = Blueprint('comandas', __name__)
@@ -25,7 +39,8 @@ def listar():
         return render_template('comandas/listar.html', comandas=comandas)
     
     else:
-        # Admin y caja ven todas las comandas
+        # Admin y caja ven todas las comandas (el histórico tolera el retraso de la réplica)
+        enrutar_a_replica()
         page = request.args.get('page', 1, type=int)
         estado = request.args.get('estado')
         
@@ -52,34 +67,19 @@ def crear():
             return redirect(url_for('comandas.crear'))
         
         mesa = Mesa.query.get_or_404(mesa_id)
-        
-        # Verificar que la mesa no tenga una comanda activa
-        comanda_activa = Comanda.query.filter_by(mesa_id=mesa_id).filter(
-            Comanda.estado.in_(['pendiente', 'en_preparacion', 'lista'])
-        ).first()
-        
-        if comanda_activa:
-            flash(f'La mesa {mesa.numero} ya tiene una comanda activa.', 'danger')
-            return redirect(url_for('comandas.crear'))
-        
-        # Crear la comanda
-        nueva_comanda = Comanda(
-            mesa_id=mesa_id,
-            mesero_id=current_user.id,
-            estado='pendiente',
-            observaciones=observaciones
-        )
+        # Mesas que se juntan con la principal (grupos grandes)
+        ids_unidas = request.form.getlist('mesas_unidas', type=int)
+        unidas = Mesa.query.filter(Mesa.id.in_(ids_unidas)).all() if ids_unidas else []
         
         try:
-            db.session.add(nueva_comanda)
+            nueva_comanda = crear_comanda(mesa, current_user, observaciones, unidas)
             db.session.commit()
-            
-            # Cambiar estado de la mesa
-            mesa.estado = 'ocupada'
-            db.session.commit()
-            
             flash(f'Comanda creada exitosamente para la mesa {mesa.numero}.', 'success')
             return redirect(url_for('comandas.editar', id=nueva_comanda.id))
+        except ErrorOperacion as e:
+            db.session.rollback()
+            flash(e.mensaje, 'danger')
+            return redirect(url_for('comandas.crear'))
         except Exception as e:
             db.session.rollback()
             flash(f'Error al crear la comanda: {str(e)}', 'danger')
@@ -129,36 +129,28 @@ def editar(id):
         
         producto = Producto.query.get_or_404(producto_id)
         
-        if not producto.disponible:
-            flash(f'El producto {producto.nombre} no está disponible.', 'danger')
-            return redirect(url_for('comandas.editar', id=id))
-        
-        # Crear detalle de comanda
-        detalle = DetalleComanda(
-            comanda_id=comanda.id,
-            producto_id=producto_id,
-            cantidad=cantidad,
-            precio_unitario=producto.precio,
-            observaciones=observaciones
-        )
-        detalle.calcular_subtotal()
-        
         try:
-            db.session.add(detalle)
-            comanda.calcular_totales()
+            agregar_producto(comanda, producto, cantidad, observaciones)
             db.session.commit()
             flash(f'{producto.nombre} agregado a la comanda.', 'success')
+        except ErrorOperacion as e:
+            db.session.rollback()
+            flash(e.mensaje, 'danger')
         except Exception as e:
             db.session.rollback()
             flash(f'Error al agregar el producto: {str(e)}', 'danger')
         
         return redirect(url_for('comandas.editar', id=id))
     
-    # Obtener productos disponibles por categoría
-    from app.models import Categoria
-    categorias = Categoria.query.filter_by(activo=True).all()
+    # Obtener productos disponibles por categoría (la consulta corre solo si
+    # el fragmento del menú no está en caché)
+    fijar_versiones('menu')
+    categorias = Categoria.query.filter_by(activo=True).order_by(Categoria.nombre)
+    # Las listas vigentes (happy hour) cambian con la hora: van en la clave del fragmento
+    precios = precios_vigentes()
     
-    return render_template('comandas/editar.html', comanda=comanda, categorias=categorias)
+    return render_template('comandas/editar.html', comanda=comanda, categorias=categorias,
+                           precios=precios)
 
 @comandas_bp.route('/detalle/<int:id>/eliminar', methods=['POST'])
 @login_required
@@ -172,14 +164,13 @@ def eliminar_detalle(id):
     if current_user.rol == 'mesero' and comanda.mesero_id != current_user.id:
         return jsonify({'success': False, 'message': 'No autorizado'}), 403
     
-    if comanda.estado in ['entregada', 'cancelada']:
-        return jsonify({'success': False, 'message': 'Comanda no editable'}), 400
-    
     try:
-        db.session.delete(detalle)
-        comanda.calcular_totales()
+        quitar_producto(detalle)
         db.session.commit()
         return jsonify({'success': True, 'message': 'Producto eliminado'})
+    except ErrorOperacion as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': e.mensaje}), e.status
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -191,27 +182,10 @@ def cambiar_estado(id):
     comanda = Comanda.query.get_or_404(id)
     nuevo_estado = request.form.get('estado')
     
-    estados_validos = ['pendiente', 'en_preparacion', 'lista', 'entregada', 'cancelada']
-    if nuevo_estado not in estados_validos:
-        return jsonify({'success': False, 'message': 'Estado inválido'}), 400
-    
-    # Validar transiciones de estado según el rol
-    if current_user.rol == 'cocina':
-        # Cocina puede cambiar: pendiente -> en_preparacion -> lista
-        if nuevo_estado not in ['en_preparacion', 'lista']:
-            return jsonify({'success': False, 'message': 'Transición no permitida'}), 403
-    
-    elif current_user.rol == 'mesero':
-        # Mesero puede cambiar: lista -> entregada o cualquiera -> cancelada
-        if nuevo_estado not in ['entregada', 'cancelada']:
-            return jsonify({'success': False, 'message': 'Transición no permitida'}), 403
-    
-    comanda.estado = nuevo_estado
-    comanda.fecha_actualizacion = get_mexico_time()
-    
-    # Si se entrega o cancela, liberar la mesa
-    if nuevo_estado in ['entregada', 'cancelada']:
-        comanda.mesa.estado = 'limpieza'
+    try:
+        cambiar_estado_comanda(comanda, nuevo_estado, current_user)
+    except ErrorOperacion as e:
+        return jsonify({'success': False, 'message': e.mensaje}), e.status
     
     try:
         db.session.commit()
@@ -241,7 +215,7 @@ def cancelar(id):
         return redirect(url_for('comandas.ver', id=id))
     
     comanda.estado = 'cancelada'
-    comanda.mesa.estado = 'limpieza'
+    liberar_mesas(comanda)
     
     try:
         db.session.commit()
@@ -252,24 +226,275 @@ def cancelar(id):
     
     return redirect(url_for('comandas.listar'))
 
-@comandas_bp.route('/api/activas')
-@login_required
-@role_required('cocina')
-def api_activas():
-    """API para obtener comandas activas (para cocina)"""
+@cacheado('comandas', nombre='comandas.activas')
+def _comandas_activas():
+    """Comandas pendientes y en preparación en el formato de la pantalla de cocina"""
     comandas = Comanda.query.filter(
         Comanda.estado.in_(['pendiente', 'en_preparacion'])
     ).order_by(Comanda.fecha_creacion).all()
     
-    return jsonify([{
+    return [{
         'id': c.id,
         'mesa': c.mesa.numero,
         'estado': c.estado,
         'mesero': c.mesero.nombre,
-        'tiempo': str(c.fecha_creacion),
+        'tiempo': str(a_hora_local(c.fecha_creacion)),
         'detalles': [{
             'producto': d.producto.nombre,
             'cantidad': d.cantidad,
             'observaciones': d.observaciones
         } for d in c.detalles]
-    } for c in comandas])
\ No newline at end of file
+    } for c in comandas]
+
+@comandas_bp.route('/api/activas')
+@login_required
+@role_required('cocina')
+def api_activas():
+    """API para obtener comandas activas (para cocina)"""
+    return jsonify(_comandas_activas())
+
+@comandas_bp.route('/stream')
+@login_required
+@role_required('cocina', 'admin')
+def stream():
+    """Stream (SSE) de comandas activas para la pantalla de cocina"""
+    return respuesta_sse('comandas', 'comandas', _comandas_activas)
+
+def _cola_estacion(estacion):
+    return {'estacion': estacion,
+            'tickets': [t.como_dict() for t in planificador.cola(estacion)]}
+
+@comandas_bp.route('/estacion/<estacion>')
+@login_required
+@role_required('cocina', 'admin')
+def estacion(estacion):
+    """Pantalla de una estación de cocina con sus tickets en orden"""
+    if estacion not in ESTACIONES:
+        abort(404)
+    return render_template('comandas/estacion.html', estacion=estacion, estaciones=ESTACIONES)
+
+@comandas_bp.route('/api/estacion/<estacion>')
+@login_required
+@role_required('cocina', 'admin')
+def api_estacion(estacion):
+    """Tickets de la estación ordenados por la hora límite para empezarlos"""
+    if estacion not in ESTACIONES:
+        abort(404)
+    return jsonify(_cola_estacion(estacion))
+
+@comandas_bp.route('/stream/estacion/<estacion>')
+@login_required
+@role_required('cocina', 'admin')
+def stream_estacion(estacion):
+    """Stream (SSE) de la cola de una estación"""
+    if estacion not in ESTACIONES:
+        abort(404)
+    return respuesta_sse('comandas', f'estacion-{estacion}', lambda: _cola_estacion(estacion))
+
+@comandas_bp.route('/api/pendientes')
+@login_required
+@role_required('cocina', 'admin')
+def api_pendientes():
+    """Unidades por preparar de cada producto y categoría.
+
+    productos: [id, nombre, categoría, pendientes, en preparación]
+    categorias: [nombre, pendientes, en preparación]
+    """
+    return jsonify(tablero())
+
+@comandas_bp.route('/stream/pendientes')
+@login_required
+@role_required('cocina', 'admin')
+def stream_pendientes():
+    """Stream (SSE) del conteo de cocina por producto"""
+    return respuesta_sse('comandas', 'pendientes', tablero)
+
+# ==========================================
+# CLIENTE SIN CONEXIÓN (meseros)
+# ==========================================
+
+MAX_OPERACIONES_SYNC = 200
+
+
+@comandas_bp.route('/offline')
+@login_required
+@role_required('admin', 'mesero')
+def offline():
+    """Cliente de meseros que funciona sin red y sincroniza al volver"""
+    return render_template('comandas/offline.html')
+
+
+@comandas_bp.route('/sw.js')
+def service_worker():
+    """Service worker del cliente sin conexión (alcance /comandas/)"""
+    respuesta = send_from_directory(os.path.join(current_app.static_folder, 'js'),
+                                    'sw-comandas.js', mimetype='text/javascript', max_age=0)
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    return respuesta
+
+
+@comandas_bp.route('/api/catalogo')
+@login_required
+@role_required('admin', 'mesero')
+def api_catalogo():
+    """Mesas, menú y comandas activas del mesero para trabajar sin conexión"""
+    mesas = Mesa.query.order_by(Mesa.numero).all()
+    categorias = Categoria.query.filter_by(activo=True).order_by(Categoria.nombre).all()
+    comandas = Comanda.query.filter(Comanda.estado.in_(ESTADOS_ACTIVOS))
+    if current_user.rol == 'mesero':
+        comandas = comandas.filter_by(mesero_id=current_user.id)
+    
+    return jsonify({
+        'mesas': [{
+            'id': m.id, 'numero': m.numero, 'capacidad': m.capacidad,
+            'ubicacion': m.ubicacion, 'estado': m.estado
+        } for m in mesas],
+        'menu': [{
+            'categoria': c.nombre,
+            'productos': [{
+                'id': p.id, 'nombre': p.nombre, 'precio': float(p.precio)
+            } for p in sorted(c.productos, key=lambda p: p.nombre) if p.disponible]
+        } for c in categorias],
+        'comandas': [{
+            'id': c.id, 'mesa_id': c.mesa_id, 'estado': c.estado, 'total': float(c.total or 0)
+        } for c in comandas.all()],
+    })
+
+
+def _resolver_comanda(datos, aplicadas):
+    """Comanda a la que se refiere una operación: id real o id de la operación que la creó"""
+    if datos.get('comanda_op'):
+        if not isinstance(datos['comanda_op'], str):
+            raise ErrorOperacion('comanda_op debe ser texto.')
+        origen = aplicadas.get(datos['comanda_op'])
+        if origen is None:
+            origen = OperacionSync.query.filter_by(
+                id=datos['comanda_op'], usuario_id=current_user.id
+            ).first()
+        if origen is None:
+            raise ErrorOperacion('La operación que creaba la comanda no ha llegado.', 'sin_origen')
+        if not origen.comanda_id:
+            raise ErrorOperacion('La comanda de origen fue rechazada.', 'origen_rechazado', 409)
+        comanda_id = origen.comanda_id
+    else:
+        comanda_id = datos.get('comanda_id')
+    comanda = db.session.get(Comanda, comanda_id) if _es_entero(comanda_id) else None
+    if comanda is None:
+        raise ErrorOperacion('Comanda no encontrada.', 'no_encontrada', 404)
+    if current_user.rol == 'mesero' and comanda.mesero_id != current_user.id:
+        raise ErrorOperacion('No tienes permiso para editar esta comanda.', 'no_permitida', 403)
+    return comanda
+
+
+def _es_entero(valor):
+    # bool es int en Python: true no es un id ni una cantidad
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+
+def _aplicar_operacion(tipo, datos, aplicadas):
+    """Aplicar una operación encolada; devuelve (estado, comanda, mensaje)"""
+    if not isinstance(datos, dict):
+        raise ErrorOperacion('Los datos de la operación deben ser un objeto.')
+    if tipo == 'crear_comanda':
+        if not _es_entero(datos.get('mesa_id')):
+            raise ErrorOperacion('mesa_id debe ser un entero.')
+        mesa = db.session.get(Mesa, datos['mesa_id'])
+        if mesa is None:
+            raise ErrorOperacion('Mesa no encontrada.', 'no_encontrada', 404)
+        try:
+            return 'aplicada', crear_comanda(mesa, current_user, datos.get('observaciones')), None
+        except ErrorOperacion as e:
+            # La misma persona abrió la mesa desde otro dispositivo: seguir sobre esa comanda
+            if (e.conflicto == 'mesa_ocupada' and e.comanda is not None
+                    and e.comanda.mesero_id == current_user.id):
+                return 'fusionada', e.comanda, f'Se usó la comanda #{e.comanda.id} ya abierta.'
+            raise
+    
+    comanda = _resolver_comanda(datos, aplicadas)
+    if tipo == 'agregar_producto':
+        cantidad = datos.get('cantidad')
+        if not _es_entero(datos.get('producto_id')):
+            raise ErrorOperacion('producto_id debe ser un entero.')
+        if not _es_entero(cantidad) or cantidad <= 0:
+            raise ErrorOperacion('cantidad debe ser un entero mayor a cero.')
+        producto = db.session.get(Producto, datos['producto_id'])
+        if producto is None:
+            raise ErrorOperacion('Producto no encontrado.', 'no_encontrado', 404)
+        agregar_producto(comanda, producto, cantidad, datos.get('observaciones'))
+        return 'aplicada', comanda, None
+    if tipo == 'cambiar_estado':
+        nuevo_estado = datos.get('estado')
+        if comanda.estado == nuevo_estado:
+            return 'aplicada', comanda, 'La comanda ya estaba en ese estado.'
+        if comanda.estado in ['entregada', 'cancelada']:
+            raise ErrorOperacion(f'La comanda ya está {comanda.estado}.', 'comanda_cerrada', 409)
+        cambiar_estado_comanda(comanda, nuevo_estado, current_user)
+        return 'aplicada', comanda, None
+    raise ErrorOperacion(f'Operación desconocida: {tipo}')
+
+
+@comandas_bp.route('/api/sync', methods=['POST'])
+@login_required
+@role_required('admin', 'mesero')
+@plazo(8000)  # Un lote puede traer muchas operaciones acumuladas sin red
+def api_sync():
+    """Aplicar en orden las operaciones encoladas sin conexión.
+
+    Cada operación se confirma junto con su registro en operaciones_sync, así
+    que reenviar el lote (p. ej. si se cortó la respuesta) no duplica nada.
+    """
+    datos = request.get_json(silent=True) or {}
+    operaciones = datos.get('operaciones')
+    if not isinstance(operaciones, list) or len(operaciones) > MAX_OPERACIONES_SYNC:
+        return jsonify({'success': False,
+                        'message': f'Se esperan hasta {MAX_OPERACIONES_SYNC} operaciones'}), 400
+    
+    resultados = []
+    aplicadas = {}
+    for op in operaciones:
+        if not isinstance(op, dict):
+            # Se rechaza sin cortar el lote: las demás siguen aplicándose
+            resultados.append({'id': None, 'estado': 'rechazada', 'message': 'Operación inválida'})
+            continue
+        op_id = str(op.get('id') or '')[:64]
+        if not op_id:
+            resultados.append({'id': None, 'estado': 'rechazada', 'message': 'Operación sin id'})
+            continue
+        
+        previa = db.session.get(OperacionSync, op_id)
+        if previa is not None:
+            if previa.usuario_id != current_user.id:
+                resultados.append({'id': op_id, 'estado': 'rechazada', 'message': 'Id repetido'})
+                continue
+            aplicadas[op_id] = previa
+            resultados.append(previa.resultado(duplicada=True))
+            continue
+        
+        registro = OperacionSync(id=op_id, usuario_id=current_user.id, tipo=str(op.get('tipo'))[:30])
+        try:
+            try:
+                estado, comanda, mensaje = _aplicar_operacion(op.get('tipo'), op.get('datos') or {},
+                                                              aplicadas)
+                db.session.flush()
+                registro.estado, registro.comanda_id, registro.mensaje = estado, comanda.id, mensaje
+            except ErrorOperacion as e:
+                db.session.rollback()
+                registro.estado, registro.conflicto, registro.mensaje = (
+                    'rechazada', e.conflicto, e.mensaje[:255])
+            db.session.add(registro)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            # Si otro envío del mismo lote llegó primero (id duplicado), usar lo que registró
+            registro = db.session.get(OperacionSync, op_id)
+            if registro is None:
+                current_app.logger.exception('Error al sincronizar la operación %s', op_id)
+                # Las demás quedan en la cola del cliente y se reintentan después
+                return jsonify({'success': False, 'message': str(e),
+                                'resultados': resultados}), 500
+        
+        aplicadas[op_id] = registro
+        resultados.append(registro.resultado())
+    
+    return jsonify({'success': True, 'resultados': resultados})
+
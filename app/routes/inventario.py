@@ -1,8 +1,14 @@
+from datetime import datetime, time
+
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
-from flask_login import login_required
-from app.models import db, Producto, Categoria
+from flask_login import login_required, current_user
+from app.models import db, Producto, Categoria, ListaPrecios
 from app.auth import role_required
-from sqlalchemy import or_
+from app.estaciones import ESTACIONES
+from app.operaciones import ErrorOperacion
+from app.precios import actualizar_precios, crear_lista, desactivar_lista, precios_vigentes
+from app.versiones import incrementar_version
+from sqlalchemy import or_, update
 
 inventario_bp = Blueprint('inventario', __name__)
 
@@ -158,6 +164,8 @@ def crear_producto():
         stock = request.form.get('stock', type=int, default=0)
         stock_minimo = request.form.get('stock_minimo', type=int, default=5)
         disponible = request.form.get('disponible') == 'on'
+        estacion = request.form.get('estacion') if request.form.get('estacion') in ESTACIONES else 'parrilla'
+        tiempo_preparacion = request.form.get('tiempo_preparacion', type=int, default=10)
         
         if not nombre or not precio or not categoria_id:
             flash('Nombre, precio y categoría son obligatorios.', 'warning')
@@ -176,7 +184,9 @@ def crear_producto():
             categoria_id=categoria_id,
             stock=stock,
             stock_minimo=stock_minimo,
-            disponible=disponible
+            disponible=disponible,
+            estacion=estacion,
+            tiempo_preparacion=tiempo_preparacion
         )
         
         try:
@@ -211,9 +221,10 @@ def editar_producto(id):
         descripcion = request.form.get('descripcion')
         precio = request.form.get('precio', type=float)
         categoria_id = request.form.get('categoria_id', type=int)
-        stock = request.form.get('stock', type=int)
         stock_minimo = request.form.get('stock_minimo', type=int)
         disponible = request.form.get('disponible') == 'on'
+        estacion = request.form.get('estacion')
+        tiempo_preparacion = request.form.get('tiempo_preparacion', type=int)
         
         if not nombre or not precio or not categoria_id:
             flash('Nombre, precio y categoría son obligatorios.', 'warning')
@@ -233,9 +244,13 @@ def editar_producto(id):
         producto.descripcion = descripcion
         producto.precio = precio
         producto.categoria_id = categoria_id
-        producto.stock = stock
+        # El stock solo cambia con ajustar-stock: reenviarlo pisaría ajustes simultáneos
         producto.stock_minimo = stock_minimo
         producto.disponible = disponible
+        if estacion in ESTACIONES:
+            producto.estacion = estacion
+        if tiempo_preparacion:
+            producto.tiempo_preparacion = tiempo_preparacion
         
         try:
             db.session.commit()
@@ -285,22 +300,27 @@ def ajustar_stock(id):
     if not cantidad or cantidad <= 0:
         return jsonify({'success': False, 'message': 'Cantidad inválida'}), 400
     
+    # Sumar o restar en la base: dos ajustes simultáneos no se pisan
+    sentencia = update(Producto).where(Producto.id == producto.id)
     if accion == 'agregar':
-        producto.stock += cantidad
+        sentencia = sentencia.values(stock=Producto.stock + cantidad)
         mensaje = f'Se agregaron {cantidad} unidades'
     elif accion == 'reducir':
-        if producto.stock < cantidad:
-            return jsonify({
-                'success': False, 
-                'message': 'No hay suficiente stock'
-            }), 400
-        producto.stock -= cantidad
+        sentencia = sentencia.where(Producto.stock >= cantidad).values(stock=Producto.stock - cantidad)
         mensaje = f'Se redujeron {cantidad} unidades'
     else:
         return jsonify({'success': False, 'message': 'Acción inválida'}), 400
     
     try:
+        if not db.session.execute(sentencia.execution_options(synchronize_session=False)).rowcount:
+            db.session.rollback()
+            return jsonify({
+                'success': False, 
+                'message': 'No hay suficiente stock'
+            }), 400
+        incrementar_version('menu')
         db.session.commit()
+        db.session.refresh(producto)
         return jsonify({
             'success': True,
             'message': mensaje,
@@ -331,10 +351,148 @@ def api_productos_por_categoria(categoria_id):
         disponible=True
     ).all()
     
+    precios = precios_vigentes()
+    
     return jsonify([{
         'id': p.id,
         'nombre': p.nombre,
         'descripcion': p.descripcion,
         'precio': float(p.precio),
+        'precio_vigente': float(precios.de(p)),
         'stock': p.stock
-    } for p in productos])
\ No newline at end of file
+    } for p in productos])
+
+# ============ PRECIOS ============
+
+def _datos():
+    return request.get_json(silent=True) or request.form
+
+
+def _numero(datos, nombre):
+    valor = datos.get(nombre)
+    return float(valor) if valor not in (None, '') else None
+
+
+def _entero(datos, nombre):
+    valor = datos.get(nombre)
+    return int(valor) if valor not in (None, '') else None
+
+
+def _ids(datos):
+    ids = datos.getlist('producto_ids', type=int) if hasattr(datos, 'getlist') else datos.get('producto_ids')
+    return [int(i) for i in ids or []]
+
+
+def _fecha_hora(valor):
+    return datetime.fromisoformat(valor) if valor else None
+
+
+def _hora(valor):
+    return time.fromisoformat(valor) if valor else None
+
+
+@inventario_bp.route('/precios/masivo', methods=['POST'])
+@login_required
+@role_required('admin')
+def precios_masivo():
+    """Subir o bajar precios por porcentaje o monto, por categoría o lista de productos"""
+    datos = _datos()
+    try:
+        actualizados = actualizar_precios(
+            porcentaje=_numero(datos, 'porcentaje'),
+            monto=_numero(datos, 'monto'),
+            categoria_id=_entero(datos, 'categoria_id'),
+            producto_ids=_ids(datos),
+        )
+        db.session.commit()
+    except ErrorOperacion as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': e.mensaje}), e.status
+    except (TypeError, ValueError):
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Datos inválidos.'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 500
+    return jsonify({'success': True, 'message': f'Se actualizaron {actualizados} precios.',
+                    'actualizados': actualizados})
+
+
+def _lista_como_dict(lista):
+    return {
+        'id': lista.id,
+        'nombre': lista.nombre,
+        'prioridad': lista.prioridad,
+        'vigente_desde': lista.vigente_desde.isoformat(),
+        'vigente_hasta': lista.vigente_hasta.isoformat() if lista.vigente_hasta else None,
+        'hora_inicio': lista.hora_inicio.strftime('%H:%M') if lista.hora_inicio else None,
+        'hora_fin': lista.hora_fin.strftime('%H:%M') if lista.hora_fin else None,
+        'dias': lista.dias,
+        'activo': lista.activo,
+        'productos': len(lista.precios),
+    }
+
+
+@inventario_bp.route('/listas-precios')
+@login_required
+@role_required('admin')
+def listas_precios():
+    """Listas de precios (las activas primero) y cuáles aplican ahora"""
+    listas = ListaPrecios.query.order_by(ListaPrecios.activo.desc(), ListaPrecios.prioridad.desc(),
+                                         ListaPrecios.vigente_desde.desc()).limit(100).all()
+    return jsonify({
+        'success': True,
+        'vigentes': precios_vigentes().clave,
+        'listas': [_lista_como_dict(lista) for lista in listas],
+    })
+
+
+@inventario_bp.route('/listas-precios/crear', methods=['POST'])
+@login_required
+@role_required('admin')
+def crear_lista_precios():
+    """Crear una lista con precios propios o calculados (p. ej. bebidas -30 % de 17:00 a 19:00)"""
+    datos = _datos()
+    try:
+        lista = crear_lista(
+            nombre=(datos.get('nombre') or '').strip(),
+            usuario=current_user,
+            precios=datos.get('precios') if isinstance(datos.get('precios'), dict) else None,
+            porcentaje=_numero(datos, 'porcentaje'),
+            monto=_numero(datos, 'monto'),
+            categoria_id=_entero(datos, 'categoria_id'),
+            producto_ids=_ids(datos),
+            prioridad=_entero(datos, 'prioridad'),
+            vigente_desde=_fecha_hora(datos.get('vigente_desde')),
+            vigente_hasta=_fecha_hora(datos.get('vigente_hasta')),
+            hora_inicio=_hora(datos.get('hora_inicio')),
+            hora_fin=_hora(datos.get('hora_fin')),
+            dias=datos.get('dias') or None,
+        )
+        db.session.commit()
+    except ErrorOperacion as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': e.mensaje}), e.status
+    except (TypeError, ValueError):
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Datos inválidos.'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 500
+    return jsonify({'success': True, 'message': f'Lista "{lista.nombre}" creada.',
+                    'lista': _lista_como_dict(lista)})
+
+
+@inventario_bp.route('/listas-precios/<int:id>/desactivar', methods=['POST'])
+@login_required
+@role_required('admin')
+def desactivar_lista_precios(id):
+    """Dejar de aplicar una lista (no se borra: los precios cobrados siguen en las comandas)"""
+    lista = ListaPrecios.query.get_or_404(id)
+    try:
+        desactivar_lista(lista)
+        db.session.commit()
+    except ErrorOperacion as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': e.mensaje}), e.status
+    return jsonify({'success': True, 'message': f'Lista "{lista.nombre}" desactivada.'})
@@ -0,0 +1,327 @@
+from datetime import date, datetime, time, timedelta
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import login_required, current_user
+from app.models import db, Mesa, Reserva, get_mexico_time
+from app.auth import role_required
+from app.operaciones import (ESTADOS_MESA_MASIVOS, ErrorOperacion, cambiar_estado_mesa,
+                             cambiar_estado_mesas, comanda_activa)
+from app.acomodo import sugerir
+from app.reservas import (ESTADOS_RESERVA, buscar_disponibles, crear_reserva,
+                          cambiar_estado_reserva)
+from app.streaming import respuesta_sse
+from app.fragmentos import fijar_versiones
+from app.cache import cacheado
+
+mesas_bp = Blueprint('mesas', __name__)
+
+@mesas_bp.route('/')
+@login_required
+@role_required('admin', 'mesero', 'caja')
+def listar():
+    """Listar todas las mesas"""
+    fijar_versiones('mesas')
+    # Sin .all(): solo se consulta si el fragmento de la cuadrícula no está en caché
+    mesas = Mesa.query.order_by(Mesa.numero)
+    ubicaciones = db.session.query(Mesa.ubicacion).filter(Mesa.ubicacion.isnot(None)).distinct()
+    return render_template('mesas/listar.html', mesas=mesas, ubicaciones=ubicaciones,
+                           estados_masivos=ESTADOS_MESA_MASIVOS)
+
+@mesas_bp.route('/crear', methods=['GET', 'POST'])
+@login_required
+@role_required('admin')
+def crear():
+    """Crear una nueva mesa"""
+    if request.method == 'POST':
+        numero = request.form.get('numero', type=int)
+        capacidad = request.form.get('capacidad', type=int)
+        ubicacion = request.form.get('ubicacion')
+        
+        if not numero or not capacidad:
+            flash('El número y capacidad de la mesa son obligatorios.', 'warning')
+            return render_template('mesas/crear.html')
+        
+        # Verificar que no exista una mesa con ese número
+        if Mesa.query.filter_by(numero=numero).first():
+            flash(f'Ya existe una mesa con el número {numero}.', 'danger')
+            return render_template('mesas/crear.html')
+        
+        nueva_mesa = Mesa(
+            numero=numero,
+            capacidad=capacidad,
+            ubicacion=ubicacion,
+            estado='disponible'
+        )
+        
+        try:
+            db.session.add(nueva_mesa)
+            db.session.commit()
+            flash(f'Mesa {numero} creada exitosamente.', 'success')
+            return redirect(url_for('mesas.listar'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al crear la mesa: {str(e)}', 'danger')
+    
+    return render_template('mesas/crear.html')
+
+@mesas_bp.route('/<int:id>/editar', methods=['GET', 'POST'])
+@login_required
+@role_required('admin')
+def editar(id):
+    """Editar una mesa existente"""
+    mesa = Mesa.query.get_or_404(id)
+    
+    if request.method == 'POST':
+        numero = request.form.get('numero', type=int)
+        capacidad = request.form.get('capacidad', type=int)
+        ubicacion = request.form.get('ubicacion')
+        estado = request.form.get('estado')
+        
+        # Verificar que no exista otra mesa con ese número
+        mesa_existente = Mesa.query.filter_by(numero=numero).first()
+        if mesa_existente and mesa_existente.id != id:
+            flash(f'Ya existe otra mesa con el número {numero}.', 'danger')
+            return render_template('mesas/editar.html', mesa=mesa)
+        
+        mesa.numero = numero
+        mesa.capacidad = capacidad
+        mesa.ubicacion = ubicacion
+        mesa.estado = estado
+        
+        try:
+            db.session.commit()
+            flash(f'Mesa {numero} actualizada exitosamente.', 'success')
+            return redirect(url_for('mesas.listar'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al actualizar la mesa: {str(e)}', 'danger')
+    
+    return render_template('mesas/editar.html', mesa=mesa)
+
+@mesas_bp.route('/<int:id>/eliminar', methods=['POST'])
+@login_required
+@role_required('admin')
+def eliminar(id):
+    """Eliminar una mesa"""
+    mesa = Mesa.query.get_or_404(id)
+    
+    # Verificar que no tenga comandas activas (propias o como mesa unida)
+    if comanda_activa(id):
+        flash('No se puede eliminar la mesa porque tiene comandas activas.', 'danger')
+        return redirect(url_for('mesas.listar'))
+    
+    try:
+        db.session.delete(mesa)
+        db.session.commit()
+        flash(f'Mesa {mesa.numero} eliminada exitosamente.', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error al eliminar la mesa: {str(e)}', 'danger')
+    
+    return redirect(url_for('mesas.listar'))
+
+@mesas_bp.route('/<int:id>/cambiar-estado', methods=['POST'])
+@login_required
+@role_required('admin', 'mesero')
+def cambiar_estado(id):
+    """Cambiar el estado de una mesa"""
+    mesa = Mesa.query.get_or_404(id)
+    nuevo_estado = request.form.get('estado')
+    
+    try:
+        cambiar_estado_mesa(mesa, nuevo_estado)
+    except ErrorOperacion as e:
+        return jsonify({'success': False, 'message': e.mensaje}), e.status
+    
+    try:
+        db.session.commit()
+        return jsonify({
+            'success': True,
+            'message': f'Estado de mesa {mesa.numero} actualizado',
+            'estado': nuevo_estado
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@mesas_bp.route('/estado-masivo', methods=['POST'])
+@login_required
+@role_required('admin', 'mesero')
+def estado_masivo():
+    """Pasar varias mesas o zonas completas a un estado (abrir o cerrar el salón)"""
+    datos = request.get_json(silent=True)
+    if datos is None:
+        datos = {'estado': request.form.get('estado'),
+                 'mesa_ids': request.form.getlist('mesa_ids', type=int),
+                 'ubicaciones': request.form.getlist('ubicaciones')}
+    if (not isinstance(datos, dict)
+            or not isinstance(datos.get('mesa_ids') or [], list)
+            or not isinstance(datos.get('ubicaciones') or [], list)
+            or not all(isinstance(u, str) for u in datos.get('ubicaciones') or [])):
+        return jsonify({'success': False,
+                        'message': 'Se espera un objeto con mesa_ids y ubicaciones como listas.'}), 400
+    try:
+        cambian, ocupadas = cambiar_estado_mesas(datos.get('estado'),
+                                                 mesa_ids=[int(i) for i in datos.get('mesa_ids') or []],
+                                                 ubicaciones=datos.get('ubicaciones') or [])
+        db.session.commit()
+    except ErrorOperacion as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': e.mensaje}), e.status
+    except (TypeError, ValueError):
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Datos inválidos.'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 500
+    mensaje = f'{len(cambian)} mesas cambiaron a {datos["estado"]}.'
+    if ocupadas:
+        mensaje += f' {len(ocupadas)} con comanda activa no se tocaron.'
+    return jsonify({
+        'success': True,
+        'message': mensaje,
+        'cambiadas': [m.numero for m in cambian],
+        'con_comanda': [m.numero for m in ocupadas],
+    })
+
+@mesas_bp.route('/mapa')
+@login_required
+@role_required('admin', 'mesero', 'caja')
+def mapa():
+    """Vista de mapa de mesas con estado en tiempo real"""
+    mesas = Mesa.query.order_by(Mesa.numero).all()
+    
+    # Agregar información de comandas activas
+    for mesa in mesas:
+        mesa.comanda_activa = comanda_activa(mesa.id)
+    
+    return render_template('mesas/mapa.html', mesas=mesas)
+
+@cacheado('mesas', nombre='mesas.estado')
+def _estado_mesas():
+    mesas = Mesa.query.all()
+    return [{
+        'id': m.id,
+        'numero': m.numero,
+        'estado': m.estado,
+        'capacidad': m.capacidad,
+        'ubicacion': m.ubicacion
+    } for m in mesas]
+
+@mesas_bp.route('/api/estado')
+@login_required
+def api_estado():
+    """API para obtener el estado de todas las mesas"""
+    return jsonify(_estado_mesas())
+
+@mesas_bp.route('/stream')
+@login_required
+def stream():
+    """Stream (SSE) del estado de las mesas para el mapa"""
+    return respuesta_sse('mesas', 'mesas', _estado_mesas)
+
+@mesas_bp.route('/acomodo')
+@login_required
+@role_required('admin', 'mesero', 'caja')
+def acomodo():
+    """Sugerir mesas (juntando varias si hace falta) para un grupo (?personas=14)"""
+    personas = request.args.get('personas', type=int)
+    if not personas or personas < 1:
+        return jsonify({'success': False, 'message': 'Indica cuántas personas son.'}), 400
+    opciones = sugerir(personas, ubicacion=request.args.get('ubicacion') or None,
+                       minutos=request.args.get('duracion', 120, type=int))
+    return jsonify({'success': True, 'personas': personas, 'opciones': opciones})
+
+def _horario(datos):
+    """Inicio (AAAA-MM-DDTHH:MM) y fin de la reserva a partir de la duración en minutos"""
+    try:
+        inicio = datetime.fromisoformat(datos.get('inicio', ''))
+    except ValueError:
+        raise ErrorOperacion('Indica la fecha y hora de la reserva.')
+    duracion = datos.get('duracion', 120, type=int) or 120
+    return inicio, inicio + timedelta(minutes=duracion)
+
+@mesas_bp.route('/reservas')
+@login_required
+@role_required('admin', 'mesero', 'caja')
+def reservas():
+    """Reservas de un día y formulario para reservar"""
+    try:
+        fecha = date.fromisoformat(request.args.get('fecha', ''))
+    except ValueError:
+        fecha = get_mexico_time().date()
+    dia = datetime.combine(fecha, time.min)
+    reservas = Reserva.query.filter(
+        Reserva.inicio >= dia, Reserva.inicio < dia + timedelta(days=1)
+    ).order_by(Reserva.inicio).all()
+    mesas = Mesa.query.order_by(Mesa.numero).all()
+    return render_template('mesas/reservas.html', reservas=reservas, mesas=mesas, fecha=fecha,
+                           estados=ESTADOS_RESERVA)
+
+@mesas_bp.route('/reservas/disponibles')
+@login_required
+@role_required('admin', 'mesero', 'caja')
+def reservas_disponibles():
+    """Mesas libres para N personas en un horario (?personas=6&inicio=...&duracion=120)"""
+    try:
+        inicio, fin = _horario(request.args)
+        personas = request.args.get('personas', type=int)
+        if not personas or personas < 1:
+            raise ErrorOperacion('Indica cuántas personas son.')
+    except ErrorOperacion as e:
+        return jsonify({'success': False, 'message': e.mensaje}), e.status
+    return jsonify({
+        'success': True,
+        'inicio': inicio.isoformat(),
+        'fin': fin.isoformat(),
+        'mesas': buscar_disponibles(personas, inicio, fin),
+    })
+
+@mesas_bp.route('/reservas/crear', methods=['POST'])
+@login_required
+@role_required('admin', 'mesero', 'caja')
+def crear_reserva_mesa():
+    """Registrar una reserva (sin mesa elegida se asigna la más chica que alcance)"""
+    try:
+        inicio, fin = _horario(request.form)
+        reserva = crear_reserva(
+            cliente=request.form.get('cliente', '').strip(),
+            personas=request.form.get('personas', type=int),
+            inicio=inicio,
+            fin=fin,
+            usuario=current_user,
+            mesa_id=request.form.get('mesa_id', type=int),
+            telefono=request.form.get('telefono') or None,
+            observaciones=request.form.get('observaciones') or None,
+        )
+        db.session.commit()
+        flash(f'Reserva de {reserva.cliente} en la mesa {reserva.mesa.numero} '
+              f'a las {reserva.inicio:%H:%M}.', 'success')
+        fecha = inicio.date()
+    except ErrorOperacion as e:
+        db.session.rollback()
+        flash(e.mensaje, 'danger')
+        fecha = request.form.get('inicio', '')[:10] or None
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error al registrar la reserva: {str(e)}', 'danger')
+        fecha = None
+    return redirect(url_for('mesas.reservas', fecha=fecha))
+
+@mesas_bp.route('/reservas/<int:id>/estado', methods=['POST'])
+@login_required
+@role_required('admin', 'mesero', 'caja')
+def estado_reserva(id):
+    """Sentar, cancelar o marcar que no llegó"""
+    reserva = Reserva.query.get_or_404(id)
+    try:
+        cambiar_estado_reserva(reserva, request.form.get('estado'))
+        db.session.commit()
+    except ErrorOperacion as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': e.mensaje}), e.status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 500
+    return jsonify({'success': True, 'message': f'Reserva {reserva.estado}', 'estado': reserva.estado})
+
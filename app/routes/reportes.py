@@ -0,0 +1,148 @@
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, render_template, request, jsonify
+from flask_login import login_required
+from sqlalchemy import func
+from app.analitica import desempeno_meseros, instantaneas, productos_mas_vendidos
+from app.auth import role_required
+from app.database import enrutar_a_replica
+from app.models import db, Evento, Pago, a_hora_local, a_utc, dia_negocio_actual
+from app.ocupacion import ocupacion
+
+reportes_bp = Blueprint('reportes', __name__)
+
+# Todos los reportes son de solo lectura: se sirven desde la réplica si existe
+reportes_bp.before_request(enrutar_a_replica)
+
+@reportes_bp.route('/')
+@login_required
+@role_required('admin')
+def dashboard():
+    """Dashboard de reportes"""
+    return render_template('reportes/dashboard.html')
+
+@reportes_bp.route('/eventos')
+@login_required
+@role_required('admin')
+def eventos():
+    """Historial de estados de una mesa o comanda (o de todas) en un rango de horas locales"""
+    entidad = request.args.get('entidad', 'comanda')
+    if entidad not in ('mesa', 'comanda'):
+        return jsonify({'success': False, 'message': 'Entidad no válida.'}), 400
+    try:
+        desde = a_utc(datetime.fromisoformat(request.args['desde'])) if request.args.get('desde') else None
+        hasta = a_utc(datetime.fromisoformat(request.args['hasta'])) if request.args.get('hasta') else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Fecha no válida (usa AAAA-MM-DD).'}), 400
+    limite = min(request.args.get('limite', 200, type=int), 1000)
+
+    consulta = Evento.query.filter(Evento.entidad == entidad)
+    entidad_id = request.args.get('entidad_id', type=int)
+    if entidad_id is not None:
+        consulta = consulta.filter(Evento.entidad_id == entidad_id)
+    if desde:
+        consulta = consulta.filter(Evento.fecha >= desde)
+    if hasta:
+        consulta = consulta.filter(Evento.fecha < hasta)
+    filas = consulta.order_by(Evento.fecha, Evento.id).limit(limite).all()
+
+    # Tiempo que la entidad pasó en el estado anterior
+    ultimo = {}
+    resultado = []
+    for e in filas:
+        previo = ultimo.get(e.entidad_id)
+        resultado.append({
+            'entidad_id': e.entidad_id,
+            'anterior': e.anterior,
+            'nuevo': e.nuevo,
+            'usuario_id': e.usuario_id,
+            'fecha': a_hora_local(e.fecha).isoformat(),
+            'segundos_en_anterior': (e.fecha - previo).total_seconds() if previo else None,
+        })
+        ultimo[e.entidad_id] = e.fecha
+    return jsonify({'success': True, 'entidad': entidad, 'eventos': resultado})
+
+@reportes_bp.route('/ocupacion')
+@login_required
+@role_required('admin')
+def ocupacion_mesas():
+    """Ocupación por hora, tiempo promedio a pago y rotaciones por mesa de cada día"""
+    hoy = dia_negocio_actual()
+    try:
+        desde = date.fromisoformat(request.args['desde']) if request.args.get('desde') else hoy - timedelta(days=6)
+        hasta = date.fromisoformat(request.args['hasta']) if request.args.get('hasta') else hoy
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Fecha no válida (usa AAAA-MM-DD).'}), 400
+    if hasta < desde or (hasta - desde).days > 92:
+        return jsonify({'success': False, 'message': 'El rango debe ser de 1 a 93 días.'}), 400
+    return jsonify({'success': True, 'dias': ocupacion(desde, hasta)})
+
+def _rango_de_dias():
+    """(desde, hasta) días de negocio de la petición; por defecto los últimos 30"""
+    hoy = dia_negocio_actual()
+    desde = date.fromisoformat(request.args['desde']) if request.args.get('desde') else hoy - timedelta(days=29)
+    hasta = date.fromisoformat(request.args['hasta']) if request.args.get('hasta') else hoy
+    return desde, hasta
+
+@reportes_bp.route('/ventas')
+@login_required
+@role_required('admin')
+def ventas():
+    """Ventas por día de negocio y método de pago"""
+    try:
+        desde, hasta = _rango_de_dias()
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Fecha no válida (usa AAAA-MM-DD).'}), 400
+    # Rango simple sobre (sucursal_id, fecha_negocio): sin date() ni zonas en SQL
+    filas = db.session.query(
+        Pago.fecha_negocio, Pago.metodo_pago, func.count(Pago.id), func.sum(Pago.monto)
+    ).filter(
+        Pago.fecha_negocio.between(desde, hasta)
+    ).group_by(Pago.fecha_negocio, Pago.metodo_pago).order_by(Pago.fecha_negocio)
+
+    dias = {}
+    for dia, metodo, pagos, monto in filas:
+        resumen = dias.setdefault(dia, {'fecha': dia.isoformat(), 'pagos': 0, 'total': 0.0,
+                                        'por_metodo': {}})
+        resumen['pagos'] += pagos
+        resumen['total'] = round(resumen['total'] + float(monto), 2)
+        resumen['por_metodo'][metodo] = float(monto)
+    return jsonify({'success': True, 'dias': list(dias.values())})
+
+def _preparando():
+    """La copia de analítica de esta base aún se está construyendo (ver app/analitica.py)"""
+    mensaje = 'Los reportes se están preparando; intenta de nuevo en unos minutos.'
+    return jsonify({'success': False, 'message': mensaje}), 503, {'Retry-After': '30'}
+
+@reportes_bp.route('/productos')
+@login_required
+@role_required('admin')
+def productos_vendidos():
+    """Productos más vendidos en un rango de días (opcionalmente de un mesero)"""
+    try:
+        desde, hasta = _rango_de_dias()
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Fecha no válida (usa AAAA-MM-DD).'}), 400
+    limite = min(request.args.get('limite', 20, type=int), 500)
+    instantanea = instantaneas.obtener()
+    if instantanea is None:
+        return _preparando()
+    productos = productos_mas_vendidos(instantanea, desde, hasta, limite,
+                                       request.args.get('mesero_id', type=int))
+    return jsonify({'success': True, 'productos': productos,
+                    'actualizado': datetime.fromtimestamp(instantanea.meta['actualizada']).isoformat()})
+
+@reportes_bp.route('/meseros')
+@login_required
+@role_required('admin')
+def meseros():
+    """Ventas, ticket promedio, productos por comanda y tiempo de entrega por mesero"""
+    try:
+        desde, hasta = _rango_de_dias()
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Fecha no válida (usa AAAA-MM-DD).'}), 400
+    instantanea = instantaneas.obtener()
+    if instantanea is None:
+        return _preparando()
+    return jsonify({'success': True, 'meseros': desempeno_meseros(instantanea, desde, hasta),
+                    'actualizado': datetime.fromtimestamp(instantanea.meta['actualizada']).isoformat()})
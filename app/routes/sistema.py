@@ -0,0 +1,46 @@
+import hmac
+
+from flask import (Blueprint, jsonify, request, current_app, abort, session, flash, redirect,
+                   url_for)
+from flask_login import current_user, login_required
+from app.auth import role_required
+from app.metricas import metricas
+from app.models import Sucursal
+
+sistema_bp = Blueprint('sistema', __name__)
+
+def _autorizado():
+    """Admin con sesión, o monitoreo con el token METRICAS_TOKEN"""
+    token = current_app.config.get('METRICAS_TOKEN')
+    enviado = request.headers.get('X-Metricas-Token', '')
+    if token and hmac.compare_digest(token, enviado):
+        return True
+    return current_user.is_authenticated and current_user.rol == 'admin'
+
+@sistema_bp.route('/metricas')
+def metricas_json():
+    """Métricas del worker que atiende la petición (pool de conexiones, contadores)"""
+    if not _autorizado():
+        abort(403)
+    return jsonify(metricas.exportar())
+
+@sistema_bp.route('/sucursales')
+@login_required
+@role_required('admin')
+def sucursales():
+    """Sucursales disponibles y la que está usando el administrador"""
+    return jsonify({
+        'actual': session.get('sucursal_id') or current_user.sucursal_id,
+        'sucursales': [{'id': s.id, 'nombre': s.nombre, 'activo': s.activo}
+                       for s in Sucursal.query.order_by(Sucursal.nombre).all()],
+    })
+
+@sistema_bp.route('/sucursal', methods=['POST'])
+@login_required
+@role_required('admin')
+def elegir_sucursal():
+    """Cambiar la sucursal con la que trabaja el administrador"""
+    sucursal = Sucursal.query.get_or_404(request.form.get('sucursal_id', type=int))
+    session['sucursal_id'] = sucursal.id
+    flash(f'Trabajando en la sucursal {sucursal.nombre}.', 'info')
+    return redirect(url_for('main.dashboard'))
@@ -0,0 +1,236 @@
+// Cliente de meseros sin conexión: las acciones se encolan en localStorage y se
+// envían en un solo lote a /comandas/api/sync cuando hay red. Cada operación
+// lleva un id generado aquí, así que reenviar el lote no duplica nada.
+(function () {
+    const raiz = document.getElementById('cliente-offline');
+    const URL_CATALOGO = raiz.dataset.catalogoUrl;
+    const URL_SYNC = raiz.dataset.syncUrl;
+    const CLAVE = 'comandas-offline-' + raiz.dataset.usuario;
+
+    const guardado = JSON.parse(localStorage.getItem(CLAVE) || '{}');
+    const estado = {
+        catalogo: guardado.catalogo || { mesas: [], menu: [], comandas: [] },
+        cola: guardado.cola || [],
+        // Comandas abiertas aquí y aún no confirmadas: id de la operación -> {mesa_id, estado}
+        locales: guardado.locales || {},
+        // Productos agregados sin confirmar, por clave de comanda
+        detalles: guardado.detalles || {},
+        seleccionada: null,
+        sincronizando: false,
+    };
+
+    function guardar() {
+        localStorage.setItem(CLAVE, JSON.stringify({
+            catalogo: estado.catalogo, cola: estado.cola,
+            locales: estado.locales, detalles: estado.detalles,
+        }));
+    }
+
+    function nuevoId() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 12);
+    }
+
+    function aviso(texto, tipo) {
+        const div = document.createElement('div');
+        div.className = 'alert alert-' + (tipo || 'warning') + ' alert-dismissible fade show';
+        div.textContent = texto;
+        const cerrar = document.createElement('button');
+        cerrar.className = 'btn-close';
+        cerrar.dataset.bsDismiss = 'alert';
+        div.appendChild(cerrar);
+        document.getElementById('avisos').appendChild(div);
+    }
+
+    // Comanda activa de una mesa: primero las abiertas aquí, luego las del servidor
+    function comandaDeMesa(mesaId) {
+        for (const [op, c] of Object.entries(estado.locales)) {
+            if (c.mesa_id === mesaId && !['entregada', 'cancelada'].includes(c.estado)) {
+                return { clave: 'op:' + op, ref: { comanda_op: op }, estado: c.estado, total: null };
+            }
+        }
+        const c = estado.catalogo.comandas.find(c => c.mesa_id === mesaId);
+        return c ? { clave: 'id:' + c.id, ref: { comanda_id: c.id }, estado: c.estado, total: c.total } : null;
+    }
+
+    function encolar(tipo, datos) {
+        const op = { id: nuevoId(), tipo: tipo, datos: datos };
+        estado.cola.push(op);
+        guardar();
+        render();
+        sincronizar();
+        return op;
+    }
+
+    // ---------- Acciones ----------
+
+    function abrirComanda() {
+        const mesaId = estado.seleccionada;
+        const op = encolar('crear_comanda', { mesa_id: mesaId });
+        estado.locales[op.id] = { mesa_id: mesaId, estado: 'pendiente' };
+        guardar();
+        render();
+    }
+
+    function agregarProducto(producto) {
+        const comanda = comandaDeMesa(estado.seleccionada);
+        if (!comanda) return;
+        const cantidad = 1;
+        encolar('agregar_producto', Object.assign({ producto_id: producto.id, cantidad: cantidad }, comanda.ref));
+        (estado.detalles[comanda.clave] = estado.detalles[comanda.clave] || [])
+            .push({ nombre: producto.nombre, cantidad: cantidad });
+        guardar();
+        render();
+    }
+
+    function cambiarEstado(nuevoEstado) {
+        const comanda = comandaDeMesa(estado.seleccionada);
+        if (!comanda) return;
+        encolar('cambiar_estado', Object.assign({ estado: nuevoEstado }, comanda.ref));
+        if (comanda.clave.startsWith('op:')) {
+            estado.locales[comanda.clave.slice(3)].estado = nuevoEstado;
+        } else {
+            const c = estado.catalogo.comandas.find(c => 'id:' + c.id === comanda.clave);
+            c.estado = nuevoEstado;
+            estado.catalogo.comandas = estado.catalogo.comandas.filter(x => x !== c);
+        }
+        const mesa = estado.catalogo.mesas.find(m => m.id === estado.seleccionada);
+        if (mesa) mesa.estado = 'limpieza';
+        guardar();
+        render();
+    }
+
+    // ---------- Red ----------
+
+    async function cargarCatalogo() {
+        try {
+            const r = await fetch(URL_CATALOGO, { credentials: 'same-origin' });
+            if (r.ok && !r.redirected) {
+                estado.catalogo = await r.json();
+                guardar();
+                render();
+            }
+        } catch (e) {
+            // Sin red: seguir con la copia guardada
+        }
+    }
+
+    async function sincronizar() {
+        if (estado.sincronizando || !estado.cola.length || !navigator.onLine) return;
+        estado.sincronizando = true;
+        const lote = estado.cola.slice();
+        try {
+            const r = await fetch(URL_SYNC, {
+                method: 'POST',
+                credentials: 'same-origin',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ operaciones: lote }),
+            });
+            if (r.redirected) {
+                aviso('La sesión expiró: inicia sesión de nuevo para enviar lo pendiente.', 'danger');
+                return;
+            }
+            const respuesta = await r.json();
+            const terminadas = new Set();
+            for (const res of respuesta.resultados || []) {
+                terminadas.add(res.id);
+                if (res.estado === 'rechazada') {
+                    aviso(res.message || 'Operación rechazada', 'danger');
+                } else if (res.estado === 'fusionada') {
+                    aviso(res.message, 'info');
+                }
+            }
+            estado.cola = estado.cola.filter(op => !terminadas.has(op.id));
+            // Lo confirmado ya viene del servidor en el catálogo
+            for (const op of lote) {
+                if (terminadas.has(op.id)) {
+                    delete estado.locales[op.id];
+                }
+            }
+            if (!estado.cola.length) {
+                estado.detalles = {};
+            }
+            guardar();
+            await cargarCatalogo();
+        } catch (e) {
+            // Sin red o respuesta cortada: el lote se reenvía completo después
+        } finally {
+            estado.sincronizando = false;
+            render();
+        }
+    }
+
+    // ---------- Vista ----------
+
+    function boton(texto, clase, alHacerClic) {
+        const b = document.createElement('button');
+        b.className = 'btn ' + clase;
+        b.textContent = texto;
+        b.addEventListener('click', alHacerClic);
+        return b;
+    }
+
+    function render() {
+        const enLinea = navigator.onLine;
+        const red = document.getElementById('estado-red');
+        red.textContent = enLinea ? 'En línea' : 'Sin conexión';
+        red.className = 'badge ' + (enLinea ? 'bg-success' : 'bg-danger');
+        document.getElementById('pendientes').textContent = estado.cola.length + ' pendientes';
+
+        const mesas = document.getElementById('mesas');
+        mesas.replaceChildren(...estado.catalogo.mesas.map(m => {
+            const ocupada = comandaDeMesa(m.id) !== null;
+            const clase = m.id === estado.seleccionada ? 'btn-dark'
+                : ocupada ? 'btn-danger' : m.estado === 'disponible' ? 'btn-outline-success' : 'btn-outline-secondary';
+            return boton(String(m.numero), clase, () => { estado.seleccionada = m.id; render(); });
+        }));
+
+        const comanda = estado.seleccionada ? comandaDeMesa(estado.seleccionada) : null;
+        const mesa = estado.catalogo.mesas.find(m => m.id === estado.seleccionada);
+        document.getElementById('titulo-comanda').textContent = !mesa ? 'Selecciona una mesa'
+            : 'Mesa ' + mesa.numero + (comanda ? ' · ' + comanda.estado
+                + (comanda.total !== null ? ' · $' + comanda.total.toFixed(2) : '') : '');
+        document.getElementById('abrir-comanda').classList.toggle('d-none', !mesa || comanda !== null);
+        document.getElementById('acciones-comanda').classList.toggle('d-none', !comanda);
+
+        const detalles = document.getElementById('detalles');
+        detalles.replaceChildren(...((comanda && estado.detalles[comanda.clave]) || []).map(d => {
+            const li = document.createElement('li');
+            li.className = 'list-group-item';
+            li.textContent = d.cantidad + ' × ' + d.nombre + ' (sin enviar)';
+            return li;
+        }));
+
+        const menu = document.getElementById('menu');
+        menu.replaceChildren(...(comanda ? estado.catalogo.menu : []).map(categoria => {
+            const div = document.createElement('div');
+            div.className = 'mb-2';
+            const titulo = document.createElement('h6');
+            titulo.textContent = categoria.categoria;
+            div.appendChild(titulo);
+            for (const p of categoria.productos) {
+                div.appendChild(boton(p.nombre, 'btn-outline-primary btn-sm me-1 mb-1', () => agregarProducto(p)));
+            }
+            return div;
+        }));
+    }
+
+    document.getElementById('abrir-comanda').addEventListener('click', abrirComanda);
+    document.getElementById('sincronizar').addEventListener('click', sincronizar);
+    document.querySelectorAll('#acciones-comanda [data-estado]').forEach(b =>
+        b.addEventListener('click', () => cambiarEstado(b.dataset.estado)));
+    window.addEventListener('online', () => { render(); sincronizar(); });
+    window.addEventListener('offline', render);
+    setInterval(sincronizar, 15000);
+
+    // El service worker requiere HTTPS (o localhost); sin él la página funciona
+    // igual mientras no se recargue sin red
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.register(raiz.dataset.swUrl, { scope: './' }).catch(() => {});
+    }
+
+    render();
+    cargarCatalogo().then(sincronizar);
+})();
@@ -0,0 +1,58 @@
+// Service worker del cliente de comandas sin conexión (alcance /comandas/).
+// Guarda la página, el catálogo y los archivos estáticos para poder abrirla
+// sin red; las escrituras no pasan por aquí: la página las encola y sincroniza.
+const CACHE = 'comandas-offline-v1';
+const PRECARGA = ['/comandas/offline', '/comandas/api/catalogo'];
+
+self.addEventListener('install', evento => {
+    evento.waitUntil(
+        caches.open(CACHE)
+            .then(cache => Promise.all(PRECARGA.map(url => cache.add(url).catch(() => null))))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', evento => {
+    evento.waitUntil(
+        caches.keys()
+            .then(claves => Promise.all(claves.filter(c => c !== CACHE).map(c => caches.delete(c))))
+            .then(() => self.clients.claim())
+    );
+});
+
+async function primeroCache(peticion) {
+    const guardada = await caches.match(peticion);
+    if (guardada) return guardada;
+    const respuesta = await fetch(peticion);
+    if (respuesta.ok) {
+        (await caches.open(CACHE)).put(peticion, respuesta.clone());
+    }
+    return respuesta;
+}
+
+async function primeroRed(peticion) {
+    try {
+        const respuesta = await fetch(peticion);
+        if (respuesta.ok && !respuesta.redirected) {
+            (await caches.open(CACHE)).put(peticion, respuesta.clone());
+        }
+        return respuesta;
+    } catch (e) {
+        const guardada = await caches.match(peticion);
+        if (guardada) return guardada;
+        throw e;
+    }
+}
+
+self.addEventListener('fetch', evento => {
+    const peticion = evento.request;
+    if (peticion.method !== 'GET') return;
+    const url = new URL(peticion.url);
+    if (url.origin === location.origin && url.pathname.startsWith('/assets/')) {
+        // Nombres con hash: nunca cambian
+        evento.respondWith(primeroCache(peticion));
+    } else if (url.origin !== location.origin || url.pathname.startsWith('/static/')
+               || url.pathname === '/comandas/offline' || url.pathname === '/comandas/api/catalogo') {
+        evento.respondWith(primeroRed(peticion));
+    }
+});
@@ -0,0 +1,75 @@
+import json
+import threading
+import time
+
+from flask import Response, current_app, request, stream_with_context
+
+from app.metricas import metricas
+from app.models import db
+from app.plazos import reiniciar_plazo
+from app.sucursales import sucursal_actual
+from app.versiones import versiones_recientes
+
+# Último payload construido por conjunto y sucursal: los clientes del worker lo comparten
+_payloads = {}
+_lock = threading.Lock()
+
+
+def _payload(clave, version, construir):
+    actual = _payloads.get(clave)
+    if actual and actual[0] == version:
+        return actual[1]
+    with _lock:
+        actual = _payloads.get(clave)
+        if actual and actual[0] == version:
+            return actual[1]
+        try:
+            datos = json.dumps(construir(), separators=(',', ':'), default=str)
+        finally:
+            # Devolver la conexión al pool: el stream no retiene conexiones ociosas
+            db.session.remove()
+        _payloads[clave] = (version, datos)
+        return datos
+
+
+def respuesta_sse(conjunto, evento, construir):
+    """Server-Sent Events que reenvían `construir()` cada vez que cambia la versión
+    del conjunto de datos.
+
+    Entre cambios el cliente solo cuesta leer un entero en memoria. Con workers
+    síncronos la conexión se cierra tras STREAM_DURACION_MAX segundos y el
+    navegador (EventSource) reconecta solo; con gevent puede durar horas.
+    """
+    intervalo = current_app.config['STREAM_INTERVALO']
+    duracion = current_app.config['STREAM_DURACION_MAX']
+    latido = current_app.config['STREAM_LATIDO']
+    ultima = request.headers.get('Last-Event-ID', type=int)
+    sucursal = sucursal_actual()
+    # La autenticación ya cargó al usuario: soltar esa conexión antes de quedarse abierto
+    db.session.remove()
+
+    def generar(ultima=ultima):
+        metricas.incrementar('streams.abiertos')
+        inicio = ultimo_envio = time.monotonic()
+        try:
+            yield f'retry: {int(intervalo * 3000)}\n\n'
+            while time.monotonic() - inicio < duracion:
+                # El plazo de la petición cuenta por vuelta, no por toda la conexión
+                reiniciar_plazo()
+                version = versiones_recientes.obtener(conjunto, intervalo)
+                if version != ultima:
+                    datos = _payload((conjunto, evento, sucursal), version, construir)
+                    yield f'id: {version}\nevent: {evento}\ndata: {datos}\n\n'
+                    ultima = version
+                    ultimo_envio = time.monotonic()
+                elif time.monotonic() - ultimo_envio >= latido:
+                    yield ': ping\n\n'
+                    ultimo_envio = time.monotonic()
+                time.sleep(intervalo)
+        finally:
+            metricas.incrementar('streams.cerrados')
+
+    return Response(stream_with_context(generar()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
@@ -0,0 +1,75 @@
+"""Separación de datos por sucursal.
+
+Cada petición autenticada trabaja sobre una sucursal: la del usuario, o la que
+un administrador eligió en /sistema/sucursal. Todas las consultas ORM sobre
+modelos `PorSucursal` reciben `sucursal_id = :actual` (with_loader_criteria,
+también en cargas perezosas de relaciones y en UPDATE/DELETE del ORM) y las
+filas nuevas toman esa sucursal al hacer flush. Como todos los índices de esas
+tablas empiezan por sucursal_id, cada sucursal recorre solo su parte.
+
+Fuera de una petición (init_db, scripts, CLI) no se filtra nada.
+"""
+import click
+from flask import g, has_request_context, session
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import with_loader_criteria
+
+from app.database import SesionEnrutada
+from app.models import db, PorSucursal, Sucursal, SUCURSAL_PRINCIPAL
+
+
+def sucursal_actual():
+    """Sucursal de la petición en curso, o None (sin filtro)"""
+    if not has_request_context():
+        return None
+    return g.get('sucursal_id')
+
+
+def _filtrar_por_sucursal(estado):
+    if not (estado.is_select or estado.is_update or estado.is_delete):
+        return
+    # Las cargas de relaciones ya heredan el criterio de la consulta que las originó
+    if estado.is_column_load or estado.is_relationship_load:
+        return
+    if estado.execution_options.get('todas_sucursales'):
+        return
+    sucursal_id = sucursal_actual()
+    if sucursal_id is None:
+        return
+    estado.statement = estado.statement.options(with_loader_criteria(
+        PorSucursal,
+        lambda cls: cls.sucursal_id == sucursal_id,
+        include_aliases=True,
+    ))
+
+
+def _asignar_sucursal(sesion, contexto, instancias):
+    sucursal_id = sucursal_actual() or SUCURSAL_PRINCIPAL
+    for obj in sesion.new:
+        if isinstance(obj, PorSucursal) and obj.sucursal_id is None:
+            obj.sucursal_id = sucursal_id
+
+
+def registrar_sucursales(app):
+    if not event.contains(SesionEnrutada, 'do_orm_execute', _filtrar_por_sucursal):
+        event.listen(SesionEnrutada, 'do_orm_execute', _filtrar_por_sucursal)
+        event.listen(SesionEnrutada, 'before_flush', _asignar_sucursal)
+
+    @app.before_request
+    def fijar_sucursal():
+        # current_user se carga aquí, antes de fijar la sucursal: esa consulta va sin filtro
+        if current_user.is_authenticated:
+            elegida = session.get('sucursal_id') if current_user.rol == 'admin' else None
+            g.sucursal_id = elegida or current_user.sucursal_id
+
+    @app.cli.command('crear-sucursal')
+    @click.argument('nombre')
+    @click.option('--direccion', default=None)
+    def crear_sucursal(nombre, direccion):
+        """Registrar una sucursal nueva"""
+        sucursal = Sucursal(nombre=nombre, direccion=direccion, activo=True)
+        db.session.add(sucursal)
+        db.session.commit()
+        click.echo(f'Sucursal {sucursal.nombre} creada con id {sucursal.id}')
+
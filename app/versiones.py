@@ -0,0 +1,131 @@
+"""Versión por conjunto de datos (mesas, comandas, menú, reservas).
+
+Cada flush anota en la sesión qué conjuntos tocó y los contadores suben
+después del commit, con un UPSERT en una transacción propia: las filas de
+`versiones_datos` se bloquean solo durante ese UPDATE, no durante toda la
+transacción que hizo el cambio (si no, todas las escrituras de la aplicación
+se formarían detrás de ellas). Un rollback descarta lo anotado.
+
+Quien lee la versión antes de leer los datos nunca guarda datos más viejos
+que su versión; entre el commit y la subida puede ver datos nuevos con la
+versión anterior, que se invalidan al subir.
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.database import SesionEnrutada
+from app.models import db, VersionDatos
+
+logger = logging.getLogger(__name__)
+
+# Clave en Session.info de los conjuntos por subir al confirmar
+PENDIENTES = 'versiones_pendientes'
+
+# Qué conjunto de datos cambia cuando se escribe en cada tabla
+CONJUNTOS_POR_TABLA = {
+    'mesas': ('mesas',),
+    'comandas': ('comandas', 'mesas'),
+    'detalles_comanda': ('comandas',),
+    'pagos': ('comandas',),
+    'productos': ('menu',),
+    'categorias': ('menu',),
+    'listas_precios': ('menu',),
+    'precios_lista': ('menu',),
+    'reservas': ('reservas',),
+}
+CONJUNTOS = ('mesas', 'comandas', 'menu', 'reservas')
+
+
+def incrementar_version(*nombres):
+    """Subir la versión de uno o más conjuntos cuando se confirme la transacción actual.
+
+    Las escrituras que no pasan por el flush del ORM (UPDATE masivos) deben
+    llamarla explícitamente.
+    """
+    if nombres:
+        db.session.info.setdefault(PENDIENTES, set()).update(nombres)
+
+
+def _subir(nombres):
+    """UPSERT de los contadores en una transacción propia y corta"""
+    tabla = VersionDatos.__table__
+    dialecto = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    sentencia = dialecto.insert(tabla).values([{'nombre': n, 'version': 1} for n in sorted(nombres)])
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=['nombre'], set_={'version': tabla.c.version + 1})
+    with db.engine.begin() as conexion:
+        conexion.execute(sentencia)
+
+
+def _conjuntos_modificados(sesion):
+    conjuntos = set()
+    for obj in list(sesion.new) + list(sesion.deleted) + list(sesion.dirty):
+        tabla = getattr(obj, '__tablename__', None)
+        if tabla in CONJUNTOS_POR_TABLA and (obj not in sesion.dirty or sesion.is_modified(obj)):
+            conjuntos.update(CONJUNTOS_POR_TABLA[tabla])
+    return conjuntos
+
+
+def _despues_de_flush(sesion, contexto):
+    conjuntos = _conjuntos_modificados(sesion)
+    if conjuntos:
+        sesion.info.setdefault(PENDIENTES, set()).update(conjuntos)
+
+
+def _despues_de_commit(sesion):
+    conjuntos = sesion.info.pop(PENDIENTES, None)
+    if not conjuntos:
+        return
+    try:
+        _subir(conjuntos)
+    except Exception as e:
+        # El cambio ya está confirmado: las cachés lo verán al caducar
+        logger.warning('No se pudo subir la versión de %s: %s', ', '.join(sorted(conjuntos)), e)
+
+
+def _despues_de_rollback(sesion):
+    sesion.info.pop(PENDIENTES, None)
+
+
+def registrar_versiones():
+    if not event.contains(SesionEnrutada, 'after_flush', _despues_de_flush):
+        event.listen(SesionEnrutada, 'after_flush', _despues_de_flush)
+        event.listen(SesionEnrutada, 'after_commit', _despues_de_commit)
+        event.listen(SesionEnrutada, 'after_rollback', _despues_de_rollback)
+
+
+def leer_versiones(*nombres):
+    """Leer versiones del primario con una conexión propia (no toca db.session)"""
+    with db.engine.connect() as conexion:
+        filas = conexion.execute(
+            select(VersionDatos.nombre, VersionDatos.version)
+            .where(VersionDatos.nombre.in_(nombres))
+        ).all()
+    versiones = dict.fromkeys(nombres, 0)
+    versiones.update(dict(filas))
+    return versiones
+
+
+class VersionesRecientes:
+    """Lectura compartida de versiones por proceso: N clientes, una consulta por intervalo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._valores = {}
+        self._leido = 0.0
+
+    def obtener(self, nombre, max_edad=1.0):
+        ahora = time.monotonic()
+        if ahora - self._leido >= max_edad:
+            with self._lock:
+                if time.monotonic() - self._leido >= max_edad:
+                    self._valores = leer_versiones(*CONJUNTOS)
+                    self._leido = time.monotonic()
+        return self._valores.get(nombre, 0)
+
+
+versiones_recientes = VersionesRecientes()
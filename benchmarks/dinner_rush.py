@@ -0,0 +1,405 @@
+"""Prueba de carga "hora pico" del restaurante.
+
+Siembra un restaurante realista (mesas, menú, personal) y simula a los
+distintos roles trabajando en paralelo contra la aplicación:
+
+- Meseros: toman mesas disponibles, crean comandas (``comandas.crear``),
+  agregan productos (``comandas.editar``), entregan lo que cocina marcó como
+  listo y liberan las mesas en limpieza.
+- Cocina: consulta ``comandas.api_activas`` y avanza los estados.
+- Caja: abre turno y cobra con ``caja.procesar_pago``.
+- Admin: navega los listados.
+
+Al final reporta latencias p50/p95/p99 y throughput por endpoint en JSON para
+poder comparar corridas entre versiones.
+
+Uso:
+    python -m benchmarks.dinner_rush --duracion 60 --salida resultados.json
+    python -m benchmarks.dinner_rush --database-url postgresql://... --reset
+    python -m benchmarks.dinner_rush --comparar base.json --salida nueva.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import queue
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+FORMATO_VERSION = 1
+RE_COMANDA = re.compile(r'/comandas/(\d+)/editar')
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not valores:
+        return None
+    k = max(0, min(len(valores) - 1, int(round(p / 100.0 * len(valores) + 0.5)) - 1))
+    return valores[k]
+
+
+class Registro:
+    """Acumula latencias y códigos de respuesta por endpoint (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = defaultdict(list)
+        self.codigos = defaultdict(lambda: defaultdict(int))
+        self.errores = defaultdict(int)
+
+    def medir(self, endpoint, funcion, esperado=(200, 302)):
+        inicio = time.perf_counter()
+        try:
+            respuesta = funcion()
+            codigo = respuesta.status_code
+        except Exception as e:
+            respuesta = None
+            codigo = type(e).__name__
+        transcurrido = (time.perf_counter() - inicio) * 1000.0
+        with self._lock:
+            self.latencias[endpoint].append(transcurrido)
+            self.codigos[endpoint][str(codigo)] += 1
+            if codigo not in esperado:
+                self.errores[endpoint] += 1
+        return respuesta if codigo in esperado else None
+
+    def resumen(self, duracion):
+        endpoints = {}
+        for endpoint, valores in sorted(self.latencias.items()):
+            valores = sorted(valores)
+            endpoints[endpoint] = {
+                'n': len(valores),
+                'errores': self.errores[endpoint],
+                'rps': round(len(valores) / duracion, 2),
+                'p50_ms': round(percentil(valores, 50), 3),
+                'p95_ms': round(percentil(valores, 95), 3),
+                'p99_ms': round(percentil(valores, 99), 3),
+                'max_ms': round(valores[-1], 3),
+                'codigos': dict(self.codigos[endpoint]),
+            }
+        total = sum(e['n'] for e in endpoints.values())
+        return {
+            'total': {
+                'n': total,
+                'errores': sum(e['errores'] for e in endpoints.values()),
+                'rps': round(total / duracion, 2),
+            },
+            'endpoints': endpoints,
+        }
+
+
+class Simulacion:
+    """Estado compartido entre los usuarios virtuales"""
+
+    def __init__(self, app, registro, args):
+        self.app = app
+        self.registro = registro
+        self.args = args
+        self.fin = time.monotonic() + args.duracion
+        self.detener = threading.Event()
+        self.listas = queue.Queue()       # comandas listas para entregar
+        self.por_cobrar = queue.Queue()   # comandas entregadas sin pago
+        self.limpieza = queue.Queue()     # mesas por liberar
+        self.en_curso = set()             # comandas ya tomadas por cocina
+        self.mesa_de = {}                 # comanda -> mesa
+        self.lock = threading.Lock()
+
+    def activa(self):
+        return not self.detener.is_set() and time.monotonic() < self.fin
+
+    def pausa(self, rnd):
+        if self.args.pausa_ms:
+            time.sleep(rnd.uniform(0.5, 1.5) * self.args.pausa_ms / 1000.0)
+
+
+def iniciar_sesion(cliente, username, password):
+    respuesta = cliente.post('/auth/login', data={'username': username, 'password': password})
+    if respuesta.status_code != 302:
+        raise RuntimeError(f'No se pudo iniciar sesión como {username}')
+
+
+def mesero(sim, username, semilla, productos):
+    rnd = random.Random(semilla)
+    reg = sim.registro
+    cliente = sim.app.test_client()
+    iniciar_sesion(cliente, username, 'mesero123')
+
+    while sim.activa():
+        # Primero lo urgente: entregar platos y liberar mesas
+        try:
+            comanda_id, mesa_id = sim.listas.get_nowait()
+            if reg.medir('comandas.cambiar_estado', lambda: cliente.post(
+                    f'/comandas/{comanda_id}/cambiar-estado', data={'estado': 'entregada'}),
+                    esperado=(200,)):
+                sim.por_cobrar.put((comanda_id, mesa_id))
+            continue
+        except queue.Empty:
+            pass
+
+        try:
+            mesa_id = sim.limpieza.get_nowait()
+            reg.medir('mesas.cambiar_estado', lambda: cliente.post(
+                f'/mesas/{mesa_id}/cambiar-estado', data={'estado': 'disponible'}),
+                esperado=(200,))
+            continue
+        except queue.Empty:
+            pass
+
+        respuesta = reg.medir('mesas.api_estado', lambda: cliente.get('/mesas/api/estado'),
+                              esperado=(200,))
+        disponibles = [m['id'] for m in (respuesta.get_json() if respuesta else [])
+                       if m['estado'] == 'disponible']
+        if not disponibles:
+            sim.pausa(rnd)
+            continue
+
+        mesa_id = rnd.choice(disponibles)
+        respuesta = reg.medir('comandas.crear', lambda: cliente.post(
+            '/comandas/crear', data={'mesa_id': mesa_id}), esperado=(302,))
+        coincidencia = RE_COMANDA.search(respuesta.headers.get('Location', '')) if respuesta else None
+        if not coincidencia:
+            # Otro mesero ganó la mesa o falló la creación
+            continue
+        comanda_id = int(coincidencia.group(1))
+        sim.mesa_de[comanda_id] = mesa_id
+
+        for _ in range(rnd.randint(2, 6)):
+            producto_id = rnd.choice(productos)
+            reg.medir('comandas.editar', lambda: cliente.post(
+                f'/comandas/{comanda_id}/editar',
+                data={'producto_id': producto_id, 'cantidad': rnd.randint(1, 3)}),
+                esperado=(302,))
+            sim.pausa(rnd)
+
+
+def cocina(sim, username, semilla):
+    rnd = random.Random(semilla)
+    reg = sim.registro
+    cliente = sim.app.test_client()
+    iniciar_sesion(cliente, username, 'cocina123')
+
+    while sim.activa():
+        respuesta = reg.medir('comandas.api_activas', lambda: cliente.get('/comandas/api/activas'),
+                              esperado=(200,))
+        comandas = respuesta.get_json() if respuesta else []
+        for comanda in comandas:
+            if not sim.activa():
+                break
+            with sim.lock:
+                if (comanda['id'], comanda['estado']) in sim.en_curso:
+                    continue
+                sim.en_curso.add((comanda['id'], comanda['estado']))
+            nuevo = 'en_preparacion' if comanda['estado'] == 'pendiente' else 'lista'
+            if reg.medir('comandas.cambiar_estado', lambda: cliente.post(
+                    f"/comandas/{comanda['id']}/cambiar-estado", data={'estado': nuevo}),
+                    esperado=(200,)) and nuevo == 'lista':
+                sim.listas.put((comanda['id'], sim.mesa_de.get(comanda['id'])))
+        sim.pausa(rnd)
+
+
+def caja(sim, username, semilla):
+    rnd = random.Random(semilla)
+    reg = sim.registro
+    cliente = sim.app.test_client()
+    iniciar_sesion(cliente, username, 'caja123')
+    reg.medir('caja.abrir_turno', lambda: cliente.post(
+        '/caja/abrir-turno', data={'monto_inicial': 1000}), esperado=(302,))
+
+    while sim.activa():
+        try:
+            comanda_id, mesa_id = sim.por_cobrar.get(timeout=0.05)
+        except queue.Empty:
+            continue
+        metodo = rnd.choices(['Efectivo', 'Tarjeta', 'Transferencia'], weights=[45, 45, 10])[0]
+        datos = {'metodo_pago': metodo, 'monto_recibido': 100000}
+        if reg.medir('caja.procesar_pago', lambda: cliente.post(
+                f'/caja/procesar-pago/{comanda_id}', data=datos), esperado=(302,)):
+            sim.limpieza.put(mesa_id)
+        sim.pausa(rnd)
+
+
+def admin(sim, username, semilla):
+    rnd = random.Random(semilla)
+    reg = sim.registro
+    cliente = sim.app.test_client()
+    iniciar_sesion(cliente, username, 'admin123')
+    vistas = [
+        ('comandas.listar', lambda: f'/comandas/?page={rnd.randint(1, 5)}'),
+        ('caja.historial_turnos', lambda: '/caja/historial-turnos'),
+        ('inventario.productos', lambda: '/inventario/'),
+        ('mesas.listar', lambda: '/mesas/'),
+    ]
+    while sim.activa():
+        endpoint, url = rnd.choice(vistas)
+        ruta = url()
+        reg.medir(endpoint, lambda: cliente.get(ruta), esperado=(200,))
+        sim.pausa(rnd)
+
+
+def preparar_base(app, args):
+    from app.models import db, Producto
+    from init_db import (seed_sucursal, seed_usuarios, seed_mesas, seed_menu, seed_versiones,
+                         MESAS)
+
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+        # Primero la sucursal: las demás filas la referencian
+        seed_sucursal()
+        seed_versiones()
+        seed_usuarios(extra_meseros=args.meseros, extra_cajeros=args.cajeros,
+                      extra_cocina=args.cocina)
+        mesas = list(MESAS) + [(n, 4, 'Salón') for n in range(len(MESAS) + 1, args.mesas + 1)]
+        seed_mesas(mesas)
+        seed_menu()
+        return [p.id for p in Producto.query.filter_by(disponible=True).all()]
+
+
+def version_codigo():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def url_segura(url):
+    """Ocultar la contraseña de la URL de conexión"""
+    return re.sub(r'://([^:/@]+):[^@]*@', r'://\1:***@', url)
+
+
+def comparar(base, actual, tolerancia):
+    """Imprimir diferencias contra una corrida anterior; regresa True si hay regresiones"""
+    regresion = False
+    print(f"\n{'endpoint':28} {'p95 base':>10} {'p95 ahora':>10} {'Δ%':>8} {'rps base':>10} {'rps ahora':>10}")
+    for endpoint, datos in sorted(actual['endpoints'].items()):
+        anterior = base.get('endpoints', {}).get(endpoint)
+        if not anterior:
+            print(f'{endpoint:28} {"-":>10} {datos["p95_ms"]:>10.2f}')
+            continue
+        delta = (datos['p95_ms'] - anterior['p95_ms']) / anterior['p95_ms'] if anterior['p95_ms'] else 0
+        marca = ''
+        if delta > tolerancia:
+            regresion = True
+            marca = '  <-- regresión'
+        print(f"{endpoint:28} {anterior['p95_ms']:>10.2f} {datos['p95_ms']:>10.2f} "
+              f"{delta * 100:>7.1f}% {anterior['rps']:>10.2f} {datos['rps']:>10.2f}{marca}")
+    return regresion
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Prueba de carga de hora pico')
+    parser.add_argument('--database-url', help='URL de la base (por defecto SQLite temporal)')
+    parser.add_argument('--reset', action='store_true',
+                        help='Borrar y recrear las tablas antes de sembrar')
+    parser.add_argument('--duracion', type=float, default=30, help='Segundos de simulación')
+    parser.add_argument('--meseros', type=int, default=6)
+    parser.add_argument('--cocina', type=int, default=2)
+    parser.add_argument('--cajeros', type=int, default=2)
+    parser.add_argument('--admins', type=int, default=1)
+    parser.add_argument('--mesas', type=int, default=40, help='Total de mesas a sembrar')
+    parser.add_argument('--pausa-ms', type=float, default=20,
+                        help='Tiempo de "pensar" entre acciones de cada usuario')
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help='Mostrar trazas de errores')
+    parser.add_argument('--salida', help='Archivo JSON con los resultados')
+    parser.add_argument('--comparar', help='JSON de una corrida anterior para comparar')
+    parser.add_argument('--tolerancia', type=float, default=0.20,
+                        help='Regresión de p95 permitida al comparar (0.20 = 20%%)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    temporal = None
+    if not args.database_url:
+        temporal = tempfile.NamedTemporaryFile(prefix='dinner_rush_', suffix='.db', delete=False)
+        temporal.close()
+        args.database_url = 'sqlite:///' + temporal.name
+    elif not args.database_url.startswith('sqlite') and not args.reset:
+        print('Aviso: sembrando sobre una base existente; use --reset para partir de cero.')
+    # config.py lee DATABASE_URL al importarse
+    os.environ['DATABASE_URL'] = args.database_url
+
+    from app import create_app
+    app = create_app('development')
+    app.config['DEBUG'] = False
+    if not args.verbose:
+        # Los errores ya quedan contados por endpoint; no llenar la salida de trazas
+        app.logger.setLevel(logging.CRITICAL)
+    productos = preparar_base(app, args)
+
+    registro = Registro()
+    sim = Simulacion(app, registro, args)
+    hilos = []
+    for n in range(args.meseros):
+        username = 'mesero1' if n == 0 else f'mesero{n + 1}'
+        hilos.append(threading.Thread(target=mesero, args=(sim, username, args.semilla + n, productos)))
+    for n in range(args.cocina):
+        username = 'cocina' if n == 0 else f'cocina{n + 1}'
+        hilos.append(threading.Thread(target=cocina, args=(sim, username, args.semilla + 100 + n)))
+    for n in range(args.cajeros):
+        username = 'caja' if n == 0 else f'caja{n + 1}'
+        hilos.append(threading.Thread(target=caja, args=(sim, username, args.semilla + 200 + n)))
+    for n in range(args.admins):
+        hilos.append(threading.Thread(target=admin, args=(sim, 'admin', args.semilla + 300 + n)))
+
+    inicio = time.monotonic()
+    for hilo in hilos:
+        hilo.daemon = True
+        hilo.start()
+    try:
+        for hilo in hilos:
+            hilo.join()
+    except KeyboardInterrupt:
+        sim.detener.set()
+        for hilo in hilos:
+            hilo.join()
+    duracion = time.monotonic() - inicio
+
+    resultado = {
+        'formato': FORMATO_VERSION,
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'version': version_codigo(),
+        'python': platform.python_version(),
+        'base_de_datos': url_segura(args.database_url),
+        'parametros': {k: v for k, v in vars(args).items()
+                       if k not in ('database_url', 'salida', 'comparar')},
+        'duracion_s': round(duracion, 3),
+    }
+    resultado.update(registro.resumen(duracion))
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+    else:
+        print(texto)
+
+    if temporal:
+        os.unlink(temporal.name)
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            base = json.load(f)
+        if comparar(base, resultado, args.tolerancia):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
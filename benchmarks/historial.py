@@ -0,0 +1,353 @@
+"""Generador de historial sintético para pruebas de escala.
+
+Genera meses o años de operación (turnos, comandas, detalles y pagos) con
+distribuciones configurables y los inserta en lotes grandes: ``COPY`` en
+PostgreSQL y ``executemany`` en los demás motores. Las horas se generan en
+hora local y se guardan en UTC con su ``fecha_negocio``, como la aplicación.
+La salida es determinista para una misma semilla y parámetros.
+
+Uso:
+    python -m benchmarks.historial --database-url postgresql://... --dias 365
+    python -m benchmarks.historial --anios 3 --comandas-por-dia 600 --semilla 7
+    python -m benchmarks.historial --mezcla-pago Efectivo=30,Tarjeta=60,Transferencia=10
+"""
+import argparse
+import csv
+import io
+import math
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+# Peso relativo de llegadas por hora del día (comida y cena como picos)
+HORAS = {
+    8: 2, 9: 3, 10: 3, 11: 4, 12: 6, 13: 10, 14: 14, 15: 12, 16: 7, 17: 5,
+    18: 6, 19: 9, 20: 13, 21: 12, 22: 8, 23: 4, 0: 2,
+}
+SEMANAL = '0.75,0.8,0.85,0.95,1.25,1.5,1.3'              # lunes..domingo
+MENSUAL = '0.85,0.85,0.95,1.0,1.05,1.0,1.1,1.05,0.95,0.95,1.0,1.3'
+MEZCLA_PAGO = 'Efectivo=45,Tarjeta=45,Transferencia=10'
+# Fijo (no "hoy menos --dias"): la misma semilla da los mismos datos cualquier día
+DESDE = date(2025, 1, 1)
+
+
+def parse_lista(texto, n, nombre):
+    valores = [float(v) for v in texto.split(',')]
+    if len(valores) != n:
+        raise SystemExit(f'--{nombre} requiere {n} valores separados por coma')
+    return valores
+
+
+def parse_mezcla(texto):
+    mezcla = {}
+    for parte in texto.split(','):
+        metodo, _, peso = parte.partition('=')
+        mezcla[metodo.strip()] = float(peso)
+    return mezcla
+
+
+def acumulados(pesos):
+    total = 0.0
+    resultado = []
+    for peso in pesos:
+        total += peso
+        resultado.append(total)
+    return resultado
+
+
+class Cargador:
+    """Acumula filas por tabla y las inserta en lotes respetando las llaves foráneas"""
+
+    ORDEN = ('turnos', 'comandas', 'detalles_comanda', 'pagos')
+
+    def __init__(self, engine, tablas, lote):
+        self.engine = engine
+        self.tablas = tablas
+        self.lote = lote
+        self.filas = {nombre: [] for nombre in self.ORDEN}
+        self.insertadas = {nombre: 0 for nombre in self.ORDEN}
+        self.usar_copy = engine.dialect.name == 'postgresql'
+
+    def agregar(self, tabla, fila):
+        self.filas[tabla].append(fila)
+
+    def pendientes(self):
+        return sum(len(f) for f in self.filas.values())
+
+    def vaciar_si_lleno(self):
+        if self.pendientes() >= self.lote:
+            self.vaciar()
+
+    def vaciar(self):
+        with self.engine.begin() as conn:
+            for nombre in self.ORDEN:
+                filas = self.filas[nombre]
+                if not filas:
+                    continue
+                if self.usar_copy:
+                    self._copy(conn, self.tablas[nombre], filas)
+                else:
+                    conn.execute(self.tablas[nombre].insert(), filas)
+                self.insertadas[nombre] += len(filas)
+                self.filas[nombre] = []
+
+    def _copy(self, conn, tabla, filas):
+        columnas = list(filas[0].keys())
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        for fila in filas:
+            escritor.writerow(['' if fila[c] is None else fila[c] for c in columnas])
+        buffer.seek(0)
+        cursor = conn.connection.cursor()
+        cursor.copy_expert(
+            f'COPY {tabla.name} ({", ".join(columnas)}) FROM STDIN WITH (FORMAT csv)', buffer
+        )
+
+    def ajustar_secuencias(self):
+        """Tras COPY con ids explícitos, mover las secuencias de PostgreSQL"""
+        if not self.usar_copy:
+            return
+        with self.engine.begin() as conn:
+            for nombre in self.ORDEN:
+                conn.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{nombre}', 'id'), "
+                    f"COALESCE((SELECT MAX(id) FROM {nombre}), 1))"
+                )
+
+
+class Generador:
+    """Produce la operación día por día de forma determinista"""
+
+    def __init__(self, args, mesas, meseros, cajeros, productos):
+        self.args = args
+        self.rnd = random.Random(args.semilla)
+        self.mesas = mesas
+        self.meseros = meseros
+        self.cajeros = cajeros
+        self.semanal = parse_lista(args.estacionalidad_semanal, 7, 'estacionalidad-semanal')
+        self.mensual = parse_lista(args.estacionalidad_mensual, 12, 'estacionalidad-mensual')
+
+        mezcla = parse_mezcla(args.mezcla_pago)
+        self.metodos = list(mezcla)
+        self.metodos_acum = acumulados(mezcla.values())
+
+        self.horas = list(HORAS)
+        self.horas_acum = acumulados(HORAS.values())
+
+        # Popularidad tipo Zipf con un orden de productos fijo por semilla
+        self.productos = list(productos)
+        self.rnd.shuffle(self.productos)
+        self.productos_acum = acumulados(
+            1.0 / math.pow(rango, args.popularidad) for rango in range(1, len(self.productos) + 1)
+        )
+
+    def comandas_del_dia(self, dia, indice):
+        factor = self.semanal[dia.weekday()] * self.mensual[dia.month - 1]
+        factor *= (1 + self.args.tendencia) ** (indice / 365.0)
+        media = self.args.comandas_por_dia * factor
+        # Normal como aproximación de Poisson para medias grandes
+        return max(0, int(round(self.rnd.gauss(media, math.sqrt(media)))))
+
+    def elegir(self, valores, acum):
+        return self.rnd.choices(valores, cum_weights=acum)[0]
+
+    def generar(self, cargador, ids):
+        inicio = self.args.desde
+        for indice in range(self.args.dias):
+            dia = inicio + timedelta(days=indice)
+            self._generar_dia(cargador, ids, dia, indice)
+            cargador.vaciar_si_lleno()
+            yield dia
+
+    def _generar_dia(self, cargador, ids, dia, indice):
+        from app.models import a_utc, fecha_negocio_local
+
+        rnd = self.rnd
+        base = datetime.combine(dia, datetime.min.time())
+        # Un desfase por día basta (sin horario de verano desde 2022)
+        utc = a_utc(base + timedelta(hours=12)) - (base + timedelta(hours=12))
+
+        # Dos turnos por día: 08:00-16:00 y 16:00-01:00
+        turnos = []
+        for apertura, cierre in ((8, 16), (16, 25)):
+            ids['turnos'] += 1
+            turno = {
+                'id': ids['turnos'],
+                'usuario_id': rnd.choice(self.cajeros),
+                'fecha_apertura': base + timedelta(hours=apertura) + utc,
+                'fecha_cierre': base + timedelta(hours=cierre) + utc,
+                'fecha_negocio': fecha_negocio_local(base + timedelta(hours=apertura)),
+                'monto_inicial': 1000.0,
+                'monto_final': 1000.0,
+                'estado': 'cerrado',
+                'observaciones': None,
+            }
+            turnos.append(turno)
+            cargador.agregar('turnos', turno)
+
+        for _ in range(self.comandas_del_dia(dia, indice)):
+            hora = self.elegir(self.horas, self.horas_acum)
+            creada = base + timedelta(hours=hora if hora >= 8 else hora + 24,
+                                      minutes=rnd.randint(0, 59), seconds=rnd.randint(0, 59))
+            actualizada = creada + timedelta(minutes=rnd.randint(15, 75))
+            cancelada = rnd.random() < self.args.cancelaciones
+
+            ids['comandas'] += 1
+            comanda_id = ids['comandas']
+            total = 0.0
+            for _ in range(min(12, 1 + int(rnd.expovariate(1 / self.args.productos_por_comanda)))):
+                producto_id, precio = self.elegir(self.productos, self.productos_acum)
+                cantidad = 1 if rnd.random() < 0.7 else rnd.randint(2, 4)
+                subtotal = round(precio * cantidad, 2)
+                total += subtotal
+                ids['detalles_comanda'] += 1
+                cargador.agregar('detalles_comanda', {
+                    'id': ids['detalles_comanda'],
+                    'comanda_id': comanda_id,
+                    'producto_id': producto_id,
+                    'cantidad': cantidad,
+                    'precio_unitario': precio,
+                    'subtotal': subtotal,
+                    'observaciones': None,
+                })
+            total = round(total, 2)
+
+            cargador.agregar('comandas', {
+                'id': comanda_id,
+                'mesa_id': rnd.choice(self.mesas),
+                'mesero_id': rnd.choice(self.meseros),
+                'estado': 'cancelada' if cancelada else 'entregada',
+                'observaciones': None,
+                'subtotal': total,
+                'total': total,
+                'fecha_creacion': creada + utc,
+                'fecha_actualizacion': actualizada + utc,
+                'fecha_negocio': fecha_negocio_local(creada),
+            })
+            if cancelada:
+                continue
+
+            pagada = actualizada + timedelta(minutes=rnd.randint(3, 25))
+            turno = turnos[0] if pagada + utc < turnos[1]['fecha_apertura'] else turnos[1]
+            metodo = self.elegir(self.metodos, self.metodos_acum)
+            recibido = total
+            if metodo == 'Efectivo':
+                recibido = float(math.ceil(total / 50.0) * 50)
+                turno['monto_final'] += total
+            ids['pagos'] += 1
+            cargador.agregar('pagos', {
+                'id': ids['pagos'],
+                'comanda_id': comanda_id,
+                'turno_id': turno['id'],
+                'metodo_pago': metodo,
+                'monto': total,
+                'monto_recibido': recibido,
+                'cambio': round(recibido - total, 2),
+                'fecha_pago': pagada + utc,
+                'fecha_negocio': fecha_negocio_local(pagada),
+            })
+
+        for turno in turnos:
+            turno['monto_final'] = round(turno['monto_final'], 2)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Generador de historial sintético')
+    parser.add_argument('--database-url', help='URL de la base (por defecto DATABASE_URL)')
+    parser.add_argument('--reset', action='store_true',
+                        help='Borrar y recrear las tablas antes de generar')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--desde', type=date.fromisoformat, default=DESDE,
+                        help=f'Primer día (AAAA-MM-DD, por defecto {DESDE})')
+    parser.add_argument('--dias', type=int, default=365)
+    parser.add_argument('--anios', type=float, help='Alternativa a --dias')
+    parser.add_argument('--comandas-por-dia', type=float, default=250,
+                        help='Media de comandas en un día "normal"')
+    parser.add_argument('--productos-por-comanda', type=float, default=3.0,
+                        help='Media de renglones por comanda')
+    parser.add_argument('--estacionalidad-semanal', default=SEMANAL,
+                        help='7 factores, lunes a domingo')
+    parser.add_argument('--estacionalidad-mensual', default=MENSUAL,
+                        help='12 factores, enero a diciembre')
+    parser.add_argument('--tendencia', type=float, default=0.05,
+                        help='Crecimiento anual de la demanda (0.05 = 5%%)')
+    parser.add_argument('--popularidad', type=float, default=1.1,
+                        help='Exponente Zipf de popularidad del menú (0 = uniforme)')
+    parser.add_argument('--mezcla-pago', default=MEZCLA_PAGO,
+                        help='Pesos por método de pago, p. ej. Efectivo=45,Tarjeta=45')
+    parser.add_argument('--cancelaciones', type=float, default=0.03,
+                        help='Proporción de comandas canceladas')
+    parser.add_argument('--meseros', type=int, default=12)
+    parser.add_argument('--cajeros', type=int, default=3)
+    parser.add_argument('--mesas', type=int, default=40)
+    parser.add_argument('--lote', type=int, default=50000,
+                        help='Filas acumuladas antes de cada inserción masiva')
+    args = parser.parse_args(argv)
+    if args.anios:
+        args.dias = int(round(args.anios * 365))
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.database_url:
+        # config.py lee DATABASE_URL al importarse
+        os.environ['DATABASE_URL'] = args.database_url
+
+    from app import create_app
+    from app.models import db, Usuario, Mesa, Producto
+    from init_db import (seed_sucursal, seed_usuarios, seed_mesas, seed_menu, seed_versiones,
+                         MESAS)
+    from sqlalchemy import func
+
+    app = create_app('development')
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+        # Primero la sucursal: las demás filas la referencian
+        seed_sucursal()
+        seed_versiones()
+        seed_usuarios(extra_meseros=args.meseros - 1, extra_cajeros=args.cajeros - 1)
+        seed_mesas(list(MESAS) + [(n, 4, 'Salón') for n in range(len(MESAS) + 1, args.mesas + 1)])
+        seed_menu()
+
+        mesas = [m.id for m in Mesa.query.order_by(Mesa.id)]
+        meseros = [u.id for u in Usuario.query.filter_by(rol='mesero').order_by(Usuario.id)]
+        cajeros = [u.id for u in Usuario.query.filter_by(rol='caja').order_by(Usuario.id)]
+        productos = [(p.id, float(p.precio)) for p in Producto.query.order_by(Producto.id)]
+
+        tablas = {t: db.metadata.tables[t] for t in Cargador.ORDEN}
+        ids = {t: db.session.query(func.coalesce(func.max(tablas[t].c.id), 0)).scalar()
+               for t in Cargador.ORDEN}
+        db.session.remove()
+
+        cargador = Cargador(db.engine, tablas, args.lote)
+        generador = Generador(args, mesas, meseros, cajeros, productos)
+
+        inicio = time.monotonic()
+        for dia in generador.generar(cargador, ids):
+            if dia.day == 1:
+                transcurrido = time.monotonic() - inicio
+                print(f'{dia:%Y-%m}  detalles={cargador.insertadas["detalles_comanda"]:,}  '
+                      f'{transcurrido:.1f}s', file=sys.stderr)
+        cargador.vaciar()
+        cargador.ajustar_secuencias()
+
+        transcurrido = time.monotonic() - inicio
+        total = sum(cargador.insertadas.values())
+        for nombre, n in cargador.insertadas.items():
+            print(f'{nombre:18} {n:>12,}')
+        print(f'{"total":18} {total:>12,}  en {transcurrido:.1f}s '
+              f'({total / max(transcurrido, 1e-9):,.0f} filas/s)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Regresión de planes de consulta: las consultas frecuentes deben usar índice.
+
+Arma con el ORM las consultas que las rutas hacen en cada petición (cocina,
+mesas, caja, menú...), pide su plan a la base y falla si alguna recorre una
+tabla completa. En PostgreSQL se desactiva el seq scan al explicar
+(``enable_seqscan = off``): con tablas chicas el planificador lo prefiere
+aunque exista el índice, así que solo queda el seq scan cuando no hay índice
+que sirva. En SQLite se busca ``SCAN <tabla>`` sin ``USING INDEX``.
+
+Conviene correrlo sobre una base sembrada (init_db o benchmarks.historial)
+después de cambiar modelos o consultas. Termina con código 1 si hay recorridos
+completos, así sirve en CI.
+
+Uso:
+    python -m benchmarks.planes
+    python -m benchmarks.planes --database-url postgresql://... --verbose
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+SUCURSAL = 1
+
+
+def consultas():
+    """(nombre, sentencia) de los filtros más frecuentes de las rutas"""
+    from sqlalchemy import func, select
+    from app.models import (Categoria, Comanda, DetalleComanda, Evento, Pago, Producto, Reserva,
+                            Turno)
+    from app.operaciones import ESTADOS_ACTIVOS
+
+    ahora = datetime(2026, 1, 15, 20, 0)
+    return [
+        ('comandas.cocina', select(Comanda.id).where(
+            Comanda.sucursal_id == SUCURSAL, Comanda.estado.in_(ESTADOS_ACTIVOS)
+        ).order_by(Comanda.fecha_creacion)),
+        ('comandas.activa_de_mesa', select(Comanda.id).where(
+            Comanda.sucursal_id == SUCURSAL, Comanda.mesa_id == 1, Comanda.estado.in_(ESTADOS_ACTIVOS))),
+        ('comandas.del_mesero', select(Comanda.id).where(
+            Comanda.sucursal_id == SUCURSAL, Comanda.mesero_id == 2
+        ).order_by(Comanda.fecha_creacion.desc()).limit(50)),
+        ('detalles.de_comanda', select(DetalleComanda.id).where(DetalleComanda.comanda_id == 1)),
+        ('detalles.de_producto', select(DetalleComanda.id).where(DetalleComanda.producto_id == 1).limit(1)),
+        ('pagos.del_turno', select(Pago.metodo_pago, func.sum(Pago.monto)).where(
+            Pago.sucursal_id == SUCURSAL, Pago.turno_id == 1
+        ).group_by(Pago.metodo_pago)),
+        ('pagos.por_dia_negocio', select(Pago.fecha_negocio, func.sum(Pago.monto)).where(
+            Pago.sucursal_id == SUCURSAL, Pago.fecha_negocio.between(ahora.date() - timedelta(days=30),
+                                                                     ahora.date())
+        ).group_by(Pago.fecha_negocio)),
+        ('comandas.por_dia_negocio', select(Comanda.id).where(
+            Comanda.sucursal_id == SUCURSAL, Comanda.fecha_negocio == ahora.date())),
+        ('turnos.por_dia_negocio', select(Turno.id).where(
+            Turno.sucursal_id == SUCURSAL, Turno.fecha_negocio.between(ahora.date() - timedelta(days=7),
+                                                                       ahora.date()))),
+        ('turnos.abierto', select(Turno.id).where(
+            Turno.sucursal_id == SUCURSAL, Turno.usuario_id == 4, Turno.estado == 'abierto')),
+        ('productos.menu', select(Producto.id).where(
+            Producto.sucursal_id == SUCURSAL, Producto.categoria_id == 1, Producto.disponible.is_(True))),
+        ('categorias.activas', select(Categoria.id).where(
+            Categoria.sucursal_id == SUCURSAL, Categoria.activo.is_(True))),
+        ('reservas.del_dia', select(Reserva.id).where(
+            Reserva.sucursal_id == SUCURSAL, Reserva.inicio >= ahora, Reserva.inicio < ahora + timedelta(days=1))),
+        ('eventos.de_mesa', select(Evento.id).where(
+            Evento.sucursal_id == SUCURSAL, Evento.entidad == 'mesa', Evento.entidad_id == 1,
+            Evento.fecha >= ahora - timedelta(days=1))),
+    ]
+
+
+def _sql(sentencia, dialecto):
+    # Valores literales: el plan no depende de cómo llegan los parámetros
+    return str(sentencia.compile(dialect=dialecto, compile_kwargs={'literal_binds': True}))
+
+
+def plan_sqlite(conexion, sql):
+    filas = conexion.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql).all()
+    pasos = [fila[-1] for fila in filas]
+    # "SCAN comandas" recorre la tabla; "SCAN comandas USING INDEX ..." recorre un índice
+    recorridos = [p for p in pasos if p.startswith('SCAN ') and 'USING' not in p
+                  and not p.startswith('SCAN CONSTANT')]
+    return pasos, recorridos
+
+
+def _nodos(nodo):
+    yield nodo
+    for hijo in nodo.get('Plans', []):
+        yield from _nodos(hijo)
+
+
+def plan_postgresql(conexion, sql):
+    conexion.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    resultado = conexion.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + sql).scalar()
+    plan = resultado if isinstance(resultado, list) else json.loads(resultado)
+    pasos = [f"{n['Node Type']} {n.get('Relation Name', '')} {n.get('Index Name', '')}".strip()
+             for n in _nodos(plan[0]['Plan'])]
+    recorridos = [p for p in pasos if p.startswith('Seq Scan')]
+    return pasos, recorridos
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Verificar que las consultas frecuentes usen índice')
+    parser.add_argument('--database-url', help='URL de la base (por defecto DATABASE_URL)')
+    parser.add_argument('--verbose', action='store_true', help='Mostrar el plan completo')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.database_url:
+        # config.py lee DATABASE_URL al importarse
+        os.environ['DATABASE_URL'] = args.database_url
+
+    from app import create_app
+    from app.models import db
+
+    app = create_app('development')
+    fallas = 0
+    with app.app_context():
+        dialecto = db.engine.dialect
+        explicar = plan_postgresql if dialecto.name == 'postgresql' else plan_sqlite
+        for nombre, sentencia in consultas():
+            with db.engine.connect() as conexion:
+                pasos, recorridos = explicar(conexion, _sql(sentencia, dialecto))
+                conexion.rollback()
+            fallas += bool(recorridos)
+            print(f'{"SCAN" if recorridos else "ok":5} {nombre:28} {"; ".join(recorridos or pasos[:1])}')
+            if args.verbose:
+                for paso in pasos:
+                    print(f'{"":34} {paso}')
+    print(f'{fallas} consultas sin índice' if fallas else 'Todas las consultas usan índice')
+    return 1 if fallas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""Cuántas pantallas conectadas a los streams (SSE) aguanta el servidor.
+
+Abre N conexiones concurrentes a ``/comandas/stream`` o ``/mesas/stream`` de un
+servidor ya levantado, las mantiene abiertas y mientras tanto mide la latencia
+de una petición normal (``/mesas/api/estado``) para ver si los streams ociosos
+le quitan capacidad al resto de la aplicación.
+
+Uso:
+    GUNICORN_WORKER_CLASS=gevent GUNICORN_WORKERS=2 gunicorn -c gunicorn.conf.py run:app &
+    python -m benchmarks.streaming --url http://localhost:5000 --conexiones 2000 \\
+        --pid $(pgrep -o gunicorn) --salida streaming.json
+"""
+import argparse
+import asyncio
+import http.cookiejar
+import json
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+from benchmarks.dinner_rush import percentil
+
+
+def iniciar_sesion(url, usuario, password):
+    """Iniciar sesión con urllib y devolver la cabecera Cookie"""
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    datos = urllib.parse.urlencode({'username': usuario, 'password': password}).encode()
+    opener.open(url + '/auth/login', data=datos, timeout=10)
+    cookie = '; '.join(f'{c.name}={c.value}' for c in jar)
+    if 'session=' not in cookie:
+        raise SystemExit(f'No se pudo iniciar sesión como {usuario}')
+    return cookie
+
+
+def rss_mb(pid):
+    """Memoria residente del proceso y sus hijos (solo Linux)"""
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            pids += [int(p) for p in f.read().split()]
+    except OSError:
+        pass
+    total = 0
+    for p in pids:
+        try:
+            with open(f'/proc/{p}/status') as f:
+                for linea in f:
+                    if linea.startswith('VmRSS:'):
+                        total += int(linea.split()[1])
+        except OSError:
+            pass
+    return round(total / 1024.0, 1)
+
+
+class Resultados:
+    def __init__(self):
+        self.conectados = 0
+        self.cortadas = 0
+        self.errores = {}
+        self.primer_evento_ms = []
+        self.eventos = 0
+
+    def error(self, nombre):
+        self.errores[nombre] = self.errores.get(nombre, 0) + 1
+
+
+async def cliente_stream(host, puerto, ruta, cookie, hasta, res, timeout_conexion):
+    inicio = time.perf_counter()
+    try:
+        lector, escritor = await asyncio.wait_for(asyncio.open_connection(host, puerto),
+                                                  timeout_conexion)
+    except (OSError, asyncio.TimeoutError) as e:
+        res.error(type(e).__name__)
+        return
+    escritor.write((f'GET {ruta} HTTP/1.1\r\nHost: {host}\r\nCookie: {cookie}\r\n'
+                    'Accept: text/event-stream\r\n\r\n').encode())
+    conectado = False
+    try:
+        estado = await asyncio.wait_for(lector.readline(), timeout_conexion)
+        if b' 200 ' not in estado:
+            res.error(estado.decode(errors='replace').strip() or 'sin_respuesta')
+            return
+        while time.monotonic() < hasta:
+            try:
+                linea = await asyncio.wait_for(lector.readline(),
+                                               max(0.1, hasta - time.monotonic()))
+            except asyncio.TimeoutError:
+                break
+            if not linea:
+                # Con workers síncronos el servidor corta el stream a propósito
+                res.cortadas += 1
+                break
+            if linea.startswith(b'event:'):
+                res.eventos += 1
+                if not conectado:
+                    conectado = True
+                    res.conectados += 1
+                    res.primer_evento_ms.append((time.perf_counter() - inicio) * 1000.0)
+    except (OSError, asyncio.TimeoutError) as e:
+        res.error(type(e).__name__)
+    finally:
+        escritor.close()
+
+
+async def sondear(host, puerto, cookie, hasta, latencias):
+    """Petición normal cada 200 ms mientras los streams están abiertos"""
+    while time.monotonic() < hasta:
+        inicio = time.perf_counter()
+        try:
+            lector, escritor = await asyncio.wait_for(asyncio.open_connection(host, puerto), 10)
+            escritor.write((f'GET /mesas/api/estado HTTP/1.1\r\nHost: {host}\r\n'
+                            f'Cookie: {cookie}\r\nConnection: close\r\n\r\n').encode())
+            await asyncio.wait_for(lector.read(), 10)
+            escritor.close()
+            latencias.append((time.perf_counter() - inicio) * 1000.0)
+        except (OSError, asyncio.TimeoutError):
+            latencias.append(float('inf'))
+        await asyncio.sleep(0.2)
+
+
+async def ejecutar(args, cookie):
+    url = urllib.parse.urlparse(args.url)
+    host, puerto = url.hostname, url.port or 80
+    res = Resultados()
+    latencias = []
+    rss = []
+
+    hasta = time.monotonic() + args.rampa + args.mantener
+    tareas = [asyncio.create_task(sondear(host, puerto, cookie, hasta, latencias))]
+    pausa = args.rampa / max(1, args.conexiones)
+    for _ in range(args.conexiones):
+        tareas.append(asyncio.create_task(
+            cliente_stream(host, puerto, args.ruta, cookie, hasta, res, args.timeout)
+        ))
+        await asyncio.sleep(pausa)
+
+    while time.monotonic() < hasta:
+        if args.pid:
+            rss.append(rss_mb(args.pid))
+        await asyncio.sleep(1)
+    await asyncio.gather(*tareas, return_exceptions=True)
+    return res, latencias, rss
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Conexiones SSE sostenidas')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--ruta', default='/comandas/stream')
+    parser.add_argument('--usuario', default='cocina')
+    parser.add_argument('--password', default='cocina123')
+    parser.add_argument('--conexiones', type=int, default=500)
+    parser.add_argument('--rampa', type=float, default=10, help='Segundos para abrir todas')
+    parser.add_argument('--mantener', type=float, default=20,
+                        help='Segundos con todas abiertas')
+    parser.add_argument('--timeout', type=float, default=10)
+    parser.add_argument('--pid', type=int, help='PID del master de gunicorn para medir RSS')
+    parser.add_argument('--salida', help='Archivo JSON con los resultados')
+    args = parser.parse_args(argv)
+
+    cookie = iniciar_sesion(args.url.rstrip('/'), args.usuario, args.password)
+    res, latencias, rss = asyncio.run(ejecutar(args, cookie))
+
+    latencias_ok = sorted(l for l in latencias if l != float('inf'))
+    primeros = sorted(res.primer_evento_ms)
+    resultado = {
+        'url': args.url,
+        'ruta': args.ruta,
+        'solicitadas': args.conexiones,
+        'conectadas': res.conectados,
+        'cortadas_por_servidor': res.cortadas,
+        'eventos': res.eventos,
+        'errores': res.errores,
+        'primer_evento_p50_ms': round(percentil(primeros, 50), 1) if primeros else None,
+        'primer_evento_p95_ms': round(percentil(primeros, 95), 1) if primeros else None,
+        'peticion_normal': {
+            'n': len(latencias),
+            'fallidas': len(latencias) - len(latencias_ok),
+            'p50_ms': round(percentil(latencias_ok, 50), 1) if latencias_ok else None,
+            'p95_ms': round(percentil(latencias_ok, 95), 1) if latencias_ok else None,
+        },
+        'rss_max_mb': max(rss) if rss else None,
+    }
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+    print(texto)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
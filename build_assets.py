@@ -0,0 +1,131 @@
+"""Empaquetar CSS/JS con hash en el nombre y variantes gzip/brotli.
+
+Uso:
+    python build_assets.py              # descarga lo que falte en app/static/vendor
+    python build_assets.py --sin-red    # solo usa lo que ya está en vendor/
+
+Escribe app/static/dist/ (app.<hash>.css, app.<hash>.js, fuentes y
+manifest.json). Se ejecuta en el build de la imagen de Docker; ver app/assets.py.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import urllib.parse
+import urllib.request
+
+from app.assets import DIRECTORIO_DIST, DIRECTORIO_STATIC, DIRECTORIO_VENDOR, PAQUETES, es_url
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin el módulo solo se generan .gz
+    brotli = None
+
+COMPRIMIBLES = ('.css', '.js', '.svg', '.json')
+RE_URL_CSS = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+RE_SOURCEMAP = re.compile(r'^\s*(/\*#|//#) sourceMappingURL=.*$', re.MULTILINE)
+
+
+def ruta_vendor(url):
+    """Ruta local en vendor/ para una URL de CDN (conserva la estructura del paquete)"""
+    ruta = urllib.parse.urlparse(url).path.lstrip('/')
+    if ruta.startswith('npm/'):
+        ruta = ruta[len('npm/'):]
+    return os.path.join(DIRECTORIO_VENDOR, *ruta.split('/'))
+
+
+def obtener(url, sin_red):
+    destino = ruta_vendor(url)
+    if not os.path.isfile(destino):
+        if sin_red:
+            raise SystemExit(f'Falta {destino} y se pidió --sin-red')
+        print(f'Descargando {url}')
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as respuesta:
+            datos = respuesta.read()
+        with open(destino, 'wb') as f:
+            f.write(datos)
+    with open(destino, 'rb') as f:
+        return f.read()
+
+
+def con_hash(nombre, datos):
+    base, extension = os.path.splitext(nombre)
+    return f'{base}.{hashlib.sha256(datos).hexdigest()[:12]}{extension}'
+
+
+def escribir(nombre, datos):
+    ruta = os.path.join(DIRECTORIO_DIST, nombre)
+    with open(ruta, 'wb') as f:
+        f.write(datos)
+    if nombre.endswith(COMPRIMIBLES):
+        with open(ruta + '.gz', 'wb') as f:
+            f.write(gzip.compress(datos, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(ruta + '.br', 'wb') as f:
+                f.write(brotli.compress(datos, quality=11))
+
+
+def reescribir_urls_css(texto, fuente, sin_red):
+    """Copiar a dist/ las fuentes/imágenes que usa el CSS y apuntar a su nombre con hash"""
+    def reemplazar(coincidencia):
+        referencia = coincidencia.group(2).strip()
+        if referencia.startswith(('data:', '#', '/')) or es_url(referencia):
+            return coincidencia.group(0)
+        limpia = referencia.split('?')[0].split('#')[0]
+        if es_url(fuente):
+            datos = obtener(urllib.parse.urljoin(fuente, limpia), sin_red)
+        else:
+            with open(os.path.join(DIRECTORIO_STATIC, os.path.dirname(fuente), limpia), 'rb') as f:
+                datos = f.read()
+        nombre = con_hash(os.path.basename(limpia), datos)
+        escribir(nombre, datos)
+        return f'url("{nombre}")'
+
+    return RE_URL_CSS.sub(reemplazar, texto)
+
+
+def construir(sin_red=False):
+    shutil.rmtree(DIRECTORIO_DIST, ignore_errors=True)
+    os.makedirs(DIRECTORIO_DIST)
+    manifiesto = {}
+    for paquete, fuentes in PAQUETES.items():
+        partes = []
+        for fuente in fuentes:
+            if es_url(fuente):
+                texto = obtener(fuente, sin_red).decode('utf-8')
+            else:
+                with open(os.path.join(DIRECTORIO_STATIC, fuente), encoding='utf-8') as f:
+                    texto = f.read()
+            texto = RE_SOURCEMAP.sub('', texto)
+            if paquete.endswith('.css'):
+                texto = reescribir_urls_css(texto, fuente, sin_red)
+            partes.append(f'/* {fuente} */\n{texto}')
+        # ';' entre scripts por si alguno no termina en punto y coma
+        separador = '\n' if paquete.endswith('.css') else '\n;\n'
+        datos = separador.join(partes).encode('utf-8')
+        manifiesto[paquete] = con_hash(paquete, datos)
+        escribir(manifiesto[paquete], datos)
+        print(f'{paquete} -> dist/{manifiesto[paquete]} ({len(datos) // 1024} KB)')
+    with open(os.path.join(DIRECTORIO_DIST, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, indent=2)
+    if brotli is None:
+        print('Aviso: sin el módulo brotli solo se generaron variantes .gz')
+    return manifiesto
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Empaquetar archivos estáticos')
+    parser.add_argument('--sin-red', action='store_true',
+                        help='No descargar; fallar si falta algo en app/static/vendor')
+    args = parser.parse_args(argv)
+    construir(sin_red=args.sin_red)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
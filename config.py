@@ -1,15 +1,102 @@
 import os
-import os
+import tempfile
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 
+def env_bool(nombre, default=False):
+    valor = os.getenv(nombre)
+    if valor is None:
+        return default
+    return valor.strip().lower() in ('1', 'true', 'yes', 'si', 'on')
+
+
+def env_plazos(nombre, default):
+    """Presupuestos por blueprint: "reportes=30000,caja=3000" sobre los default"""
+    plazos = dict(default)
+    for parte in os.getenv(nombre, '').split(','):
+        if '=' in parte:
+            blueprint, ms = parte.split('=', 1)
+            plazos[blueprint.strip()] = int(ms)
+    return plazos
+
+
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     # Allow Render to set PORT; used by run.py if needed
     PORT = int(os.getenv('PORT', '5000'))
 
+    # Pool de conexiones (por worker de gunicorn: workers * (size + overflow)
+    # no debe pasar del límite de conexiones de la base)
+    # DB_POOL_MODE: 'queue' (pool propio), 'pgbouncer' (el pooler externo en
+    # modo transacción administra las conexiones) o 'null' (sin pool)
+    DB_POOL_MODE = os.getenv('DB_POOL_MODE', 'queue')
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '5'))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    DB_POOL_PRE_PING = env_bool('DB_POOL_PRE_PING', True)
+    DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', '5'))
+    # Caché de SQL compilado de SQLAlchemy (sentencias por engine)
+    DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '500'))
+    # Espera por una conexión del pool a partir de la cual se registra un aviso
+    DB_POOL_WAIT_WARN_MS = float(os.getenv('DB_POOL_WAIT_WARN_MS', '200'))
+
+    # Presupuesto de tiempo por petición (ms) según el blueprint: se aplica como
+    # statement_timeout (PostgreSQL) o progress handler (SQLite) y al vencerse
+    # la petición responde 503. Debe quedar muy por debajo de GUNICORN_TIMEOUT.
+    # Una vista puede fijar el suyo con @plazo(ms) (app/plazos.py)
+    PLAZOS_ACTIVOS = env_bool('PLAZOS_ACTIVOS', True)
+    PLAZO_DEFAULT_MS = int(os.getenv('PLAZO_DEFAULT_MS', '5000'))
+    PLAZOS_MS = env_plazos('PLAZOS_MS', {
+        'comandas': 2000, 'mesas': 2000, 'caja': 3000, 'api_v2': 3000, 'auth': 3000,
+        'inventario': 5000, 'sistema': 5000, 'reportes': 30000,
+    })
+
+    # Réplica de lectura opcional para listados y reportes
+    SQLALCHEMY_REPLICA_URI = os.getenv('DATABASE_REPLICA_URL')
+    # Segundos que un usuario lee del primario después de escribir
+    DB_REPLICA_STICKY_SECONDS = float(os.getenv('DB_REPLICA_STICKY_SECONDS', '5'))
+
+    # Streams (SSE) de cocina y mapa de mesas. Con workers síncronos cada
+    # stream ocupa un worker, así que se cortan pronto y el navegador reconecta
+    SERVIDOR_ASINCRONO = os.getenv('GUNICORN_WORKER_CLASS', 'sync') in ('gevent', 'eventlet')
+    STREAM_INTERVALO = float(os.getenv('STREAM_INTERVALO', '1'))
+    STREAM_LATIDO = float(os.getenv('STREAM_LATIDO', '15'))
+    STREAM_DURACION_MAX = float(os.getenv('STREAM_DURACION_MAX',
+                                          '3600' if SERVIDOR_ASINCRONO else '25'))
+
+    # Plantillas: bytecode compilado en disco (compartido entre workers y
+    # reinicios; vacío lo desactiva) y caché de fragmentos por versión de datos
+    JINJA_BYTECODE_CACHE_DIR = os.getenv('JINJA_BYTECODE_CACHE_DIR',
+                                         os.path.join(tempfile.gettempdir(), 'restaurant-pos-jinja'))
+    FRAGMENTOS_CACHE = env_bool('FRAGMENTOS_CACHE', True)
+
+    # Caché compartida (app/cache.py) de fragmentos y datos: memoria (cada
+    # worker la suya), archivo (SQLite que comparten los workers del servidor)
+    # o base (tabla cache_entradas, compartida entre servidores)
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memoria')
+    CACHE_ARCHIVO = os.getenv('CACHE_ARCHIVO',
+                              os.path.join(tempfile.gettempdir(), 'restaurant-pos-cache.sqlite'))
+    CACHE_MAX = int(os.getenv('CACHE_MAX', '1024'))
+    CACHE_TTL = int(os.getenv('CACHE_TTL', '600'))
+
+    # Hora local (0-23) en que empieza el día de negocio: ventas, turnos y
+    # reportes de la madrugada cuentan para el día anterior
+    DIA_NEGOCIO_CORTE = float(os.getenv('DIA_NEGOCIO_CORTE', '5'))
+
+    # Reportes de productos y meseros (app/analitica.py): copia columnar de
+    # las ventas cobradas, refrescada como mucho cada ANALITICA_REFRESCO segundos
+    ANALITICA_DIR = os.getenv('ANALITICA_DIR',
+                              os.path.join(tempfile.gettempdir(), 'restaurant-pos-analitica'))
+    ANALITICA_REFRESCO = int(os.getenv('ANALITICA_REFRESCO', '300'))
+    # Días de negocio que cada refresco vuelve a leer (pagos que confirmaron tarde)
+    ANALITICA_SOLAPE_DIAS = int(os.getenv('ANALITICA_SOLAPE_DIAS', '2'))
+
+    # Token opcional para leer /sistema/metricas sin sesión (monitoreo)
+    METRICAS_TOKEN = os.getenv('METRICAS_TOKEN')
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -21,6 +108,12 @@ class ProductionConfig(Config):
     DEBUG = False
     # Render / Neon will provide DATABASE_URL (Postgres)
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
+    # Postgres administrado con pocas conexiones: 8 workers * (3 + 2) = 40
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '3'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '2'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '300'))
+    # 8 workers: una sola caché por servidor en lugar de 8 en frío
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'archivo')
 
 
 config = {
@@ -0,0 +1,45 @@
+"""Configuración de gunicorn (se lee con `gunicorn -c gunicorn.conf.py run:app`).
+
+GUNICORN_WORKER_CLASS:
+    sync    Un request a la vez por worker (default). Los streams SSE se cortan
+            a los STREAM_DURACION_MAX segundos para no acaparar workers.
+    gevent  Workers cooperativos: miles de pantallas conectadas a los streams de
+            cocina y mesas por worker, cada una casi sin costo mientras no hay
+            cambios. Las conexiones a la base siguen limitadas por el pool.
+
+GUNICORN_PRELOAD (default true): la app se importa una sola vez en el master y
+los workers nacen con fork ya listos; un reinicio no repite la importación de
+modelos, rutas y plantillas en cada worker. Las conexiones heredadas del master
+se descartan en post_fork.
+"""
+import os
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+
+if worker_class == 'gevent':
+    # Parchear antes de que se importe la app para que los locks y sockets
+    # creados al importar también sean cooperativos
+    from gevent import monkey
+    monkey.patch_all()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').strip().lower() in ('1', 'true', 'yes', 'si', 'on')
+
+
+def post_fork(server, worker):
+    if preload_app:
+        # Un socket compartido entre procesos corrompe el protocolo: que cada
+        # worker abra sus propias conexiones (close=False deja las del master en paz)
+        from run import app
+        from app.models import db
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+    if worker_class == 'gevent':
+        # psycopg2 es una extensión en C: hay que decirle que ceda al hub de gevent
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
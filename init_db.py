@@ -0,0 +1,200 @@
+"""Inicializar la base de datos y cargar datos de prueba.
+
+Uso:
+    python init_db.py
+
+Se ejecuta en cada arranque del contenedor, así que primero compara la
+revisión de Alembic de la base contra la del código: si ya coinciden no hace
+nada más (una consulta). Base vacía: crea las tablas, la marca en la última
+revisión y carga los datos. Base creada antes de las migraciones (tablas sin
+`alembic_version`): la marca en la revisión inicial y aplica lo que falte.
+"""
+import os
+import time
+
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from flask import current_app
+from flask_migrate import stamp, upgrade
+from sqlalchemy import inspect
+
+from app import create_app
+from app.models import (db, Usuario, Mesa, Categoria, Producto, Sucursal, VersionDatos,
+                        SUCURSAL_PRINCIPAL)
+from app.versiones import CONJUNTOS
+
+USUARIOS = [
+    # username, nombre, rol, password
+    ('admin', 'Administrador', 'admin', 'admin123'),
+    ('mesero1', 'Mesero Uno', 'mesero', 'mesero123'),
+    ('cocina', 'Cocina', 'cocina', 'cocina123'),
+    ('caja', 'Caja', 'caja', 'caja123'),
+]
+
+# numero, capacidad, ubicacion
+MESAS = (
+    [(n, 4, 'Salón') for n in range(1, 9)]
+    + [(n, 2, 'Barra') for n in range(9, 13)]
+    + [(n, 6, 'Terraza') for n in range(13, 17)]
+    + [(17, 8, 'Privado'), (18, 10, 'Privado')]
+)
+
+MENU = {
+    'Entradas': [
+        ('Guacamole con totopos', 95), ('Queso fundido', 110), ('Sopa de tortilla', 85),
+        ('Elote asado', 55),
+    ],
+    'Tacos': [
+        ('Tacos al pastor', 75), ('Tacos de suadero', 75), ('Tacos de bistec', 80),
+        ('Tacos de carnitas', 80), ('Gringa', 95),
+    ],
+    'Platos fuertes': [
+        ('Enchiladas verdes', 135), ('Mole poblano', 165), ('Arrachera', 245),
+        ('Chiles en nogada', 210), ('Pescado a la talla', 230),
+    ],
+    'Bebidas': [
+        ('Agua de horchata', 35), ('Agua de jamaica', 35), ('Refresco', 30),
+        ('Cerveza nacional', 50), ('Cerveza artesanal', 85), ('Margarita', 110),
+        ('Michelada', 80), ('Café de olla', 35),
+    ],
+    'Postres': [
+        ('Flan napolitano', 60), ('Churros con chocolate', 70), ('Pastel de tres leches', 75),
+        ('Arroz con leche', 50), ('Helado', 45), ('Buñuelos', 55),
+    ],
+}
+
+# Estación y minutos de preparación por categoría del menú de ejemplo
+ESTACIONES_MENU = {
+    'Entradas': ('fria', 8),
+    'Tacos': ('parrilla', 10),
+    'Platos fuertes': ('parrilla', 20),
+    'Bebidas': ('bar', 3),
+    'Postres': ('fria', 5),
+}
+
+
+def seed_sucursal():
+    """Crear la sucursal principal (a la que pertenecen los datos sin sucursal)"""
+    if not db.session.get(Sucursal, SUCURSAL_PRINCIPAL):
+        # Primera fila de la tabla, así toma el id 1 sin adelantar la secuencia a mano
+        db.session.add(Sucursal(nombre='Principal', activo=True))
+        db.session.commit()
+
+
+def seed_usuarios(extra_meseros=0, extra_cajeros=0, extra_cocina=0):
+    """Crear los usuarios base (y opcionalmente más personal para pruebas de carga)"""
+    usuarios = list(USUARIOS)
+    usuarios += [(f'mesero{n}', f'Mesero {n}', 'mesero', 'mesero123')
+                 for n in range(2, extra_meseros + 2)]
+    usuarios += [(f'caja{n}', f'Caja {n}', 'caja', 'caja123')
+                 for n in range(2, extra_cajeros + 2)]
+    usuarios += [(f'cocina{n}', f'Cocina {n}', 'cocina', 'cocina123')
+                 for n in range(2, extra_cocina + 2)]
+
+    existentes = {u.username for u in Usuario.query.all()}
+    for username, nombre, rol, password in usuarios:
+        if username in existentes:
+            continue
+        usuario = Usuario(username=username, nombre=nombre, rol=rol, activo=True)
+        usuario.set_password(password)
+        db.session.add(usuario)
+    db.session.commit()
+
+
+def seed_mesas(mesas=MESAS):
+    """Crear las mesas del salón"""
+    existentes = {m.numero for m in Mesa.query.all()}
+    for numero, capacidad, ubicacion in mesas:
+        if numero not in existentes:
+            db.session.add(Mesa(numero=numero, capacidad=capacidad,
+                                ubicacion=ubicacion, estado='disponible'))
+    db.session.commit()
+
+
+def seed_menu(menu=MENU):
+    """Crear categorías y productos del menú"""
+    for nombre_categoria, productos in menu.items():
+        categoria = Categoria.query.filter_by(nombre=nombre_categoria).first()
+        if not categoria:
+            categoria = Categoria(nombre=nombre_categoria, activo=True)
+            db.session.add(categoria)
+            db.session.flush()
+        existentes = {p.nombre for p in categoria.productos}
+        estacion, minutos = ESTACIONES_MENU.get(nombre_categoria, ('parrilla', 10))
+        for nombre, precio in productos:
+            if nombre not in existentes:
+                db.session.add(Producto(nombre=nombre, precio=precio,
+                                        categoria_id=categoria.id,
+                                        stock=100, stock_minimo=5, disponible=True,
+                                        estacion=estacion, tiempo_preparacion=minutos))
+    db.session.commit()
+
+
+def seed_versiones():
+    """Crear los contadores de versión de datos"""
+    existentes = {v.nombre for v in VersionDatos.query.all()}
+    for nombre in CONJUNTOS:
+        if nombre not in existentes:
+            db.session.add(VersionDatos(nombre=nombre, version=1))
+    db.session.commit()
+
+
+# Revisión que corresponde a las tablas que creaba `db.create_all()` antes de usar Alembic
+REVISION_BASE = 'd65000b8ba60'
+
+
+def estado_esquema():
+    """Comparar la revisión aplicada en la base con la del código.
+
+    Devuelve 'al_dia', 'vacia', 'sin_revision' (tablas creadas sin Alembic) o
+    'pendiente' (faltan migraciones).
+    """
+    migrate = current_app.extensions['migrate']
+    script = ScriptDirectory.from_config(migrate.migrate.get_config(migrate.directory))
+    with db.engine.connect() as conexion:
+        aplicadas = set(MigrationContext.configure(conexion).get_current_heads())
+        if aplicadas:
+            return 'al_dia' if aplicadas == set(script.get_heads()) else 'pendiente'
+        if inspect(conexion).has_table('usuarios'):
+            return 'sin_revision'
+        return 'vacia'
+
+
+def seed():
+    """Cargar los datos base (idempotente)"""
+    seed_sucursal()
+    seed_versiones()
+    seed_usuarios()
+    seed_mesas()
+    seed_menu()
+
+
+def init_db():
+    """Dejar el esquema en la última revisión y cargar datos solo si hace falta"""
+    estado = estado_esquema()
+    if estado == 'al_dia':
+        return estado
+    if estado == 'vacia':
+        db.create_all()
+        stamp()
+    else:
+        if estado == 'sin_revision':
+            stamp(revision=REVISION_BASE)
+        upgrade()
+    seed()
+    return estado
+
+
+if __name__ == '__main__':
+    inicio = time.perf_counter()
+    env = os.getenv('FLASK_ENV', 'production')
+    app = create_app('production' if env == 'production' else 'development')
+    with app.app_context():
+        estado = init_db()
+    mensajes = {
+        'al_dia': 'Esquema al día, sin cambios.',
+        'vacia': 'Base de datos creada e inicializada.',
+        'sin_revision': 'Base existente registrada en Alembic y migrada.',
+        'pendiente': 'Migraciones aplicadas.',
+    }
+    print(f'{mensajes[estado]} ({(time.perf_counter() - inicio) * 1000:.0f} ms)')
@@ -0,0 +1,132 @@
+"""Marcas en UTC y fecha de negocio
+
+Revision ID: 409ea0053440
+Revises: 365bad335a9e
+Create Date: 2026-10-19 02:27:50.719344
+
+"""
+import os
+from datetime import datetime
+
+from alembic import op
+import pytz
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '409ea0053440'
+down_revision = '365bad335a9e'
+branch_labels = None
+depends_on = None
+
+
+ZONA = 'America/Mexico_City'
+# El mismo corte que usará la aplicación (config.DIA_NEGOCIO_CORTE)
+CORTE = float(os.getenv('DIA_NEGOCIO_CORTE', '5'))
+
+# Tabla -> marca de la que sale su día de negocio
+DIA_NEGOCIO = {'comandas': 'fecha_creacion', 'pagos': 'fecha_pago', 'turnos': 'fecha_apertura'}
+
+# Marcas de tiempo que pasan de hora local a UTC (reservas.inicio/fin y la
+# vigencia de las listas de precios siguen en hora local)
+MARCAS = {
+    'comandas': ('fecha_creacion', 'fecha_actualizacion'),
+    'pagos': ('fecha_pago',),
+    'turnos': ('fecha_apertura', 'fecha_cierre'),
+    'eventos': ('fecha',),
+    'operaciones_sync': ('fecha',),
+    'ocupacion_diaria': ('calculado',),
+    'reservas': ('fecha_creacion',),
+    'listas_precios': ('fecha_creacion',),
+}
+
+
+def _convertir(origen, destino):
+    """Pasar las marcas de la zona `origen` a `destino` (nombres de zona de pytz)"""
+    conexion = op.get_bind()
+    if conexion.dialect.name == 'postgresql':
+        for tabla, columnas in MARCAS.items():
+            asignaciones = ', '.join(
+                f"{c} = ({c} AT TIME ZONE '{origen}') AT TIME ZONE '{destino}'" for c in columnas)
+            op.execute(f'UPDATE {tabla} SET {asignaciones}')
+        return
+
+    # SQLite no conoce zonas horarias: fila por fila con pytz
+    de, a = pytz.timezone(origen), pytz.timezone(destino)
+
+    def convertir(valor):
+        if valor is None:
+            return None
+        if isinstance(valor, str):
+            valor = datetime.fromisoformat(valor)
+        return de.localize(valor).astimezone(a).replace(tzinfo=None)
+
+    for nombre, columnas in MARCAS.items():
+        tabla = sa.table(nombre, sa.column('id'), *(sa.column(c, sa.DateTime) for c in columnas))
+        filas = conexion.execute(sa.select(tabla.c.id, *(tabla.c[c] for c in columnas))).all()
+        if not filas:
+            continue
+        parametros = [{'_id': fila[0], **{c: convertir(v) for c, v in zip(columnas, fila[1:])}}
+                      for fila in filas]
+        conexion.execute(
+            tabla.update().where(tabla.c.id == sa.bindparam('_id'))
+            .values({c: sa.bindparam(c) for c in columnas}),
+            parametros,
+        )
+
+
+def upgrade():
+    for tabla in DIA_NEGOCIO:
+        with op.batch_alter_table(tabla, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('fecha_negocio', sa.Date(), nullable=True))
+
+    # El día de negocio sale de la hora local: se calcula antes de pasar a UTC
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    for tabla, columna in DIA_NEGOCIO.items():
+        if postgresql:
+            dia = f"CAST(COALESCE({columna}, LOCALTIMESTAMP) - INTERVAL '{CORTE} hours' AS DATE)"
+        else:
+            dia = f"date(COALESCE({columna}, datetime('now', 'localtime')), '-{CORTE} hours')"
+        op.execute(f'UPDATE {tabla} SET fecha_negocio = {dia}')
+
+    _convertir(ZONA, 'UTC')
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('comandas', schema=None) as batch_op:
+        batch_op.alter_column('fecha_negocio', existing_type=sa.Date(), nullable=False)
+        batch_op.create_index('ix_comandas_sucursal_fecha_negocio', ['sucursal_id', 'fecha_negocio'], unique=False)
+
+    with op.batch_alter_table('pagos', schema=None) as batch_op:
+        batch_op.alter_column('fecha_negocio', existing_type=sa.Date(), nullable=False)
+        batch_op.drop_index(batch_op.f('ix_pagos_sucursal_fecha'))
+        batch_op.create_index('ix_pagos_sucursal_fecha_negocio', ['sucursal_id', 'fecha_negocio'], unique=False)
+
+    with op.batch_alter_table('turnos', schema=None) as batch_op:
+        batch_op.alter_column('fecha_negocio', existing_type=sa.Date(), nullable=False)
+        batch_op.create_index('ix_turnos_sucursal_fecha_negocio', ['sucursal_id', 'fecha_negocio'], unique=False)
+
+    # ### end Alembic commands ###
+
+    # Resúmenes calculados por día de calendario: se recalculan por día de negocio
+    op.execute('DELETE FROM ocupacion_diaria')
+
+
+def downgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('turnos', schema=None) as batch_op:
+        batch_op.drop_index('ix_turnos_sucursal_fecha_negocio')
+        batch_op.drop_column('fecha_negocio')
+
+    with op.batch_alter_table('pagos', schema=None) as batch_op:
+        batch_op.drop_index('ix_pagos_sucursal_fecha_negocio')
+        batch_op.create_index(batch_op.f('ix_pagos_sucursal_fecha'), ['sucursal_id', 'fecha_pago'], unique=False)
+        batch_op.drop_column('fecha_negocio')
+
+    with op.batch_alter_table('comandas', schema=None) as batch_op:
+        batch_op.drop_index('ix_comandas_sucursal_fecha_negocio')
+        batch_op.drop_column('fecha_negocio')
+
+    # ### end Alembic commands ###
+
+    _convertir('UTC', ZONA)
+    op.execute('DELETE FROM ocupacion_diaria')
@@ -0,0 +1,86 @@
+"""Sucursales
+
+Revision ID: a3c91e07f5b2
+Revises: 58f978760934
+Create Date: 2026-10-19 03:12:08.527310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c91e07f5b2'
+down_revision = '58f978760934'
+branch_labels = None
+depends_on = None
+
+TABLAS = ('usuarios', 'mesas', 'categorias', 'productos', 'turnos', 'comandas', 'pagos')
+
+INDICES = (
+    ('ix_usuarios_sucursal_rol', 'usuarios', ['sucursal_id', 'rol']),
+    ('ix_productos_sucursal_categoria', 'productos', ['sucursal_id', 'categoria_id']),
+    ('ix_turnos_sucursal_estado', 'turnos', ['sucursal_id', 'estado']),
+    ('ix_turnos_sucursal_apertura', 'turnos', ['sucursal_id', 'fecha_apertura']),
+    ('ix_comandas_sucursal_estado_fecha', 'comandas', ['sucursal_id', 'estado', 'fecha_creacion']),
+    ('ix_comandas_sucursal_mesero_fecha', 'comandas', ['sucursal_id', 'mesero_id', 'fecha_creacion']),
+    ('ix_pagos_sucursal_fecha', 'pagos', ['sucursal_id', 'fecha_pago']),
+)
+
+# Los UNIQUE del esquema inicial no tienen nombre: en SQLite se reconstruye la
+# tabla y esta convención les da uno para poder quitarlos
+CONVENCION = {'uq': 'uq_%(table_name)s_%(column_0_name)s'}
+
+
+def _cambiar_unico(tabla, columna, nuevo, nuevas_columnas):
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    viejo = f'uq_{tabla}_{columna}' if sqlite else f'{tabla}_{columna}_key'
+    with op.batch_alter_table(tabla, naming_convention=CONVENCION) as batch_op:
+        batch_op.drop_constraint(viejo, type_='unique')
+        batch_op.create_unique_constraint(nuevo, nuevas_columnas)
+
+
+def upgrade():
+    op.create_table('sucursales',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nombre', sa.String(length=120), nullable=False),
+    sa.Column('direccion', sa.String(length=255), nullable=True),
+    sa.Column('activo', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('nombre')
+    )
+    # Primera fila de la tabla (id 1): los datos existentes quedan en la sucursal principal
+    op.execute("INSERT INTO sucursales (nombre, activo) VALUES ('Principal', true)")
+
+    for tabla in TABLAS:
+        with op.batch_alter_table(tabla) as batch_op:
+            batch_op.add_column(sa.Column('sucursal_id', sa.Integer(), server_default='1',
+                                          nullable=False))
+            batch_op.create_foreign_key(f'fk_{tabla}_sucursal', 'sucursales',
+                                        ['sucursal_id'], ['id'])
+
+    _cambiar_unico('mesas', 'numero', 'uq_mesas_sucursal_numero', ['sucursal_id', 'numero'])
+    _cambiar_unico('categorias', 'nombre', 'uq_categorias_sucursal_nombre',
+                   ['sucursal_id', 'nombre'])
+
+    for nombre, tabla, columnas in INDICES:
+        op.create_index(nombre, tabla, columnas, unique=False)
+
+
+def downgrade():
+    for nombre, tabla, _ in INDICES:
+        op.drop_index(nombre, table_name=tabla)
+
+    with op.batch_alter_table('categorias') as batch_op:
+        batch_op.drop_constraint('uq_categorias_sucursal_nombre', type_='unique')
+        batch_op.create_unique_constraint('categorias_nombre_key', ['nombre'])
+    with op.batch_alter_table('mesas') as batch_op:
+        batch_op.drop_constraint('uq_mesas_sucursal_numero', type_='unique')
+        batch_op.create_unique_constraint('mesas_numero_key', ['numero'])
+
+    for tabla in reversed(TABLAS):
+        with op.batch_alter_table(tabla) as batch_op:
+            batch_op.drop_constraint(f'fk_{tabla}_sucursal', type_='foreignkey')
+            batch_op.drop_column('sucursal_id')
+
+    op.drop_table('sucursales')